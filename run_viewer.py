@@ -2,7 +2,11 @@
 Entry point script for the SEM Viewer application.
 """
 
+import multiprocessing
+
 from sem_view.main import main
 
 if __name__ == "__main__":
+    # Needed for the batch tool's process pool in frozen executables
+    multiprocessing.freeze_support()
     main()
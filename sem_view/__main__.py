@@ -0,0 +1,8 @@
+"""
+Allows running the application with `python -m sem_view`.
+"""
+
+from .main import main
+
+if __name__ == "__main__":
+    main()
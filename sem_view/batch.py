@@ -0,0 +1,346 @@
+"""
+Headless batch analysis for SEM Viewer.
+
+This module runs the auto-area analysis and metadata parsing over many TIFF
+files without a display, e.g.:
+
+    python -m sem_view batch "run_42/*.tif" --roi rois.json --output areas.csv
+    python -m sem_view batch run_42/ --embedded --output areas.jsonl
+
+ROI polygons come from a JSON file or from the area annotations stored in
+each TIFF's ImageDescription. Files are processed in a process pool and
+results are written to CSV or JSON Lines as they complete.
+
+It deliberately does not import PySide6.
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .utils.annotation_index import SOURCE_BATCH, index_measurements
+from .utils.metadata_parser import read_image_info
+from .utils.measurements import Measurement
+from .utils.page_store import PageStore
+
+CONTEXT_FIELDS = ["Tool", "Beam Voltage", "Aperture", "WD", "Mag", "Date", "Author"]
+
+RESULT_FIELDS = [
+    "file",
+    "roi_index",
+    "roi_source",
+    "feature_index",
+    "area_px",
+    "area_um2",
+    "pixel_scale_nm",
+    "pixel_count",
+    "components",
+    "centroid_x",
+    "centroid_y",
+    "equivalent_diameter_px",
+    "num_points",
+    "error",
+] + CONTEXT_FIELDS
+
+
+def collect_files(inputs):
+    """Expands folders and glob patterns to a sorted list of TIFF files."""
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = [os.path.join(item, f) for f in os.listdir(item)]
+        else:
+            candidates = glob.glob(item)
+        files.extend(
+            f
+            for f in candidates
+            if os.path.isfile(f) and f.lower().endswith((".tif", ".tiff"))
+        )
+    return sorted(set(files))
+
+
+def load_roi_file(path):
+    """
+    Loads ROI polygons from a JSON file.
+
+    The file contains either a list of polygons applied to every image, or an
+    object mapping file names (base names) to lists of polygons. Each polygon
+    is a list of [x, y] points.
+
+    Returns:
+        tuple: (default polygons, dict of per-file polygons)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return [], {os.path.basename(k): v for k, v in data.items()}
+    return data, {}
+
+
+def embedded_rois(info):
+    """Returns the area polygons stored in a file's ImageDescription."""
+    return [
+        ann["points"]
+        for ann in (info.annotations or [])
+        if ann.get("type") == "area" and len(ann.get("points", [])) >= 3
+    ]
+
+
+def _result_row(row, result, pixel_scale=None):
+    """Fills the measurement fields of `row` from an OverlapResult (or None)."""
+    if result is None:
+        row.update(area_px=0.0, pixel_count=0, components=0, num_points=0)
+        return row
+
+    measurement = Measurement.area(
+        result.points, pixel_scale, area_px=result.area, pixel_count=result.pixel_count
+    )
+    row["area_px"] = measurement.value_px
+    row["pixel_count"] = measurement.pixel_count
+    row["components"] = result.component_count
+    row["centroid_x"], row["centroid_y"] = result.centroid
+    row["equivalent_diameter_px"] = result.equivalent_diameter
+    row["num_points"] = len(measurement.points)
+    if pixel_scale:
+        row["area_um2"] = measurement.value * 1e12
+    return row
+
+
+def process_file(
+    file_path,
+    rois,
+    use_embedded=False,
+    page=0,
+    threshold="otsu",
+    engine="threshold",
+    all_features=False,
+    min_pixels=None,
+):
+    """
+    Runs auto-area on every ROI of one file.
+
+    Args:
+        file_path (str): TIFF file to analyze.
+        rois (list): ROI polygons from the ROI file for this image.
+        use_embedded (bool): Also use area annotations from the file.
+        page (int): Page index to analyze.
+        threshold (str): Threshold method ("otsu", "li" or "triangle").
+        engine (str): Segmentation engine name.
+        all_features (bool): Measure every feature in each ROI instead of
+            the largest one.
+        min_pixels (int, optional): Smallest feature measured with
+            all_features (default: analysis.MIN_FEATURE_PIXELS).
+
+    Returns:
+        list of dict: One result row per ROI, or per feature with
+            all_features (or a single error row).
+    """
+    # Imported here so that listing files or parsing arguments does not
+    # require scikit-image
+    from .utils.analysis import MIN_FEATURE_PIXELS, find_features, find_overlap_area
+
+    base = {"file": file_path}
+    try:
+        info = read_image_info(file_path)
+        for field in CONTEXT_FIELDS:
+            if field in info.context:
+                base[field] = info.context[field]
+        if info.pixel_scale:
+            base["pixel_scale_nm"] = info.pixel_scale * 1e9
+
+        sources = [("roi_file", roi) for roi in rois]
+        if use_embedded:
+            sources += [("embedded", roi) for roi in embedded_rois(info)]
+        if not sources:
+            return [dict(base, error="No ROI")]
+
+        with PageStore(file_path, cache_size=1) as store:
+            image_data = store[page]
+            # Shared by all ROIs so overlapping ROIs count each tile once
+            histogram = store.page_histogram(page)
+
+        rows = []
+        for index, (source, roi) in enumerate(sources):
+            row = dict(base, roi_index=index, roi_source=source)
+            options = dict(threshold=threshold, histogram=histogram, engine=engine)
+            polygon = [tuple(p) for p in roi]
+            if not all_features:
+                result = find_overlap_area(image_data, polygon, **options)
+                rows.append(_result_row(row, result, info.pixel_scale))
+                continue
+
+            if min_pixels is None:
+                min_pixels = MIN_FEATURE_PIXELS
+            features = find_features(
+                image_data, polygon, min_pixels=min_pixels, **options
+            )
+            for feature_index, feature in enumerate(features):
+                feature_row = dict(row, feature_index=feature_index)
+                rows.append(_result_row(feature_row, feature, info.pixel_scale))
+            if not features:
+                rows.append(_result_row(row, None))
+        return rows
+
+    except Exception as e:
+        return [dict(base, error=str(e))]
+
+
+def index_rows(file_path, rows):
+    """Records the areas measured in one file's result rows in its folder's index."""
+    measurements = [
+        {
+            "type": "Area",
+            "value_si": row["area_um2"] * 1e-12 if "area_um2" in row else None,
+            "value_px": row["area_px"],
+            "pixel_count": row.get("pixel_count"),
+        }
+        for row in rows
+        if not row.get("error") and row.get("area_px")
+    ]
+    index_measurements(file_path, measurements, SOURCE_BATCH)
+
+
+class ResultWriter:
+    """Streams result rows to a CSV or JSON Lines file (or stdout)."""
+
+    def __init__(self, path=None, fmt=None):
+        if fmt is None:
+            fmt = "jsonl" if path and path.lower().endswith(".jsonl") else "csv"
+        self.fmt = fmt
+        self._file = open(path, "w", newline="", encoding="utf-8") if path else None
+        stream = self._file or sys.stdout
+        self._stream = stream
+        self._csv = None
+        if fmt == "csv":
+            self._csv = csv.DictWriter(
+                stream, fieldnames=RESULT_FIELDS, extrasaction="ignore"
+            )
+            self._csv.writeheader()
+
+    def write(self, row):
+        if self._csv is not None:
+            self._csv.writerow(row)
+        else:
+            self._stream.write(json.dumps(row) + "\n")
+        self._stream.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="sem_view batch",
+        description="Run auto-area analysis over many SEM TIFF files.",
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="Folders, files or glob patterns to process"
+    )
+    parser.add_argument(
+        "--roi", help="JSON file with ROI polygons (list, or {file name: list})"
+    )
+    parser.add_argument(
+        "--embedded",
+        action="store_true",
+        help="Use the area annotations stored in each file's ImageDescription",
+    )
+    parser.add_argument("--output", "-o", help="Output .csv or .jsonl (default stdout)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Output format")
+    parser.add_argument("--page", type=int, default=0, help="Page to analyze")
+    parser.add_argument(
+        "--threshold",
+        choices=["otsu", "li", "triangle"],
+        default="otsu",
+        help="Threshold method for the ROI pixels",
+    )
+    # The engines registered in utils.segmentation; listed here so parsing
+    # arguments does not import scikit-image
+    parser.add_argument(
+        "--engine",
+        choices=["threshold", "local", "flood", "watershed"],
+        default="threshold",
+        help="Segmentation engine",
+    )
+    parser.add_argument(
+        "--all-features",
+        action="store_true",
+        help="Report every feature in each ROI, not only the largest",
+    )
+    parser.add_argument(
+        "--min-pixels",
+        type=int,
+        default=None,
+        help="Smallest feature reported with --all-features (default: 25)",
+    )
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help="Record the measured areas in each folder's annotation index",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes (default: CPU count, 0: run in this process)",
+    )
+    return parser
+
+
+def run(args):
+    """Processes the files selected by parsed `args`. Returns an exit code."""
+    files = collect_files(args.inputs)
+    if not files:
+        print("No TIFF files found.", file=sys.stderr)
+        return 1
+
+    default_rois, file_rois = [], {}
+    if args.roi:
+        default_rois, file_rois = load_roi_file(args.roi)
+    if not args.roi and not args.embedded:
+        print("No ROI source given; use --roi and/or --embedded.", file=sys.stderr)
+        return 1
+
+    def task_args(file_path):
+        rois = file_rois.get(os.path.basename(file_path), default_rois)
+        return (
+            file_path,
+            rois,
+            args.embedded,
+            args.page,
+            args.threshold,
+            args.engine,
+            args.all_features,
+            args.min_pixels,
+        )
+
+    writer = ResultWriter(args.output, args.format)
+
+    def write_rows(file_path, rows):
+        for row in rows:
+            writer.write(row)
+        if args.index and not any(row.get("error") for row in rows):
+            index_rows(file_path, rows)
+
+    try:
+        if args.workers == 0:
+            for file_path in files:
+                write_rows(file_path, process_file(*task_args(file_path)))
+        else:
+            with ProcessPoolExecutor(max_workers=args.workers) as executor:
+                futures = {
+                    executor.submit(process_file, *task_args(f)): f for f in files
+                }
+                for future in as_completed(futures):
+                    write_rows(futures[future], future.result())
+    finally:
+        writer.close()
+    return 0
+
+
+def main(argv=None):
+    return run(build_parser().parse_args(argv))
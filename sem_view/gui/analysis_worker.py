@@ -0,0 +1,124 @@
+"""
+Background execution of image analysis for the SEM Viewer.
+
+This module provides the AnalysisRunner class, which runs analysis functions
+on a thread pool so the GUI stays responsive. Only the most recent request is
+kept: submitting a new one cancels the previous, and results of superseded
+requests are never delivered.
+"""
+
+import threading
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+from ..utils.analysis import AnalysisCancelled
+
+
+class _AnalysisSignals(QObject):
+    progress = Signal(int, float, str)
+    finished = Signal(int, object)
+    failed = Signal(int, str)
+
+
+class _AnalysisTask(QRunnable):
+    def __init__(self, request_id, func, args, kwargs, cancel_event, signals):
+        super().__init__()
+        self.request_id = request_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.cancel_event = cancel_event
+        self.signals = signals
+
+    def _progress(self, fraction, message):
+        if self.cancel_event.is_set():
+            raise AnalysisCancelled()
+        self.signals.progress.emit(self.request_id, fraction, message)
+
+    def run(self):
+        try:
+            result = self.func(*self.args, progress=self._progress, **self.kwargs)
+        except AnalysisCancelled:
+            return
+        except Exception as e:
+            self.signals.failed.emit(self.request_id, str(e))
+            return
+        self.signals.finished.emit(self.request_id, result)
+
+
+class AnalysisRunner(QObject):
+    """
+    Runs one analysis at a time off the GUI thread.
+
+    Requests are serialized, so successive requests may share state (such
+    as an OverlapSegmentation) as long as only the worker mutates it.
+
+    The function passed to `submit` must accept a `progress` keyword
+    argument and call it between stages; cancellation is delivered by that
+    callback raising AnalysisCancelled.
+
+    Signals (all carry the request id returned by `submit`):
+        progress(int, float, str): Fraction done and stage description.
+        finished(int, object): The function's return value.
+        failed(int, str): Error message if the function raised.
+    """
+
+    progress = Signal(int, float, str)
+    finished = Signal(int, object)
+    failed = Signal(int, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        # Requests run one after another, so a superseded request has stopped
+        # before the next one starts
+        self.pool.setMaxThreadCount(1)
+        self.request_id = 0
+        self._cancel_event = None
+        self._signals = _AnalysisSignals()
+        self._signals.progress.connect(self._on_progress)
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+
+    @property
+    def busy(self):
+        return self._cancel_event is not None
+
+    def submit(self, func, *args, **kwargs):
+        """Starts `func(*args, **kwargs)`, superseding any running request."""
+        self.cancel()
+        self.request_id += 1
+        self._cancel_event = threading.Event()
+        self.pool.start(
+            _AnalysisTask(
+                self.request_id, func, args, kwargs, self._cancel_event, self._signals
+            )
+        )
+        return self.request_id
+
+    def cancel(self):
+        """Cancels the current request; its result will not be delivered."""
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+            self._cancel_event = None
+
+    def shutdown(self):
+        self.cancel()
+        self.pool.waitForDone()
+
+    def _is_current(self, request_id):
+        return request_id == self.request_id and self._cancel_event is not None
+
+    def _on_progress(self, request_id, fraction, message):
+        if self._is_current(request_id):
+            self.progress.emit(request_id, fraction, message)
+
+    def _on_finished(self, request_id, result):
+        if self._is_current(request_id):
+            self._cancel_event = None
+            self.finished.emit(request_id, result)
+
+    def _on_failed(self, request_id, message):
+        if self._is_current(request_id):
+            self._cancel_event = None
+            self.failed.emit(request_id, message)
@@ -6,6 +6,8 @@ user interactions (zooming, panning, measuring), as well as custom QGraphicsItem
 classes for drawing measurements and annotations.
 """
 
+from contextlib import contextmanager
+
 from PySide6.QtWidgets import (
     QGraphicsView,
     QGraphicsScene,
@@ -13,16 +15,53 @@ from PySide6.QtWidgets import (
     QGraphicsTextItem,
     QGraphicsItem,
     QGraphicsPolygonItem,
+    QGraphicsPixmapItem,
+)
+from PySide6.QtCore import (
+    Qt,
+    QPointF,
+    QLineF,
+    QRectF,
+    Signal,
+    QByteArray,
+    QDataStream,
+)
+from PySide6.QtGui import (
+    QBrush,
+    QPen,
+    QColor,
+    QFont,
+    QImage,
+    QPainter,
+    QPolygonF,
+    QPixmap,
 )
-from PySide6.QtCore import Qt, QPointF, QLineF, Signal
-from PySide6.QtGui import QPen, QColor, QFont, QPainter, QPolygonF
+import numpy as np
+from .tiled_image import TiledImageItem, array_to_qimage
+from ..utils.measurements import DISTANCE, Measurement
+from ..utils.tiff_writer import TILE_SIZE
+
+
+def array_to_polygon(points):
+    """
+    Converts an (N, 2) array of (x, y) vertices to a QPolygonF.
+
+    The vertices are deserialized from QDataStream's QPolygonF layout (a
+    big-endian count followed by big-endian double pairs), which avoids
+    creating a QPointF per vertex.
+    """
+    points = np.asarray(points, dtype=">f8").reshape(-1, 2)
+    header = np.array([len(points)], dtype=">u4")
+    polygon = QPolygonF()
+    QDataStream(QByteArray(header.tobytes() + points.tobytes())) >> polygon
+    return polygon
 
 
 class MeasurementItem:
-    def __init__(self, graphics_item, text_item, data):
+    def __init__(self, graphics_item, text_item, measurement):
         self.graphics_item = graphics_item
         self.text_item = text_item
-        self.data = data  # Store points or other data
+        self.measurement = measurement  # The Measurement drawn by the items
 
 
 class ImageCanvas(QGraphicsView):
@@ -32,9 +71,15 @@ class ImageCanvas(QGraphicsView):
     MODE_AUTO_AREA = 2
     MODE_AUTO_AREA_ADD = 3
     MODE_AUTO_AREA_TRIM = 4
+    MODE_AUTO_AREA_SEED = 5
+
+    # Images with more pixels than this are drawn as pyramid tiles, which
+    # also keeps window/level changes proportional to the visible tiles
+    TILED_THRESHOLD = 2048 * 2048
 
     auto_area_requested = Signal(list)
     auto_area_refine_requested = Signal(int, list)
+    auto_area_seed_requested = Signal(QPointF)
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -48,6 +93,7 @@ class ImageCanvas(QGraphicsView):
         self.setMouseTracking(True)
 
         self.pixmap_item = None
+        self.display = None  # DisplayCache of the shown page, if any
         self.pixel_scale = None  # meters per pixel
 
         self.mode = self.MODE_MEASURE
@@ -80,6 +126,12 @@ class ImageCanvas(QGraphicsView):
         ]
         self.color_index = 0
 
+        # Shared by every measurement label and, per color, every outline
+        self.label_font = QFont()
+        self.label_font.setBold(True)
+        self.label_font.setPointSize(10)
+        self._styles = {}
+
     def get_next_color(self):
         color = self.colors[self.color_index]
         self.color_index = (self.color_index + 1) % len(self.colors)
@@ -90,43 +142,20 @@ class ImageCanvas(QGraphicsView):
         self.color_index = (self.color_index + 1) % len(self.colors)
 
     def clear_measurements(self):
-        for m in self.measurements:
-            self.scene.removeItem(m.graphics_item)
-            self.scene.removeItem(m.text_item)
+        with self._index_suspended(len(self.measurements) > 1):
+            for m in self.measurements:
+                self.scene.removeItem(m.graphics_item)
+                self.scene.removeItem(m.text_item)
         self.measurements = []
         self.color_index = 0
         self.scene.update()
 
+    def get_measurement_models(self):
+        """Returns the Measurement of every measurement on the canvas."""
+        return [m.measurement for m in self.measurements]
+
     def get_measurements_data(self):
-        data = []
-        for m in self.measurements:
-            text = m.text_item.toPlainText()
-            # Parse text to get value and unit
-            parts = text.split(" ")
-            if len(parts) >= 2:
-                value = parts[0]
-                unit = parts[1]
-
-                item_type = "Unknown"
-                if isinstance(m.graphics_item, QGraphicsLineItem):
-                    item_type = "Distance"
-                    color = m.graphics_item.pen().color().name()
-                elif isinstance(m.graphics_item, QGraphicsPolygonItem):
-                    item_type = "Area"
-                    color = m.graphics_item.pen().color().name()
-                else:
-                    color = "#000000"
-
-                data.append(
-                    {
-                        "type": item_type,
-                        "value": value,
-                        "unit": unit,
-                        "label": text,
-                        "color": color,
-                    }
-                )
-        return data
+        return [m.measurement.to_dict() for m in self.measurements]
 
     def set_mode(self, mode):
         self.mode = mode
@@ -144,59 +173,252 @@ class ImageCanvas(QGraphicsView):
             self.temp_line = None
 
     def set_image(self, pixmap):
+        self._set_image_item(QGraphicsPixmapItem(pixmap))
+
+    def set_image_data(self, data):
+        """
+        Displays a uint8 grayscale (h, w) or RGB (h, w, 3) array.
+
+        Large images are shown through a TiledImageItem so only the visible
+        tiles, at a resolution matching the zoom, are converted and drawn.
+        """
+        height, width = data.shape[:2]
+        if height * width <= self.TILED_THRESHOLD:
+            self.set_image(QPixmap.fromImage(array_to_qimage(data)))
+        else:
+            self._set_image_item(TiledImageItem(data))
+
+    def set_display(self, display, black=None, white=None, gamma=1.0):
+        """
+        Displays a page from its DisplayCache with the given window/level.
+
+        Large 8/16-bit pages keep their raw data in the tile pyramid and are
+        mapped per tile, so later `set_levels` calls only re-map visible tiles.
+        """
+        height, width = display.data.shape[:2]
+        if height * width > self.TILED_THRESHOLD and display.supports_lut:
+            item = TiledImageItem(display.data, lut=display.lut(black, white, gamma))
+            self._set_image_item(item)
+        else:
+            self.set_image_data(display.convert(black, white, gamma))
+        self.display = display
+
+    def set_levels(self, black=None, white=None, gamma=1.0):
+        """Re-maps the displayed page without reloading or re-decoding it."""
+        if self.display is None or self.pixmap_item is None:
+            return
+
+        if isinstance(self.pixmap_item, TiledImageItem):
+            if self.pixmap_item.lut is not None:
+                self.pixmap_item.set_lut(self.display.lut(black, white, gamma))
+            else:
+                self.pixmap_item.set_data(self.display.convert(black, white, gamma))
+        else:
+            data = self.display.convert(black, white, gamma)
+            self.pixmap_item.setPixmap(QPixmap.fromImage(array_to_qimage(data)))
+
+    def _set_image_item(self, item):
         self.scene.clear()
         self.measurements = []
-        self.pixmap_item = self.scene.addPixmap(pixmap)
+        self.display = None
+        self.pixmap_item = item
+        self.scene.addItem(self.pixmap_item)
         self.setSceneRect(self.pixmap_item.boundingRect())
         self.fitInView(self.pixmap_item, Qt.KeepAspectRatio)
 
     def set_scale(self, scale):
         self.pixel_scale = scale
 
+    def _style(self, color):
+        """Returns the (line pen, polygon pen, polygon brush) for `color`."""
+        key = color.rgba()
+        style = self._styles.get(key)
+        if style is None:
+            line_pen = QPen(color)
+            line_pen.setWidthF(2.6)
+            line_pen.setCosmetic(True)
+            polygon_pen = QPen(color)
+            polygon_pen.setWidth(2)
+            polygon_pen.setCosmetic(True)
+            brush = QColor(color)
+            brush.setAlpha(50)
+            style = self._styles[key] = (line_pen, polygon_pen, QBrush(brush))
+        return style
+
+    def _label(self, text, color, pos):
+        text_item = QGraphicsTextItem(text)
+        text_item.setDefaultTextColor(color)
+        text_item.setFont(self.label_font)
+        text_item.setPos(pos)
+        # Keep text the same size on screen at any zoom; Qt applies this at
+        # paint time, so zooming does not touch the labels
+        text_item.setFlag(QGraphicsItem.ItemIgnoresTransformations)
+        return text_item
+
+    def labels(self):
+        """Returns the label items of all measurements."""
+        return [m.text_item for m in self.measurements]
+
+    @contextmanager
+    def labels_scaled(self, scale):
+        """
+        Scales every label by `scale` for the duration of the block.
+
+        Labels ignore the view transform, so rendering the scene at image
+        resolution draws them at their on-screen pixel size. Burn-in export
+        scales them by the inverse zoom to keep their on-screen proportion to
+        the image.
+        """
+        labels = self.labels()
+        for label in labels:
+            label.setScale(scale)
+        try:
+            yield
+        finally:
+            for label in labels:
+                label.setScale(1.0)
+
+    def iter_burn_in_tiles(self, gray_data, label_scale=1.0, tile=TILE_SIZE):
+        """
+        Yields RGB tiles of `gray_data` with the measurements drawn on.
+
+        Tiles come in TIFF order, as from tiff_writer.iter_tiles. Each one
+        renders only the part of the scene it covers, so only the
+        annotations intersecting it are painted and memory stays bounded by
+        the tile size. The image item itself is not drawn.
+
+        Args:
+            gray_data (np.ndarray): uint8 (height, width) page data.
+            label_scale (float): Scale of the labels, see labels_scaled.
+            tile (int): Tile edge length.
+        """
+        height, width = gray_data.shape
+        images = {}  # Reused QImage per tile size
+        image_item = self.pixmap_item
+        if image_item is not None:
+            image_item.setVisible(False)
+        try:
+            with self.labels_scaled(label_scale):
+                for y in range(0, height, tile):
+                    for x in range(0, width, tile):
+                        th, tw = min(tile, height - y), min(tile, width - x)
+                        image = images.get((th, tw))
+                        if image is None:
+                            image = images[th, tw] = QImage(
+                                tw, th, QImage.Format_RGB888
+                            )
+                        pixels = np.frombuffer(image.bits(), dtype=np.uint8)
+                        rgb = pixels.reshape(th, image.bytesPerLine())[:, : tw * 3]
+                        rgb = rgb.reshape(th, tw, 3)
+                        rgb[...] = gray_data[y : y + th, x : x + tw, None]
+
+                        painter = QPainter(image)
+                        try:
+                            painter.setRenderHint(QPainter.Antialiasing)
+                            painter.setRenderHint(QPainter.TextAntialiasing)
+                            self.scene.render(
+                                painter, QRectF(0, 0, tw, th), QRectF(x, y, tw, th)
+                            )
+                        finally:
+                            painter.end()
+                        # The writer may encode tiles after the next is drawn
+                        yield rgb.copy()
+        finally:
+            if image_item is not None:
+                image_item.setVisible(True)
+
+    def _make_item(self, measurement, color):
+        """Builds the MeasurementItem drawing `measurement`, not yet in the scene."""
+        line_pen, polygon_pen, brush = self._style(color)
+        points = measurement.points
+        if measurement.kind == DISTANCE:
+            (x0, y0), (x1, y1) = points.tolist()
+            graphics_item = QGraphicsLineItem(x0, y0, x1, y1)
+            graphics_item.setPen(line_pen)
+            label_pos = QPointF(x1, y1)
+        else:
+            graphics_item = QGraphicsPolygonItem(array_to_polygon(points))
+            graphics_item.setPen(polygon_pen)
+            graphics_item.setBrush(brush)
+            if measurement.pixel_count is not None:
+                graphics_item.setToolTip(
+                    f"Contour: {measurement.value_px:.1f} px²  |  "
+                    f"Mask: {measurement.pixel_count} px"
+                )
+            # Label at the center of the bounding box
+            (x0, y0), (x1, y1) = points.min(axis=0), points.max(axis=0)
+            label_pos = QPointF(float(x0 + x1) / 2, float(y0 + y1) / 2)
+
+        text_item = self._label(measurement.label(), color, label_pos)
+        return MeasurementItem(graphics_item, text_item, measurement)
+
+    def _make_line(self, start_pos, end_pos, color):
+        """Builds a distance MeasurementItem whose items are not yet in the scene."""
+        measurement = Measurement.distance(
+            (start_pos.x(), start_pos.y()),
+            (end_pos.x(), end_pos.y()),
+            self.pixel_scale,
+            color.name(),
+        )
+        return self._make_item(measurement, color)
+
+    def _make_polygon(self, points, color, area_px, pixel_count):
+        """Builds an area MeasurementItem whose items are not yet in the scene."""
+        if not isinstance(points, np.ndarray):
+            points = [(p.x(), p.y()) for p in points]
+        measurement = Measurement.area(
+            points, self.pixel_scale, color.name(), area_px, pixel_count
+        )
+        return self._make_item(measurement, color)
+
+    @contextmanager
+    def _index_suspended(self, suspend=True):
+        """
+        Suspends the scene's item index while many items are added or
+        removed, so it is rebuilt once instead of updated per item.
+        """
+        if not suspend:
+            yield
+            return
+        index_method = self.scene.itemIndexMethod()
+        self.scene.setItemIndexMethod(QGraphicsScene.NoIndex)
+        try:
+            yield
+        finally:
+            self.scene.setItemIndexMethod(index_method)
+
+    def _add_measurements(self, items):
+        """Adds built MeasurementItems to the scene."""
+        with self._index_suspended(len(items) > 1):
+            for m in items:
+                self.scene.addItem(m.graphics_item)
+                self.scene.addItem(m.text_item)
+        self.measurements.extend(items)
+
     def add_measurement_line(self, start_pos, end_pos, color=None):
         if color is None:
             color = self.colors[self.color_index]
             self.color_index = (self.color_index + 1) % len(self.colors)
 
-        line_item = QGraphicsLineItem(QLineF(start_pos, end_pos))
-        pen = QPen(color)
-        pen.setWidthF(2.6)
-        pen.setCosmetic(True)
-        line_item.setPen(pen)
-        self.scene.addItem(line_item)
-
-        # Calculate distance
-        line = line_item.line()
-        length_px = line.length()
-
-        text_content = f"{length_px:.1f} px"
-        if self.pixel_scale:
-            length_m = length_px * self.pixel_scale
-            if length_m < 1e-6:
-                text_content = f"{length_m * 1e9:.2f} nm"
-            elif length_m < 1e-3:
-                text_content = f"{length_m * 1e6:.2f} µm"
-            else:
-                text_content = f"{length_m * 1e3:.2f} mm"
-
-        # Add text annotation
-        text_item = QGraphicsTextItem(text_content)
-        text_item.setDefaultTextColor(color)
-        font = QFont()
-        font.setBold(True)
-        font.setPointSize(10)
-        text_item.setFont(font)
-        text_item.setPos(end_pos)
-        # Scale text to remain readable
-        text_item.setScale(1.0 / self.transform().m11())
-        self.scene.addItem(text_item)
-
-        self.measurements.append(
-            MeasurementItem(line_item, text_item, [start_pos, end_pos])
-        )
-        return line_item
-
-    def add_measurement_polygon(self, points, color=None):
+        m = self._make_line(start_pos, end_pos, color)
+        self._add_measurements([m])
+        return m.graphics_item
+
+    def add_measurement_polygon(
+        self, points, color=None, area_px=None, pixel_count=None
+    ):
+        """
+        Adds an area measurement.
+
+        Args:
+            points: QPointF vertices or an (N, 2) array of (x, y) vertices.
+            color (QColor, optional): Defaults to the next color.
+            area_px (float, optional): Area to report instead of the area of
+                `points`, e.g. that of the full contour a simplified
+                auto-area outline was derived from.
+            pixel_count (int, optional): Segmented mask pixels of an auto-area
+                result, shown in the tooltip and saved with the annotation.
+        """
         if len(points) < 3:
             return None
 
@@ -204,90 +426,61 @@ class ImageCanvas(QGraphicsView):
             color = self.colors[self.color_index]
             self.color_index = (self.color_index + 1) % len(self.colors)
 
-        poly_item = QGraphicsPolygonItem(QPolygonF(points))
-        pen = QPen(color)
-        pen.setWidth(2)
-        pen.setCosmetic(True)
-        poly_item.setPen(pen)
-        brush = QColor(color)
-        brush.setAlpha(50)
-        poly_item.setBrush(brush)
-        self.scene.addItem(poly_item)
-
-        # Calculate Area
-        area_px = 0.0
-        for i in range(len(points)):
-            j = (i + 1) % len(points)
-            area_px += points[i].x() * points[j].y()
-            area_px -= points[j].x() * points[i].y()
-        area_px = abs(area_px) / 2.0
-
-        text_content = f"{area_px:.0f} px²"
-        if self.pixel_scale:
-            area_m2 = area_px * (self.pixel_scale**2)
-            if area_m2 < 1e-12:
-                text_content = f"{area_m2 * 1e18:.2f} nm²"
-            elif area_m2 < 1e-6:
-                text_content = f"{area_m2 * 1e12:.2f} µm²"
-            else:
-                text_content = f"{area_m2 * 1e6:.2f} mm²"
+        m = self._make_polygon(points, color, area_px, pixel_count)
+        self._add_measurements([m])
+        return m.graphics_item
 
-        # Add text annotation at center
-        center = poly_item.boundingRect().center()
-        text_item = QGraphicsTextItem(text_content)
-        text_item.setDefaultTextColor(color)
-        font = QFont()
-        font.setBold(True)
-        font.setPointSize(10)
-        text_item.setFont(font)
-        text_item.setPos(center)
-        text_item.setScale(1.0 / self.transform().m11())
-        self.scene.addItem(text_item)
+    def add_measurement_polygons(self, polygons, color=None):
+        """
+        Adds many area measurements in one color, e.g. every feature of an
+        auto-area result.
+
+        Args:
+            polygons: (points, area_px, pixel_count) tuples, as for
+                add_measurement_polygon; area_px and pixel_count may be None.
+            color (QColor, optional): Defaults to the next color.
+        """
+        if color is None:
+            color = self.colors[self.color_index]
+            self.color_index = (self.color_index + 1) % len(self.colors)
 
-        self.measurements.append(MeasurementItem(poly_item, text_item, points))
-        return poly_item
+        self._add_measurements(
+            [
+                self._make_polygon(points, color, area_px, pixel_count)
+                for points, area_px, pixel_count in polygons
+                if len(points) >= 3
+            ]
+        )
 
     def get_annotations_state(self):
-        state = []
-        for m in self.measurements:
-            item_data = {}
-            if isinstance(m.graphics_item, QGraphicsLineItem):
-                item_data["type"] = "distance"
-                item_data["start"] = [m.data[0].x(), m.data[0].y()]
-                item_data["end"] = [m.data[1].x(), m.data[1].y()]
-                item_data["color"] = m.graphics_item.pen().color().name()
-            elif isinstance(m.graphics_item, QGraphicsPolygonItem):
-                item_data["type"] = "area"
-                item_data["points"] = [[p.x(), p.y()] for p in m.data]
-                item_data["color"] = m.graphics_item.pen().color().name()
-            state.append(item_data)
-        return state
+        return [m.measurement.to_annotation() for m in self.measurements]
 
     def restore_annotations_state(self, state):
         self.clear_measurements()
+
+        # Build every item first and add them in one batch
+        colors = {}
+        items = []
         for item_data in state:
             try:
-                color = QColor(item_data.get("color", "#FFFF00"))
-                if item_data["type"] == "distance":
-                    start = QPointF(item_data["start"][0], item_data["start"][1])
-                    end = QPointF(item_data["end"][0], item_data["end"][1])
-                    self.add_measurement_line(start, end, color)
-                elif item_data["type"] == "area":
-                    points = [QPointF(p[0], p[1]) for p in item_data["points"]]
-                    self.add_measurement_polygon(points, color)
+                measurement = Measurement.from_annotation(item_data, self.pixel_scale)
+                if measurement is None:
+                    continue
+                color = colors.get(measurement.color)
+                if color is None:
+                    color = colors[measurement.color] = QColor(measurement.color)
+                # Normalized like the colors of measurements drawn here
+                measurement.color = color.name()
+                items.append(self._make_item(measurement, color))
             except Exception as e:
                 print(f"Error restoring annotation: {e}")
+        self._add_measurements(items)
 
         # Update color_index based on last measurement to avoid reuse
         if self.measurements:
-            last_item = self.measurements[-1]
-            last_color = None
-            if isinstance(last_item.graphics_item, QGraphicsLineItem):
-                last_color = last_item.graphics_item.pen().color()
-            elif isinstance(last_item.graphics_item, QGraphicsPolygonItem):
-                last_color = last_item.graphics_item.pen().color()
-
-            if last_color:
+            last_color = QColor(self.measurements[-1].measurement.color)
+
+            if last_color.isValid():
                 # Find index in self.colors
                 found = False
                 for i, color in enumerate(self.colors):
@@ -334,6 +527,10 @@ class ImageCanvas(QGraphicsView):
                         # Add permanent measurement
                         self.add_measurement_line(self.start_pos, end_pos)
 
+            elif self.mode == self.MODE_AUTO_AREA_SEED:
+                # One click selects the feature under the cursor
+                self.auto_area_seed_requested.emit(self.mapToScene(event.pos()))
+
             elif self.mode in (
                 self.MODE_POLYGON,
                 self.MODE_AUTO_AREA,
@@ -485,14 +682,10 @@ class ImageCanvas(QGraphicsView):
         else:
             zoom_factor = zoom_out_factor
 
+        # Labels ignore the view transform, so zooming costs nothing per
+        # measurement
         self.scale(zoom_factor, zoom_factor)
 
-        # Adjust text items scale to keep them readable
-        for item in self.scene.items():
-            if isinstance(item, QGraphicsTextItem):
-                # Reset scale and apply inverse of view scale
-                item.setScale(1.0 / self.transform().m11())
-
     def keyPressEvent(self, event):
         if event.key() == Qt.Key_Escape:
             if (
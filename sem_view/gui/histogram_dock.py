@@ -0,0 +1,221 @@
+"""
+Histogram and window/level controls for the SEM Viewer.
+
+This module provides the HistogramWidget class, which draws a page histogram
+with draggable black and white points, and the LevelsDock class, which adds a
+gamma slider and reset button and reports the resulting display mapping.
+"""
+
+import numpy as np
+from PySide6.QtWidgets import (
+    QDockWidget,
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QLabel,
+    QSlider,
+    QPushButton,
+    QSizePolicy,
+)
+from PySide6.QtCore import Qt, Signal, QRectF, QPointF
+from PySide6.QtGui import QPainter, QColor, QPen, QPolygonF
+
+
+class HistogramWidget(QWidget):
+    """
+    Draws a (log-scaled) histogram with black/white point markers.
+
+    The markers are dragged with the left mouse button; `levels_changed`
+    is emitted with the new (black, white) values in data units.
+    """
+
+    levels_changed = Signal(float, float)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(100)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
+        self.setMouseTracking(True)
+
+        self.counts = None
+        self.lo = 0.0
+        self.hi = 1.0
+        self.black = 0.0
+        self.white = 1.0
+        self._polygon = None
+        self._dragging = None  # "black", "white" or None
+
+    def set_histogram(self, counts, lo, hi):
+        self.counts = counts
+        self.lo = float(lo)
+        self.hi = float(hi) if hi > lo else float(lo) + 1.0
+        self._polygon = None
+        self.update()
+
+    def set_levels(self, black, white):
+        self.black = float(black)
+        self.white = float(white)
+        self.update()
+
+    def _to_x(self, value):
+        return (value - self.lo) / (self.hi - self.lo) * self.width()
+
+    def _to_value(self, x):
+        value = self.lo + x / max(self.width(), 1) * (self.hi - self.lo)
+        return min(max(value, self.lo), self.hi)
+
+    def _histogram_polygon(self):
+        # Cached until the histogram or the widget size changes
+        if self._polygon is None and self.counts is not None:
+            width, height = self.width(), self.height()
+            heights = np.log1p(self.counts.astype(np.float64))
+            if heights.max() > 0:
+                heights /= heights.max()
+            xs = np.linspace(0, width, len(heights) + 1)
+            points = [QPointF(0, height)]
+            for i, h in enumerate(heights):
+                y = height - h * (height - 2)
+                points.append(QPointF(xs[i], y))
+                points.append(QPointF(xs[i + 1], y))
+            points.append(QPointF(width, height))
+            self._polygon = QPolygonF(points)
+        return self._polygon
+
+    def resizeEvent(self, event):
+        self._polygon = None
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#202020"))
+
+        polygon = self._histogram_polygon()
+        if polygon is not None:
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor("#A0A0A0"))
+            painter.drawPolygon(polygon)
+
+        # Shade the clipped ranges and draw the markers
+        height = self.height()
+        black_x = self._to_x(self.black)
+        white_x = self._to_x(self.white)
+        shade = QColor(0, 0, 0, 120)
+        painter.fillRect(QRectF(0, 0, max(black_x, 0), height), shade)
+        painter.fillRect(QRectF(white_x, 0, self.width() - white_x, height), shade)
+
+        pen = QPen(QColor("#FFFF00"))
+        pen.setWidth(2)
+        painter.setPen(pen)
+        painter.drawLine(QPointF(black_x, 0), QPointF(black_x, height))
+        painter.drawLine(QPointF(white_x, 0), QPointF(white_x, height))
+        painter.end()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton and self.counts is not None:
+            x = event.position().x()
+            if abs(x - self._to_x(self.black)) <= abs(x - self._to_x(self.white)):
+                self._dragging = "black"
+            else:
+                self._dragging = "white"
+            self._drag_to(x)
+        else:
+            super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self._dragging:
+            self._drag_to(event.position().x())
+        else:
+            super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        self._dragging = None
+        super().mouseReleaseEvent(event)
+
+    def _drag_to(self, x):
+        value = self._to_value(x)
+        if self._dragging == "black":
+            self.black = min(value, self.white)
+        else:
+            self.white = max(value, self.black)
+        self.update()
+        self.levels_changed.emit(self.black, self.white)
+
+
+class LevelsDock(QDockWidget):
+    """
+    Dock with the page histogram, black/white points and gamma.
+
+    Emits `levels_changed(black, white, gamma)` whenever the mapping changes.
+    """
+
+    levels_changed = Signal(float, float, float)
+
+    def __init__(self, parent=None):
+        super().__init__("Levels", parent)
+        self.setAllowedAreas(Qt.RightDockWidgetArea | Qt.LeftDockWidgetArea)
+
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        layout.setContentsMargins(4, 4, 4, 4)
+
+        self.histogram = HistogramWidget()
+        self.histogram.levels_changed.connect(self.on_histogram_levels)
+        layout.addWidget(self.histogram)
+
+        self.range_label = QLabel("")
+        layout.addWidget(self.range_label)
+
+        gamma_layout = QHBoxLayout()
+        gamma_layout.addWidget(QLabel("Gamma"))
+        self.gamma_slider = QSlider(Qt.Horizontal)
+        # Slider position is log2(gamma) * 100, i.e. gamma 0.25 .. 4
+        self.gamma_slider.setRange(-200, 200)
+        self.gamma_slider.setValue(0)
+        self.gamma_slider.valueChanged.connect(self.on_gamma_changed)
+        gamma_layout.addWidget(self.gamma_slider)
+        self.gamma_label = QLabel("1.00")
+        gamma_layout.addWidget(self.gamma_label)
+        layout.addLayout(gamma_layout)
+
+        self.reset_button = QPushButton("Reset")
+        self.reset_button.clicked.connect(lambda: self.reset())
+        layout.addWidget(self.reset_button)
+
+        self.setWidget(widget)
+        self.default_levels = (0.0, 1.0)
+
+    @property
+    def gamma(self):
+        return 2.0 ** (self.gamma_slider.value() / 100.0)
+
+    def levels(self):
+        """Returns the current (black, white, gamma)."""
+        return self.histogram.black, self.histogram.white, self.gamma
+
+    def set_page(self, counts, lo, hi, default_levels):
+        """Shows a new page's histogram and resets the mapping to its defaults."""
+        self.histogram.set_histogram(counts, lo, hi)
+        self.default_levels = default_levels
+        self.reset(emit=False)
+
+    def reset(self, emit=True):
+        self.histogram.set_levels(*self.default_levels)
+        self.gamma_slider.blockSignals(True)
+        self.gamma_slider.setValue(0)
+        self.gamma_slider.blockSignals(False)
+        self.gamma_label.setText("1.00")
+        self._update_label()
+        if emit:
+            self.levels_changed.emit(*self.levels())
+
+    def on_histogram_levels(self, black, white):
+        self._update_label()
+        self.levels_changed.emit(black, white, self.gamma)
+
+    def on_gamma_changed(self, value):
+        self.gamma_label.setText(f"{self.gamma:.2f}")
+        self.levels_changed.emit(*self.levels())
+
+    def _update_label(self):
+        black, white, _ = self.levels()
+        self.range_label.setText(f"Black: {black:.0f}   White: {white:.0f}")
@@ -11,6 +11,7 @@ from PySide6.QtWidgets import (
     QGraphicsView,
     QGraphicsScene,
     QVBoxLayout,
+    QHBoxLayout,
     QWidget,
     QLabel,
     QStatusBar,
@@ -21,36 +22,61 @@ from PySide6.QtWidgets import (
     QListWidgetItem,
     QStyle,
     QCheckBox,
-    QApplication,
+    QComboBox,
+    QDoubleSpinBox,
 )
-from PySide6.QtGui import QAction, QPixmap, QImage, QPainter, QColor
-from PySide6.QtCore import Qt, QSize, QTemporaryDir, QRectF, QPointF
-import tifffile
-import numpy as np
+from PySide6.QtGui import QAction, QPixmap, QColor, QIcon
+from PySide6.QtCore import Qt, QSize, QTemporaryDir, QRectF
 import os
 import shutil
 import json
 from .canvas import ImageCanvas
-from ..utils.metadata_parser import get_pixel_scale, get_metadata_context
+from ..utils.page_store import PageStore
+from ..utils.prefetch import FilePrefetcher
+from ..utils.metadata_parser import read_image_info
+from ..utils.annotation_index import AnnotationIndex, has_index, index_measurements
+from ..utils.measurements import display_units
+from ..utils.annotation_io import (
+    SAVE_IN_PLACE,
+    SAVE_NEW_FILE,
+    SAVE_SIDECAR,
+    write_in_place,
+    write_sidecar,
+)
+from ..utils.tiff_writer import (
+    DEFAULT_COMPRESSION,
+    available_compressions,
+    iter_tiles,
+    write_tiled,
+)
 from .auto_area_control import AutoAreaControl
+from .thumbnail_loader import ThumbnailLoader
+from .histogram_dock import LevelsDock
 
 try:
-    from ..utils.analysis import find_overlap_area
-    from skimage.draw import polygon as draw_polygon
-    from skimage.measure import find_contours
-    from skimage.morphology import binary_closing, binary_opening, disk
+    from ..utils.analysis import (
+        find_features,
+        find_overlap_area,
+        find_seeded_area,
+        OverlapSegmentation,
+    )
+    from .analysis_worker import AnalysisRunner
     AUTO_AREA_AVAILABLE = True
 except ImportError:
     AUTO_AREA_AVAILABLE = False
+    find_features = None
     find_overlap_area = None
-    draw_polygon = None
-    find_contours = None
-    binary_closing = None
-    binary_opening = None
-    disk = None
+    find_seeded_area = None
+    OverlapSegmentation = None
+    AnalysisRunner = None
 
 
 class MainWindow(QMainWindow):
+    # Number of files on each side of the current one to load in the background
+    PREFETCH_COUNT = 2
+    # Upper bound for decoded data held by the prefetch cache
+    PREFETCH_MEMORY_BUDGET = 512 * 1024 * 1024
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("SEM Image Viewer")
@@ -65,6 +91,7 @@ class MainWindow(QMainWindow):
         self.canvas = ImageCanvas()
         self.canvas.auto_area_requested.connect(self.handle_auto_area)
         self.canvas.auto_area_refine_requested.connect(self.handle_auto_area_refine)
+        self.canvas.auto_area_seed_requested.connect(self.handle_auto_area_seed)
         layout.addWidget(self.canvas)
 
         # Auto Area Control
@@ -75,8 +102,18 @@ class MainWindow(QMainWindow):
         self.auto_area_control.hide()
 
         self.current_auto_polygon_points = None  # Store current result for refinement
-        self.current_rough_mask = None  # Store current rough mask for smart refinement
+        self.auto_area_segmentation = None  # Segmentation state for refinement
         self.rough_polygon_item = None  # Store rough polygon to remove later
+        self.current_auto_measurement = None  # Measurement showing the result
+        self.auto_area_context = None  # (kind, color) of the running analysis
+
+        # Auto-area analysis runs off the GUI thread
+        self.analysis_runner = None
+        if AUTO_AREA_AVAILABLE:
+            self.analysis_runner = AnalysisRunner(self)
+            self.analysis_runner.progress.connect(self.on_auto_area_progress)
+            self.analysis_runner.finished.connect(self.on_auto_area_result)
+            self.analysis_runner.failed.connect(self.on_auto_area_failed)
 
         # Status Bar
         self.status_bar = QStatusBar()
@@ -164,6 +201,25 @@ class MainWindow(QMainWindow):
             
         self.toolbar.addAction(self.auto_area_action)
 
+        self.seed_area_action = QAction("Click Area", self)
+        self.seed_area_action.setCheckable(True)
+        if AUTO_AREA_AVAILABLE:
+            self.seed_area_action.setToolTip("Click inside a feature to measure it")
+            self.seed_area_action.triggered.connect(
+                lambda: self.set_mode(ImageCanvas.MODE_AUTO_AREA_SEED)
+            )
+        else:
+            self.seed_area_action.setEnabled(False)
+            self.seed_area_action.setToolTip("Click Area not available in this version")
+        self.toolbar.addAction(self.seed_area_action)
+
+        self.all_features_checkbox = QCheckBox("All Features", self)
+        self.all_features_checkbox.setToolTip(
+            "Checked: Auto Area measures every feature inside the polygon.\nUnchecked: Only the largest feature is measured and can be refined."
+        )
+        self.all_features_checkbox.setEnabled(AUTO_AREA_AVAILABLE)
+        self.toolbar.addWidget(self.all_features_checkbox)
+
         self.clear_action = QAction("Clear", self)
         self.clear_action.setIcon(
             self.style().standardIcon(QStyle.SP_DialogDiscardButton)
@@ -182,6 +238,27 @@ class MainWindow(QMainWindow):
         )
         self.toolbar.addWidget(self.burn_in_checkbox)
 
+        self.save_mode_combo = QComboBox(self)
+        self.save_mode_combo.addItem("New TIFF", SAVE_NEW_FILE)
+        self.save_mode_combo.addItem("Update Original", SAVE_IN_PLACE)
+        self.save_mode_combo.addItem("Sidecar File", SAVE_SIDECAR)
+        self.save_mode_combo.setToolTip(
+            "New TIFF: Save an 8-bit copy of page 0 with the annotations.\nUpdate Original: Store the annotations in the open file's metadata; its pages are not rewritten.\nSidecar File: Store the annotations in a .annotations.json file next to the open file."
+        )
+        self.toolbar.addWidget(self.save_mode_combo)
+
+        self.compression_combo = QComboBox(self)
+        self.compression_combo.addItems(available_compressions())
+        self.compression_combo.setCurrentText(DEFAULT_COMPRESSION)
+        self.compression_combo.setToolTip("Lossless compression of saved images")
+        self.toolbar.addWidget(self.compression_combo)
+
+        self.index_checkbox = QCheckBox("Index Measurements", self)
+        self.index_checkbox.setToolTip(
+            "Checked: Saved measurements are also recorded in the folder's annotation index, so the File Browser can filter by them."
+        )
+        self.toolbar.addWidget(self.index_checkbox)
+
         self.toolbar.addSeparator()
 
         self.toolbar.addSeparator()
@@ -234,20 +311,64 @@ class MainWindow(QMainWindow):
         self.metadata_dock.setWidget(self.metadata_widget)
         self.addDockWidget(Qt.RightDockWidgetArea, self.metadata_dock)
 
+        # Levels (Histogram) Dock
+        self.levels_dock = LevelsDock(self)
+        self.levels_dock.levels_changed.connect(self.on_levels_changed)
+        self.addDockWidget(Qt.RightDockWidgetArea, self.levels_dock)
+
         # File Browser Dock
         self.file_dock = QDockWidget("File Browser", self)
         self.file_dock.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
+        self.file_widget = QWidget()
+        self.file_layout = QVBoxLayout(self.file_widget)
+        self.file_layout.setContentsMargins(0, 0, 0, 0)
+
+        self.thumbnails_checkbox = QCheckBox("Show Thumbnails")
+        self.thumbnails_checkbox.setChecked(False)
+        self.thumbnails_checkbox.toggled.connect(self.toggle_thumbnails)
+        self.file_layout.addWidget(self.thumbnails_checkbox)
+
+        # Filter by measurements in the folder's annotation index
+        filter_layout = QHBoxLayout()
+        self.filter_kind_combo = QComboBox()
+        self.filter_kind_combo.addItem("All Files", None)
+        self.filter_kind_combo.addItem("Area ≥", "area")
+        self.filter_kind_combo.addItem("Distance ≥", "distance")
+        self.filter_kind_combo.currentIndexChanged.connect(self.on_filter_kind_changed)
+        filter_layout.addWidget(self.filter_kind_combo)
+        self.filter_value_spin = QDoubleSpinBox()
+        self.filter_value_spin.setRange(0, 1e6)
+        self.filter_value_spin.setDecimals(3)
+        self.filter_value_spin.setEnabled(False)
+        self.filter_value_spin.valueChanged.connect(self.apply_file_filter)
+        filter_layout.addWidget(self.filter_value_spin)
+        self.filter_unit_combo = QComboBox()
+        self.filter_unit_combo.setEnabled(False)
+        self.filter_unit_combo.currentIndexChanged.connect(self.apply_file_filter)
+        filter_layout.addWidget(self.filter_unit_combo)
+        self.file_layout.addLayout(filter_layout)
+
         self.file_list = QListWidget()
-        self.file_list.itemClicked.connect(self.load_file_from_list)
-        self.file_dock.setWidget(self.file_list)
+        self.file_list.currentItemChanged.connect(self.on_file_selection_changed)
+        self.file_layout.addWidget(self.file_list)
+
+        self.file_dock.setWidget(self.file_widget)
         self.addDockWidget(Qt.LeftDockWidgetArea, self.file_dock)
         self.file_dock.hide()  # Hide initially
 
         self.current_file_path = None
         self.original_image_data = None
         self.image_pages = []
+        self.current_image_info = None
         self.current_page_index = 0
         self.current_annotations = None
+        self.display_levels = (None, None, 1.0)  # black, white, gamma
+
+        self.prefetcher = FilePrefetcher(memory_budget=self.PREFETCH_MEMORY_BUDGET)
+
+        self.thumbnail_loader = ThumbnailLoader(parent=self)
+        self.thumbnail_loader.thumbnail_ready.connect(self.on_thumbnail_ready)
+        self.file_items = {}  # file path -> QListWidgetItem
 
         # Temporary Directory (auto-cleaned)
         self.temp_dir = QTemporaryDir()
@@ -260,6 +381,7 @@ class MainWindow(QMainWindow):
             self.measure_action.setChecked(True)
             self.polygon_action.setChecked(False)
             self.auto_area_action.setChecked(False)
+            self.seed_area_action.setChecked(False)
             self.status_bar.showMessage(
                 "📏 Click start ➜ Click end  |  🖱️ Middle-drag to pan"
             )
@@ -267,6 +389,7 @@ class MainWindow(QMainWindow):
             self.measure_action.setChecked(False)
             self.polygon_action.setChecked(True)
             self.auto_area_action.setChecked(False)
+            self.seed_area_action.setChecked(False)
             self.status_bar.showMessage(
                 "⬠ Click to add points  |  Right-click to finish  |  🖱️ Middle-drag to pan"
             )
@@ -274,9 +397,18 @@ class MainWindow(QMainWindow):
             self.measure_action.setChecked(False)
             self.polygon_action.setChecked(False)
             self.auto_area_action.setChecked(True)
+            self.seed_area_action.setChecked(False)
             self.status_bar.showMessage(
                 "✨ Draw rough polygon around overlap  |  Right-click to finish"
             )
+        elif mode == ImageCanvas.MODE_AUTO_AREA_SEED:
+            self.measure_action.setChecked(False)
+            self.polygon_action.setChecked(False)
+            self.auto_area_action.setChecked(False)
+            self.seed_area_action.setChecked(True)
+            self.status_bar.showMessage(
+                "✨ Click inside a feature to measure it  |  🖱️ Middle-drag to pan"
+            )
 
     def open_file(self):
         file_path, _ = QFileDialog.getOpenFileName(
@@ -297,7 +429,10 @@ class MainWindow(QMainWindow):
             self.file_dock.show()
 
     def populate_file_list(self, folder_path):
+        self.prefetcher.cancel()
+        self.thumbnail_loader.cancel()
         self.file_list.clear()
+        self.file_items = {}
         self.current_folder = folder_path
 
         # Find TIFF files
@@ -313,20 +448,102 @@ class MainWindow(QMainWindow):
         for f in files:
             item = QListWidgetItem(f)
             self.file_list.addItem(item)
+            self.file_items[os.path.join(folder_path, f)] = item
 
         self.status_bar.showMessage(f"Found {len(files)} images in {folder_path}")
+        self.apply_file_filter()
+
+        if self.thumbnails_checkbox.isChecked():
+            self.thumbnail_loader.request(list(self.file_items))
+
+    def on_filter_kind_changed(self):
+        """Offers the nm/µm/mm units of the selected measurement kind."""
+        kind = self.filter_kind_combo.currentData()
+        # Keep the chosen scale (e.g. nm -> nm²); µm by default
+        index = self.filter_unit_combo.currentIndex()
+        self.filter_unit_combo.blockSignals(True)
+        self.filter_unit_combo.clear()
+        if kind is not None:
+            for unit, factor in display_units(kind):
+                self.filter_unit_combo.addItem(unit, factor)
+            self.filter_unit_combo.setCurrentIndex(index if index >= 0 else 1)
+        self.filter_unit_combo.blockSignals(False)
+        self.apply_file_filter()
+
+    def apply_file_filter(self):
+        """
+        Shows only the files with a measurement matching the filter, looked
+        up in the folder's annotation index without opening the TIFFs.
+        """
+        kind = self.filter_kind_combo.currentData()
+        self.filter_value_spin.setEnabled(kind is not None)
+        self.filter_unit_combo.setEnabled(kind is not None)
+
+        folder = getattr(self, "current_folder", None)
+        matches = None
+        if kind is not None and folder:
+            matches = set()
+            if has_index(folder):
+                # Index values are in meters or square meters
+                factor = self.filter_unit_combo.currentData()
+                value = self.filter_value_spin.value() / factor
+                with AnnotationIndex(folder) as index:
+                    matches.update(index.find_files(kind, min_value=value))
+                self.status_bar.showMessage(f"{len(matches)} matching images")
+            else:
+                self.status_bar.showMessage("No annotation index in this folder.")
+
+        for file_path, item in self.file_items.items():
+            item.setHidden(
+                matches is not None and os.path.basename(file_path) not in matches
+            )
+
+    def toggle_thumbnails(self, enabled):
+        if enabled:
+            self.file_list.setViewMode(QListWidget.IconMode)
+            self.file_list.setIconSize(QSize(128, 128))
+            self.file_list.setResizeMode(QListWidget.Adjust)
+            self.file_list.setWordWrap(True)
+            self.thumbnail_loader.request(list(self.file_items))
+        else:
+            self.thumbnail_loader.cancel()
+            self.file_list.setViewMode(QListWidget.ListMode)
+            self.file_list.setIconSize(QSize())
+            for item in self.file_items.values():
+                item.setIcon(QIcon())
+
+    def on_thumbnail_ready(self, file_path, icon):
+        item = self.file_items.get(file_path)
+        if item is not None:
+            item.setIcon(icon)
+
+    def on_file_selection_changed(self, current, previous):
+        # Also fires for arrow-key navigation; skip the file already shown
+        if current is None or not self.current_folder:
+            return
+        file_path = os.path.join(self.current_folder, current.text())
+        if file_path != self.current_file_path:
+            self.load_image(file_path)
 
-    def load_file_from_list(self, item):
-        if not hasattr(self, "current_folder"):
+    def schedule_prefetch(self):
+        """Loads the files next to the current one in the background."""
+        row = self.file_list.currentRow()
+        if row < 0 or not self.current_folder:
             return
 
-        file_name = item.text()
-        file_path = os.path.join(self.current_folder, file_name)
-        self.load_image(file_path)
+        paths = []
+        for offset in range(1, self.PREFETCH_COUNT + 1):
+            # Next files first; browsing forward is the common case
+            for neighbor in (row + offset, row - offset):
+                if 0 <= neighbor < self.file_list.count():
+                    name = self.file_list.item(neighbor).text()
+                    paths.append(os.path.join(self.current_folder, name))
+        self.prefetcher.prefetch(paths)
 
     def load_image(self, file_path):
         try:
             self.current_file_path = file_path
+            self.cancel_auto_area_analysis()
 
             # Auto-open folder if needed
             folder_path = os.path.dirname(file_path)
@@ -340,78 +557,63 @@ class MainWindow(QMainWindow):
             if items:
                 self.file_list.setCurrentItem(items[0])
 
-            # Load image data
-            with tifffile.TiffFile(file_path) as tif:
-                # Load all pages
-                self.image_pages = []
-                for page in tif.pages:
-                    data = page.asarray()
-
-                    # Check for palette (colormap)
-                    if page.colormap is not None:
-                        # Colormap is typically (3, 2**bps)
-                        # We need to transpose it to (N, 3) for indexing
-                        palette = np.array(page.colormap).T
-
-                        # Normalize to 8-bit if necessary (often 16-bit in TIFF)
-                        if palette.max() > 255:
-                            palette = (palette / 256).astype(np.uint8)
-                        else:
-                            palette = palette.astype(np.uint8)
-
-                        # Apply palette to indices
-                        # data contains indices, we map them to RGB
-                        if data.ndim == 2:
-                            rgb_data = palette[data]
-                            self.image_pages.append(rgb_data)
-                        else:
-                            # Fallback if dimensions are unexpected
-                            self.image_pages.append(data)
-                    else:
-                        self.image_pages.append(data)
-
-                self.current_page_index = 0
-
-                # Handle metadata (from first page)
-                pixel_scale = get_pixel_scale(file_path)
-                self.canvas.set_scale(pixel_scale)
-                if pixel_scale:
-                    self.scale_label.setText(f"Scale: {pixel_scale * 1e9:.2f} nm/px")
-                else:
-                    self.scale_label.setText("Scale: Unknown")
+            # Use the background-loaded file if available, otherwise open it
+            # lazily; only the displayed page gets decoded
+            prefetched = self.prefetcher.take(file_path)
+            if prefetched is not None:
+                store = prefetched.store
+                info = prefetched.info
+            else:
+                store = PageStore(file_path)
+                # Parse all metadata from the already open handle
+                info = read_image_info(file_path, tif=store.tif)
+
+            if isinstance(self.image_pages, PageStore):
+                self.image_pages.close()
+            self.image_pages = store
+            self.current_page_index = 0
+            self.current_image_info = info
+
+            # Handle metadata (from first page)
+            pixel_scale = info.pixel_scale
+            self.canvas.set_scale(pixel_scale)
+            if pixel_scale:
+                self.scale_label.setText(f"Scale: {pixel_scale * 1e9:.2f} nm/px")
+            else:
+                self.scale_label.setText("Scale: Unknown")
 
-                # Context
-                context = get_metadata_context(file_path)
-                self.display_context(context)
+            # Context
+            context = dict(info.context)
+            self.display_context(context)
 
-                # Store annotations if present
-                if "Annotations" in context:
-                    self.current_annotations = context["Annotations"]
-                else:
-                    self.current_annotations = None
-
-                # Check if burnt-in
-                is_burnt_in = context.get("is_burnt_in", False)
-                if is_burnt_in:
-                    self.show_annotations_checkbox.setChecked(True)
-                    self.show_annotations_checkbox.setEnabled(False)
-                    self.show_annotations_checkbox.setText(
-                        "Show Annotations (Burnt-in)"
-                    )
-                    # Don't restore vectors if burnt-in to avoid duplicates
-                    self.current_annotations = None
-                else:
-                    self.show_annotations_checkbox.setEnabled(True)
-                    self.show_annotations_checkbox.setText("Show Annotations")
-                    # Restore visibility state
-                    # Default to checked for now, or maybe remember last state?
-                    # Let's keep it checked by default for active elements
-                    self.show_annotations_checkbox.setChecked(True)
+            # Store annotations if present
+            if "Annotations" in context:
+                self.current_annotations = context["Annotations"]
+            else:
+                self.current_annotations = None
+
+            # Check if burnt-in
+            is_burnt_in = context.get("is_burnt_in", False)
+            if is_burnt_in:
+                self.show_annotations_checkbox.setChecked(True)
+                self.show_annotations_checkbox.setEnabled(False)
+                self.show_annotations_checkbox.setText("Show Annotations (Burnt-in)")
+                # Don't restore vectors if burnt-in to avoid duplicates
+                self.current_annotations = None
+            else:
+                self.show_annotations_checkbox.setEnabled(True)
+                self.show_annotations_checkbox.setText("Show Annotations")
+                # Restore visibility state
+                # Default to checked for now, or maybe remember last state?
+                # Let's keep it checked by default for active elements
+                self.show_annotations_checkbox.setChecked(True)
 
             self.update_page_controls()
             self.display_current_page()
             self.status_bar.showMessage(f"Loaded: {file_path}")
 
+            self.schedule_prefetch()
+
         except Exception as e:
             self.status_bar.showMessage(f"Error loading file: {str(e)}")
             print(f"Error: {e}")
@@ -420,44 +622,34 @@ class MainWindow(QMainWindow):
         if not self.image_pages:
             return
 
-        image_data = self.image_pages[self.current_page_index]
+        # The canvas is about to be cleared; drop any analysis of the old page
+        if self.auto_area_segmentation is not None:
+            self.on_auto_area_finish()
+        else:
+            self.cancel_auto_area_analysis()
+
+        # 8-bit conversion is cached with the page, so revisiting is free
+        display = self.image_pages.display_cache(self.current_page_index)
+        image_data = display.data
 
-        # Normalize and convert to QImage
-        if image_data.ndim == 2:
-            height, width = image_data.shape
-
-            # Normalize to 8-bit
-            if image_data.dtype != np.uint8:
-                image_data = image_data.astype(np.float32)
-                image_data = (
-                    (image_data - image_data.min())
-                    / (image_data.max() - image_data.min())
-                    * 255
-                )
-                image_data = image_data.astype(np.uint8)
-
-            bytes_per_line = width
-            q_image = QImage(
-                image_data.data, width, height, bytes_per_line, QImage.Format_Grayscale8
+        if image_data.ndim == 2 or (image_data.ndim == 3 and image_data.shape[2] == 3):
+            self.display_levels = (None, None, 1.0)
+            self.canvas.set_display(display)
+
+            counts, edges = display.histogram()
+            self.levels_dock.set_page(
+                counts, edges[0], edges[-1], display.default_levels()
             )
-            pixmap = QPixmap.fromImage(q_image)
-
-            self.canvas.set_image(pixmap)
-        elif image_data.ndim == 3:
-            # Handle RGB if loaded
-            height, width, channels = image_data.shape
-            if channels == 3:
-                bytes_per_line = width * 3
-                q_image = QImage(
-                    image_data.data, width, height, bytes_per_line, QImage.Format_RGB888
-                )
-                pixmap = QPixmap.fromImage(q_image)
-                self.canvas.set_image(pixmap)
 
         # Restore annotations if we are on Page 0 and have them
         if self.current_page_index == 0 and self.current_annotations:
             self.canvas.restore_annotations_state(self.current_annotations)
 
+    def on_levels_changed(self, black, white, gamma):
+        # Only the LUT and the visible pixels are updated; nothing is re-decoded
+        self.display_levels = (black, white, gamma)
+        self.canvas.set_levels(black, white, gamma)
+
     def update_page_controls(self):
         num_pages = len(self.image_pages)
         self.page_label.setText(f" Page {self.current_page_index + 1}/{num_pages} ")
@@ -513,6 +705,11 @@ class MainWindow(QMainWindow):
         if not self.current_file_path or not self.image_pages:
             return
 
+        save_mode = self.save_mode_combo.currentData()
+        if save_mode != SAVE_NEW_FILE:
+            self.save_annotations_with_original(save_mode)
+            return
+
         file_path, _ = QFileDialog.getSaveFileName(
             self, "Save Annotated Image", "", "TIFF Files (*.tif)"
         )
@@ -522,49 +719,24 @@ class MainWindow(QMainWindow):
         try:
             # Use the currently displayed page (or the first page?) as the base for annotation
             # Usually we annotate the main image (page 0)
-            original_data = self.image_pages[0]  # Assume page 0 is the one we annotate
-
-            # Create a QImage from the original data to render annotations on
-            # Convert grayscale to RGB
-            if original_data.dtype == np.uint8:
-                gray_data = original_data
-            else:
-                # Normalize if not uint8
-                d = original_data.astype(np.float32)
-                gray_data = ((d - d.min()) / (d.max() - d.min()) * 255).astype(np.uint8)
+            # Reuse the cached 8-bit conversion of page 0
+            # (with the current levels if page 0 is the one on screen)
+            levels = (None, None, 1.0)
+            if self.current_page_index == 0:
+                levels = self.display_levels
+            gray_data = self.image_pages.display(0, *levels)
 
             height, width = gray_data.shape
 
-            # Ensure contiguous array for QImage
-            if not gray_data.flags["C_CONTIGUOUS"]:
-                gray_data = np.ascontiguousarray(gray_data)
-
             # Prepare Page 0 Data
             if self.burn_in_checkbox.isChecked():
-                # Burn-in Mode: Render annotations onto image
-                # Create RGB image (Format_RGB888)
-                rgb_data = np.stack((gray_data,) * 3, axis=-1)
-                q_img = QImage(
-                    rgb_data.data, width, height, width * 3, QImage.Format_RGB888
-                )
-
-                annotated_q_img = q_img.copy()
-
-                painter = QPainter(annotated_q_img)
-                try:
-                    painter.setRenderHint(QPainter.Antialiasing)
-                    painter.setRenderHint(QPainter.TextAntialiasing)
-                    painter.setRenderHint(QPainter.SmoothPixmapTransform)
-                    self.canvas.scene.render(painter)
-                finally:
-                    painter.end()
-
-                # Convert back to numpy
-                ptr = annotated_q_img.constBits()
-                stride = annotated_q_img.bytesPerLine()
-                arr = np.array(ptr).reshape(height, stride)
-                arr = arr[:, : width * 3]  # RGB is 3 bytes/pixel
-                page0_data = arr.reshape(height, width, 3)
+                # Burn-in Mode: Render annotations onto image tile by tile,
+                # streamed to the writer, so no full-frame RGB copy is made
+                # Burn labels in at their on-screen size relative to the image
+                zoom = self.canvas.transform().m11()
+                page0_tiles = self.canvas.iter_burn_in_tiles(gray_data, 1.0 / zoom)
+                page0_shape = (height, width, 3)
+                photometric = "rgb"
 
                 # In Burn-in mode, we DO NOT save annotation state (vectors)
                 annotations_state = None
@@ -572,25 +744,21 @@ class MainWindow(QMainWindow):
 
             else:
                 # Active Elements Mode: Save Clean Image
-                # Page 0 is just the RGB version of the raw data (clean)
-                # We save vectors in metadata to restore them.
-                rgb_data = np.stack((gray_data,) * 3, axis=-1)
-                page0_data = rgb_data
+                # Page 0 is the grayscale display data (clean); the vectors
+                # are saved in metadata to restore them.
+                page0_tiles = iter_tiles(gray_data)
+                page0_shape = gray_data.shape
+                photometric = "minisblack"
 
                 annotations_state = self.canvas.get_annotations_state()
                 is_burnt_in = False
 
-            # Extract original metadata (Zeiss tag 34118)
+            # Copy original metadata (Zeiss tag 34118) parsed at load time
             extratags = []
-            with tifffile.TiffFile(self.current_file_path) as tif:
-                page = tif.pages[0]
-                if 34118 in page.tags:
-                    tag = page.tags[34118]
-                    # Read raw bytes
-                    tif.filehandle.seek(tag.valueoffset)
-                    raw_data = tif.filehandle.read(tag.count)
-                    # (code, dtype, count, value, writeonce)
-                    extratags.append((34118, "s", len(raw_data), raw_data, True))
+            raw_data = self.current_image_info.zeiss_raw
+            if raw_data:
+                # (code, dtype, count, value, writeonce)
+                extratags.append((34118, "s", len(raw_data), raw_data, True))
 
             # Prepare description with measurements and annotation state
             measurements = self.canvas.get_measurements_data()
@@ -606,20 +774,62 @@ class MainWindow(QMainWindow):
 
             description_json = json.dumps(description_dict)
 
-            # Save as Single-page TIFF
-            # Page 0: Annotated/Clean RGB (for viewing) - with metadata
-            with tifffile.TiffWriter(file_path) as tif:
-                tif.write(
-                    page0_data,
-                    photometric="rgb",
-                    description=description_json,
-                    extratags=extratags,
-                )
+            # Save as Single-page tiled TIFF, streamed tile by tile
+            # Page 0: Annotated RGB or clean grayscale (for viewing) - with metadata
+            write_tiled(
+                file_path,
+                page0_tiles,
+                page0_shape,
+                gray_data.dtype,
+                photometric=photometric,
+                compression=self.compression_combo.currentText(),
+                description=description_json,
+                extratags=extratags,
+            )
 
             self.status_bar.showMessage(f"Saved: Page 0 to {file_path}")
+            self.index_saved_measurements(file_path, measurements)
+
+        except Exception as e:
+            self.status_bar.showMessage(f"Error saving: {str(e)}")
+
+    def save_annotations_with_original(self, save_mode):
+        """
+        Stores the annotations with the open file, in its ImageDescription
+        or in a sidecar file, keeping its pages and bit depth unchanged.
+        """
+        if self.burn_in_checkbox.isChecked():
+            self.status_bar.showMessage("Burn-in requires saving a new TIFF.")
+            return
 
+        annotations = {
+            "measurements": self.canvas.get_measurements_data(),
+            "is_burnt_in": False,
+            "annotations": self.canvas.get_annotations_state(),
+        }
+        try:
+            if save_mode == SAVE_SIDECAR:
+                path = write_sidecar(self.current_file_path, annotations)
+            else:
+                path = write_in_place(self.current_file_path, annotations)
+            self.status_bar.showMessage(f"Saved annotations to {path}")
         except Exception as e:
             self.status_bar.showMessage(f"Error saving: {str(e)}")
+            return
+        self.index_saved_measurements(
+            self.current_file_path, annotations["measurements"]
+        )
+
+    def index_saved_measurements(self, file_path, measurements):
+        """Records saved measurements in the folder's annotation index, if enabled."""
+        if not self.index_checkbox.isChecked():
+            return
+        try:
+            index_measurements(file_path, measurements)
+        except Exception as e:
+            self.status_bar.showMessage(f"Saved, but indexing failed: {str(e)}")
+            return
+        self.apply_file_filter()
 
     def handle_auto_area(self, points):
         if not self.canvas.pixmap_item:
@@ -627,75 +837,177 @@ class MainWindow(QMainWindow):
 
         # Store rough polygon item to remove it later
         # We grab it before canvas clears it (signal is synchronous)
-        self.rough_polygon_item = self.canvas.current_polygon_item
+        rough_polygon_item = self.canvas.current_polygon_item
 
         # Get color from rough polygon
         rough_color = QColor("#00FF00")  # Default
-        if self.rough_polygon_item:
-            rough_color = self.rough_polygon_item.pen().color()
+        if rough_polygon_item:
+            rough_color = rough_polygon_item.pen().color()
 
         # Get image data
         if not self.image_pages:
             return
 
+        # A new detection supersedes any analysis still running
+        self.cancel_auto_area_analysis()
+        self.rough_polygon_item = rough_polygon_item
+        self.current_auto_measurement = None
+
         image_data = self.image_pages[self.current_page_index]
 
         # Convert points to list of tuples (x, y)
         poly_points = [(p.x(), p.y()) for p in points]
+        histogram = self.image_pages.page_histogram(self.current_page_index)
+
+        if self.all_features_checkbox.isChecked():
+            # Every feature is measured in one pass; there is nothing to refine
+            self.auto_area_control.hide()
+            self.auto_area_control.reset()
+            self.auto_area_segmentation = None
+            self.status_bar.showMessage("Analyzing features...")
+            self.auto_area_context = ("features", rough_color)
+            self.analysis_runner.submit(
+                find_features, image_data, poly_points, histogram=histogram
+            )
+            return
+
+        # The segmentation keeps its masks so refinements can be incremental
+        self.auto_area_segmentation = OverlapSegmentation(
+            image_data, poly_points, histogram=histogram
+        )
 
         self.status_bar.showMessage("Analyzing overlap area...")
-        QApplication.processEvents()  # Force update
+        self.start_auto_area_analysis(("detect", rough_color))
 
-        try:
-            # Generate initial rough mask
-            height, width = image_data.shape[:2]
-            poly_y = [p[1] for p in poly_points]
-            poly_x = [p[0] for p in poly_points]
-            rr, cc = draw_polygon(poly_y, poly_x, shape=(height, width))
-            self.current_rough_mask = np.zeros((height, width), dtype=bool)
-            self.current_rough_mask[rr, cc] = True
-
-            # Run analysis with the mask
-            result_polygon = find_overlap_area(image_data, mask=self.current_rough_mask)
-
-            if result_polygon:
-                # Remove rough polygon now
-                if self.rough_polygon_item:
-                    self.canvas.scene.removeItem(self.rough_polygon_item)
-                    self.rough_polygon_item = None
-
-                # Add to canvas with SAME color
-                # Convert back to QPointF
-                q_points = [QPointF(p[0], p[1]) for p in result_polygon]
-
-                self.canvas.add_measurement_polygon(q_points, color=rough_color)
-                # Consume the color so the next measurement uses a different one
-                self.canvas.consume_current_color()
-
-                self.current_auto_polygon_points = result_polygon
-
-                # Show control
-                self.auto_area_control.show()
-                # Center control on screen or near mouse?
-                # self.auto_area_control.move(...)
-
-                self.status_bar.showMessage(
-                    "Overlap area detected! Use floating window to refine."
-                )
-            else:
-                self.status_bar.showMessage("Could not detect overlap area.")
-                # If failed, maybe keep rough polygon?
-                if self.rough_polygon_item:
-                    self.canvas.scene.removeItem(self.rough_polygon_item)
-                    self.rough_polygon_item = None
+    def handle_auto_area_seed(self, point):
+        if not self.canvas.pixmap_item or not self.image_pages:
+            return
 
-        except Exception as e:
-            self.status_bar.showMessage(f"Analysis error: {str(e)}")
-            print(f"Analysis error: {e}")
+        # A click starts a new measurement; an open polygon session ends
+        if self.auto_area_segmentation is not None:
+            self.auto_area_control.hide()
+            self.auto_area_control.reset()
+            self.auto_area_segmentation = None
+        self.cancel_auto_area_analysis()
+        self.current_auto_measurement = None
+
+        color = self.canvas.colors[self.canvas.color_index]
+        image_data = self.image_pages[self.current_page_index]
+
+        self.status_bar.showMessage("Growing area from click...")
+        self.auto_area_context = ("seed", color)
+        self.analysis_runner.submit(
+            find_seeded_area, image_data, (point.x(), point.y())
+        )
+
+    def start_auto_area_analysis(self, context):
+        """Updates the segmentation in the background; see on_auto_area_result."""
+        self.auto_area_context = context
+        self.analysis_runner.submit(self.auto_area_segmentation.update)
+
+    def cancel_auto_area_analysis(self):
+        if self.analysis_runner is not None:
+            self.analysis_runner.cancel()
+        self.auto_area_context = None
+        if self.rough_polygon_item:
+            if self.rough_polygon_item.scene() is self.canvas.scene:
+                self.canvas.scene.removeItem(self.rough_polygon_item)
+            self.rough_polygon_item = None
+
+    def on_auto_area_progress(self, request_id, fraction, message):
+        self.status_bar.showMessage(
+            f"Analyzing overlap area... {message} ({fraction:.0%})"
+        )
+
+    def on_auto_area_failed(self, request_id, message):
+        kind, _ = self.auto_area_context
+        self.auto_area_context = None
+        if kind != "refine":
+            self.status_bar.showMessage(f"Analysis error: {message}")
+            print(f"Analysis error: {message}")
+            if self.rough_polygon_item:
+                self.canvas.scene.removeItem(self.rough_polygon_item)
+                self.rough_polygon_item = None
+        else:
+            self.status_bar.showMessage(f"Refinement error: {message}")
+            print(f"Refinement error: {message}")
+
+    def on_auto_area_result(self, request_id, result):
+        kind, color = self.auto_area_context
+        self.auto_area_context = None
+        if kind == "detect":
+            self.show_auto_area_result(result, color)
+        elif kind == "seed":
+            self.show_seeded_area(result, color)
+        elif kind == "features":
+            self.show_auto_area_features(result, color)
+        else:
+            self.show_refined_auto_area(result, color)
+
+    def show_auto_area_result(self, result, rough_color):
+        if result is not None:
+            # Remove rough polygon now
             if self.rough_polygon_item:
                 self.canvas.scene.removeItem(self.rough_polygon_item)
                 self.rough_polygon_item = None
 
+            # Add to canvas with SAME color
+            self.canvas.add_measurement_polygon(
+                result.points,
+                color=rough_color,
+                area_px=result.area,
+                pixel_count=result.pixel_count,
+            )
+            self.current_auto_measurement = self.canvas.measurements[-1]
+            # Consume the color so the next measurement uses a different one
+            self.canvas.consume_current_color()
+
+            self.current_auto_polygon_points = result.points
+
+            # Show control
+            self.auto_area_control.show()
+            # Center control on screen or near mouse?
+            # self.auto_area_control.move(...)
+
+            self.status_bar.showMessage(
+                "Overlap area detected! Use floating window to refine."
+            )
+        else:
+            self.status_bar.showMessage("Could not detect overlap area.")
+            # If failed, maybe keep rough polygon?
+            if self.rough_polygon_item:
+                self.canvas.scene.removeItem(self.rough_polygon_item)
+                self.rough_polygon_item = None
+
+    def show_auto_area_features(self, features, color):
+        if self.rough_polygon_item:
+            self.canvas.scene.removeItem(self.rough_polygon_item)
+            self.rough_polygon_item = None
+
+        if not features:
+            self.status_bar.showMessage("Could not detect any features.")
+            return
+
+        self.canvas.add_measurement_polygons(
+            [(f.points, f.area, f.pixel_count) for f in features], color=color
+        )
+        self.canvas.consume_current_color()
+        self.status_bar.showMessage(f"{len(features)} features measured.")
+
+    def show_seeded_area(self, result, color):
+        if result is None:
+            self.status_bar.showMessage("Could not find an area at the click.")
+            return
+
+        self.canvas.add_measurement_polygon(
+            result.points,
+            color=color,
+            area_px=result.area,
+            pixel_count=result.pixel_count,
+        )
+        self.canvas.consume_current_color()
+        self.status_bar.showMessage("Area measured.")
+
     def on_auto_area_add(self):
         self.canvas.set_mode(ImageCanvas.MODE_AUTO_AREA_ADD)
         self.status_bar.showMessage("Draw a region to ADD to the area.")
@@ -705,84 +1017,77 @@ class MainWindow(QMainWindow):
         self.status_bar.showMessage("Draw a region to REMOVE from the area.")
 
     def on_auto_area_finish(self):
+        self.cancel_auto_area_analysis()
         self.auto_area_control.hide()
         self.auto_area_control.reset()
         self.canvas.set_mode(ImageCanvas.MODE_NONE)
         self.current_auto_polygon_points = None
-        self.current_rough_mask = None
+        self.auto_area_segmentation = None
+        self.current_auto_measurement = None
         self.status_bar.showMessage("Auto Area finished.")
 
     def handle_auto_area_refine(self, mode, points):
-        if self.current_rough_mask is None:
+        segmentation = self.auto_area_segmentation
+        if segmentation is None:
             return
 
-        # Get image data
-        if not self.image_pages:
-            return
-
-        image_data = self.image_pages[self.current_page_index]
-        height, width = image_data.shape[:2]
-
-        # Refine mask
-        refine_poly_y = [p.y() for p in points]
-        refine_poly_x = [p.x() for p in points]
-        rr_r, cc_r = draw_polygon(refine_poly_y, refine_poly_x, shape=(height, width))
-        refine_mask = np.zeros((height, width), dtype=bool)
-        refine_mask[rr_r, cc_r] = True
-
-        # Update the rough mask (the search area)
+        # Update the search area; only the region around the edit is
+        # re-segmented
+        refine_points = [(p.x(), p.y()) for p in points]
         if mode == ImageCanvas.MODE_AUTO_AREA_ADD:
-            self.current_rough_mask = self.current_rough_mask | refine_mask
+            segmentation.add(refine_points)
         elif mode == ImageCanvas.MODE_AUTO_AREA_TRIM:
-            self.current_rough_mask = self.current_rough_mask & ~refine_mask
-
-        self.status_bar.showMessage("Re-analyzing with updated area...")
-        QApplication.processEvents()
+            segmentation.trim(refine_points)
 
-        try:
-            # Re-run analysis with updated mask
-            result_polygon = find_overlap_area(image_data, mask=self.current_rough_mask)
-
-            if not result_polygon:
-                self.status_bar.showMessage("Result is empty.")
-                # Could clear the polygon or keep previous?
-                # For now, let's keep previous if empty, or clear.
-                # If we clear, we might lose context.
-                # Let's clear for now as it reflects the "empty" result.
-                if self.canvas.measurements:
-                    last_item = self.canvas.measurements[-1]
-                    self.canvas.scene.removeItem(last_item.graphics_item)
-                    self.canvas.scene.removeItem(last_item.text_item)
-                    self.canvas.measurements.pop()
-                self.current_auto_polygon_points = None
-                return
-
-            # Update canvas
-            # Remove previous result.
-            if self.canvas.measurements:
-                last_item = self.canvas.measurements[-1]
-                # Remove it
-                self.canvas.scene.removeItem(last_item.graphics_item)
-                self.canvas.scene.removeItem(last_item.text_item)
-                self.canvas.measurements.pop()
-
-            # Add new one
-            q_points = [QPointF(p[0], p[1]) for p in result_polygon]
-
-            # Get color from last item or default
+        # The next update applies every queued edit, so a refinement still
+        # running is superseded. A detection still running keeps its context
+        # (and rough polygon) since its result has not been shown yet.
+        context = self.auto_area_context
+        if context is None or context[0] == "refine":
             color = QColor("#00FF00")
-            if "last_item" in locals() and last_item:
-                color = last_item.graphics_item.pen().color()
+            if self.current_auto_measurement is not None:
+                color = self.current_auto_measurement.graphics_item.pen().color()
+            context = ("refine", color)
+
+        self.status_bar.showMessage("Re-analyzing with updated area...")
+        self.start_auto_area_analysis(context)
 
-            # Reuse the color since we are refining the same measurement
-            self.canvas.add_measurement_polygon(q_points, color=color)
-            self.current_auto_polygon_points = result_polygon
+    def remove_auto_area_measurement(self):
+        item = self.current_auto_measurement
+        self.current_auto_measurement = None
+        if item is None or item not in self.canvas.measurements:
+            return
+        self.canvas.scene.removeItem(item.graphics_item)
+        self.canvas.scene.removeItem(item.text_item)
+        self.canvas.measurements.remove(item)
+
+    def show_refined_auto_area(self, result, color):
+        # Remove previous result
+        self.remove_auto_area_measurement()
+
+        if result is None:
+            # Clear the polygon as it reflects the "empty" result
+            self.status_bar.showMessage("Result is empty.")
+            self.current_auto_polygon_points = None
+            return
 
-            self.status_bar.showMessage("Area updated.")
+        # Reuse the color since we are refining the same measurement
+        self.canvas.add_measurement_polygon(
+            result.points,
+            color=color,
+            area_px=result.area,
+            pixel_count=result.pixel_count,
+        )
+        self.current_auto_measurement = self.canvas.measurements[-1]
+        self.current_auto_polygon_points = result.points
 
-        except Exception as e:
-            self.status_bar.showMessage(f"Refinement error: {str(e)}")
-            print(f"Refinement error: {e}")
+        self.status_bar.showMessage("Area updated.")
 
     def closeEvent(self, event):
+        if self.analysis_runner is not None:
+            self.analysis_runner.shutdown()
+        self.prefetcher.shutdown()
+        self.thumbnail_loader.shutdown()
+        if isinstance(self.image_pages, PageStore):
+            self.image_pages.close()
         event.accept()
@@ -0,0 +1,75 @@
+"""
+Background thumbnail loading for the File Browser.
+
+This module provides the ThumbnailLoader class, which fetches thumbnails from
+the on-disk cache (generating missing ones) on a dedicated thread pool and
+delivers them to the GUI thread as QIcons.
+"""
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+from PySide6.QtGui import QIcon, QImage, QPixmap
+
+from ..utils.thumbnails import ThumbnailCache
+from .tiled_image import array_to_qimage
+
+
+class _ThumbnailSignals(QObject):
+    finished = Signal(int, str, QImage)
+
+
+class _ThumbnailTask(QRunnable):
+    def __init__(self, cache, file_path, generation, signals):
+        super().__init__()
+        self.cache = cache
+        self.file_path = file_path
+        self.generation = generation
+        self.signals = signals
+
+    def run(self):
+        try:
+            thumbnail = self.cache.get_or_create(self.file_path)
+            q_image = array_to_qimage(thumbnail)
+        except Exception as e:
+            print(f"Thumbnail error for {self.file_path}: {e}")
+            return
+        self.signals.finished.emit(self.generation, self.file_path, q_image)
+
+
+class ThumbnailLoader(QObject):
+    """
+    Loads thumbnails for a list of files in worker threads.
+
+    Calling `request` again (e.g. when another folder is opened) drops queued
+    work from the previous request; results that still arrive from it are
+    ignored.
+    """
+
+    thumbnail_ready = Signal(str, QIcon)
+
+    def __init__(self, cache=None, parent=None):
+        super().__init__(parent)
+        self.cache = cache or ThumbnailCache()
+        self.pool = QThreadPool(self)
+        self.generation = 0
+        self._signals = _ThumbnailSignals()
+        self._signals.finished.connect(self._on_finished)
+
+    def request(self, file_paths):
+        self.cancel()
+        for file_path in file_paths:
+            self.pool.start(
+                _ThumbnailTask(self.cache, file_path, self.generation, self._signals)
+            )
+
+    def cancel(self):
+        self.generation += 1
+        self.pool.clear()
+
+    def shutdown(self):
+        self.cancel()
+        self.pool.waitForDone()
+
+    def _on_finished(self, generation, file_path, q_image):
+        if generation != self.generation:
+            return
+        self.thumbnail_ready.emit(file_path, QIcon(QPixmap.fromImage(q_image)))
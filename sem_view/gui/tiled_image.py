@@ -0,0 +1,194 @@
+"""
+Tiled, multi-resolution image rendering for the SEM Viewer canvas.
+
+This module provides the ImagePyramid class, which builds downsampled levels
+of an 8-bit image on demand, and the TiledImageItem class, a QGraphicsItem
+that paints only the tiles of the appropriate level that intersect the
+exposed area of the view. The pyramid can hold raw (e.g. 16-bit) data, in
+which case each tile is mapped to 8-bit through a lookup table when it is
+created, and a new table only invalidates the tiles.
+"""
+
+import math
+from collections import OrderedDict
+
+import numpy as np
+from PySide6.QtWidgets import QGraphicsItem, QStyleOptionGraphicsItem
+from PySide6.QtCore import QRectF
+from PySide6.QtGui import QImage, QPainter, QPixmap
+
+from ..utils.display import apply_lut
+
+
+class ImagePyramid:
+    """
+    Successive 2x downsampled versions of an image.
+
+    Level 0 is the original array; each further level is the 2x2 block mean
+    of the previous one. Levels are only computed when first requested, a
+    strip of `STRIP_ROWS` output rows at a time, so building one needs little
+    memory beyond the level itself.
+    """
+
+    STRIP_ROWS = 128
+
+    def __init__(self, data, min_size=256):
+        self.levels = [data]
+        self.num_levels = 1
+        size = max(data.shape[:2])
+        while size > min_size:
+            size = (size + 1) // 2
+            self.num_levels += 1
+
+    @property
+    def shape(self):
+        return self.levels[0].shape
+
+    def level(self, index):
+        index = min(max(index, 0), self.num_levels - 1)
+        while len(self.levels) <= index:
+            self.levels.append(self._downsample(self.levels[-1]))
+        return self.levels[index]
+
+    @classmethod
+    def _downsample(cls, data):
+        # Average 2x2 blocks a strip of rows at a time into the output, so
+        # the uint32 sums stay small; an odd last row/column is averaged with
+        # itself (as if the edge were repeated)
+        height, width = data.shape[:2]
+        out = np.empty(
+            ((height + 1) // 2, (width + 1) // 2) + data.shape[2:], dtype=data.dtype
+        )
+        pairs = height // 2
+        for start in range(0, pairs, cls.STRIP_ROWS):
+            stop = min(start + cls.STRIP_ROWS, pairs)
+            rows = data[2 * start : 2 * stop : 2].astype(np.uint32)
+            rows += data[2 * start + 1 : 2 * stop : 2]
+            cls._average_columns(rows, out[start:stop])
+        if height % 2:
+            cls._average_columns(data[-1:].astype(np.uint32) * 2, out[-1:])
+        return out
+
+    @staticmethod
+    def _average_columns(rows, out):
+        """Writes the rounded means of column pairs of summed row pairs."""
+        width = rows.shape[1]
+        even = width - width % 2
+        summed = rows[:, 0:even:2] + rows[:, 1:even:2]
+        summed += 2
+        summed //= 4
+        out[:, : even // 2] = summed
+        if width % 2:
+            out[:, -1] = (rows[:, -1] * 2 + 2) // 4
+
+def array_to_qimage(data):
+    """Creates a QImage that owns a copy of a uint8 grayscale or RGB array."""
+    data = np.ascontiguousarray(data)
+    height, width = data.shape[:2]
+    if data.ndim == 2:
+        q_image = QImage(data.data, width, height, width, QImage.Format_Grayscale8)
+    else:
+        q_image = QImage(data.data, width, height, width * 3, QImage.Format_RGB888)
+    return q_image.copy()
+
+
+class TiledImageItem(QGraphicsItem):
+    """
+    Graphics item that draws an image from cached pyramid tiles.
+
+    At each repaint the pyramid level is chosen from the view's zoom so that
+    roughly one source pixel maps to one screen pixel, and only the tiles
+    intersecting the exposed rectangle are drawn. Tiles are converted to
+    QPixmaps on first use (through `lut` if set) and kept in an LRU cache of
+    `cache_size` entries.
+    """
+
+    TILE_SIZE = 512
+
+    def __init__(self, data, lut=None, cache_size=128, parent=None):
+        super().__init__(parent)
+        self.pyramid = ImagePyramid(data)
+        self.lut = lut
+        self.cache_size = cache_size
+        self._tiles = OrderedDict()
+        height, width = data.shape[:2]
+        self._rect = QRectF(0, 0, width, height)
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption, True)
+
+    def boundingRect(self):
+        return self._rect
+
+    def set_data(self, data):
+        """Replaces the image (same size expected) and drops cached tiles."""
+        self.pyramid = ImagePyramid(data)
+        self._tiles.clear()
+        self.update()
+
+    def set_lut(self, lut):
+        """Changes the display mapping; tiles are re-mapped as they are drawn."""
+        self.lut = lut
+        self._tiles.clear()
+        self.update()
+
+    def clear_cache(self):
+        self._tiles.clear()
+
+    def _tile(self, level, tx, ty):
+        key = (level, tx, ty)
+        pixmap = self._tiles.get(key)
+        if pixmap is not None:
+            self._tiles.move_to_end(key)
+            return pixmap
+
+        data = self.pyramid.level(level)
+        t = self.TILE_SIZE
+        tile = data[ty * t : (ty + 1) * t, tx * t : (tx + 1) * t]
+        if self.lut is not None:
+            tile = apply_lut(tile, self.lut)
+        pixmap = QPixmap.fromImage(array_to_qimage(tile))
+
+        self._tiles[key] = pixmap
+        while len(self._tiles) > self.cache_size:
+            self._tiles.popitem(last=False)
+        return pixmap
+
+    def paint(self, painter, option, widget=None):
+        lod = QStyleOptionGraphicsItem.levelOfDetailFromTransform(
+            painter.worldTransform()
+        )
+        level = 0
+        if lod < 1.0:
+            level = min(
+                int(math.floor(math.log2(1.0 / lod))), self.pyramid.num_levels - 1
+            )
+        scale = 2**level
+
+        exposed = option.exposedRect.intersected(self._rect)
+        if exposed.isEmpty():
+            return
+
+        data = self.pyramid.level(level)
+        height, width = data.shape[:2]
+        t = self.TILE_SIZE
+        tile_span = t * scale  # tile edge length in scene (level 0) pixels
+
+        tx0 = max(int(exposed.left() // tile_span), 0)
+        ty0 = max(int(exposed.top() // tile_span), 0)
+        tx1 = min(int(math.ceil(exposed.right() / tile_span)), math.ceil(width / t))
+        ty1 = min(int(math.ceil(exposed.bottom() / tile_span)), math.ceil(height / t))
+
+        painter.save()
+        # Padded edge tiles of coarse levels may overhang the image by a pixel
+        painter.setClipRect(self._rect)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, lod < 1.0)
+        for ty in range(ty0, ty1):
+            for tx in range(tx0, tx1):
+                pixmap = self._tile(level, tx, ty)
+                target = QRectF(
+                    tx * tile_span,
+                    ty * tile_span,
+                    pixmap.width() * scale,
+                    pixmap.height() * scale,
+                )
+                painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+        painter.restore()
@@ -2,22 +2,22 @@
 Main module for the SEM Viewer application.
 
 This module handles application initialization, command-line argument parsing,
-and setting up the main window.
+and setting up the main window. `sem_view batch ...` runs the headless batch
+tool instead, without importing PySide6.
 """
 
 import sys
 import os
 import ctypes
-from PySide6.QtWidgets import QApplication
-from PySide6.QtGui import QIcon
-from .gui.main_window import MainWindow
 
 
 def main():
     """
     Main entry point for the application.
 
-    This function performs the following steps:
+    If the first argument is `batch`, the remaining arguments are passed to
+    the headless batch tool (see `sem_view.batch`) and no GUI is created.
+    Otherwise this function performs the following steps:
     1. Sets the AppUserModelID for Windows taskbar grouping.
     2. Initializes the QApplication.
     3. Sets the application window icon.
@@ -27,6 +27,16 @@ def main():
        - `<file_path>`: Loads the specified image file.
     6. Starts the application event loop.
     """
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        from .batch import main as batch_main
+
+        sys.exit(batch_main(sys.argv[2:]))
+
+    # GUI imports are deferred so the batch tool works without a display
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtGui import QIcon
+    from .gui.main_window import MainWindow
+
     # Set AppUserModelID for Windows taskbar icon
     if os.name == "nt":
         myappid = "rupeshknn.sem_view.viewer.1.0"  # arbitrary string
@@ -3,94 +3,663 @@ Image analysis utilities for SEM Viewer.
 """
 
 import numpy as np
+from scipy import ndimage as ndi
 from skimage.draw import polygon
-from skimage.filters import threshold_otsu, threshold_local
-from skimage.measure import find_contours
+from skimage.measure import approximate_polygon, find_contours, label, regionprops
 from skimage.morphology import closing, disk, opening
 from skimage.util import img_as_ubyte
 
+from .geometry import polygon_area
+from .histogram import PageHistogram, histogram_threshold, supports_histogram
+from .segmentation import (
+    RegionOfInterest,
+    grow_region,
+    pixel_threshold,
+    segment,
+    to_gray,
+)
 
-def find_overlap_area(image_data, polygon_points=None, seed_point=None, mask=None):
+
+class AnalysisCancelled(Exception):
+    """Raised by a progress callback to abort a running analysis."""
+
+
+# Structuring element radii used to clean up the thresholded mask
+CLOSING_RADIUS = 3
+OPENING_RADIUS = 2
+
+# Maximum distance (pixels) between a simplified outline and the traced
+# contour; sub-pixel, so the drawn outline is indistinguishable
+SIMPLIFY_TOLERANCE = 0.5
+
+# Features with fewer pixels are ignored by find_features by default
+MIN_FEATURE_PIXELS = 25
+
+
+class OverlapResult:
+    """
+    Outline, area and pixel statistics of a detected feature.
+
+    The feature is the largest connected component of the cleaned mask.
+
+    Attributes:
+        points (np.ndarray): (N, 2) float32 (x, y) vertices of the outline,
+            simplified to within the tolerance of the traced contour.
+        area (float): Area in square pixels of the full traced contour, so
+            simplification does not change the measurement.
+        pixel_count (int): Number of mask pixels in the feature; unlike
+            `area` it excludes holes and does not depend on the contour.
+        centroid (tuple): (x, y) mean position of the feature pixels.
+        bbox (tuple): (x0, y0, x1, y1) pixel bounds of the feature, exclusive
+            at x1 and y1.
+        component_count (int): Number of connected components in the mask,
+            including the feature.
+    """
+
+    def __init__(self, points, area, pixel_count, centroid, bbox, component_count):
+        self.points = points
+        self.area = area
+        self.pixel_count = pixel_count
+        self.centroid = centroid
+        self.bbox = bbox
+        self.component_count = component_count
+
+    @property
+    def equivalent_diameter(self):
+        """Diameter in pixels of the circle with the feature's pixel count."""
+        return float(np.sqrt(4 * self.pixel_count / np.pi))
+
+
+def _bounding_box(mask):
+    """Returns (y0, y1, x0, x1) of the True pixels of `mask`, or None if empty."""
+    rows = np.flatnonzero(mask.any(axis=1))
+    if len(rows) == 0:
+        return None
+    cols = np.flatnonzero(mask[rows[0] : rows[-1] + 1].any(axis=0))
+    return rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+
+
+def _expand_box(box, margin, shape):
+    y0, y1, x0, x1 = box
+    return (
+        max(y0 - margin, 0),
+        min(y1 + margin, shape[0]),
+        max(x0 - margin, 0),
+        min(x1 + margin, shape[1]),
+    )
+
+
+def _union_box(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3])
+
+
+def _clean_mask(binary_mask):
+    """Closing to fill small holes, then opening to remove noise."""
+    binary_mask = closing(binary_mask, disk(CLOSING_RADIUS))
+    return opening(binary_mask, disk(OPENING_RADIUS))
+
+
+def _largest_component(binary_mask, x0, y0, simplify=SIMPLIFY_TOLERANCE):
+    """
+    Measures and traces the largest connected component of `binary_mask`.
+
+    Components are 4-connected, matching how find_contours separates
+    diagonally touching pixels.
+
+    Returns:
+        OverlapResult: The component offset by (x0, y0), its outline
+            simplified to within `simplify` pixels (0 keeps every vertex), or
+            None if the mask is empty.
+    """
+    labels, count = ndi.label(binary_mask)
+    if count == 0:
+        return None
+
+    sizes = np.bincount(labels.ravel())
+    sizes[0] = 0
+    index = int(np.argmax(sizes))
+    rows, cols = ndi.find_objects(labels)[index - 1]
+    component = labels[rows, cols] == index
+
+    top, left = rows.start + y0, cols.start + x0
+    points, area = _trace_component(component, top, left, simplify)
+    pixel_rows, pixel_cols = np.nonzero(component)
+    return OverlapResult(
+        points,
+        area,
+        pixel_count=int(sizes[index]),
+        centroid=(float(left + pixel_cols.mean()), float(top + pixel_rows.mean())),
+        bbox=(left, top, cols.stop + x0, rows.stop + y0),
+        component_count=count,
+    )
+
+
+def _trace_component(component, top, left, simplify):
+    """
+    Traces the outer boundary of a single-component mask.
+
+    Returns:
+        tuple: ((N, 2) float32 (x, y) outline offset by (left, top), area in
+            square pixels of the unsimplified contour)
+    """
+    # The outer boundary is the longest contour; others outline holes
+    contours = find_contours(np.pad(component, 1), 0.5)
+    contour = max(contours, key=len)
+    area = polygon_area(contour)
+    if simplify:
+        contour = approximate_polygon(contour, simplify)
+
+    # contours are (row, col) -> (y, x); undo the padding
+    points = contour[:, ::-1].astype(np.float32)
+    points += np.array([left - 1, top - 1], dtype=np.float32)
+    return points, area
+
+
+def find_overlap_area(
+    image_data,
+    polygon_points=None,
+    seed_point=None,
+    mask=None,
+    progress=None,
+    threshold="otsu",
+    histogram=None,
+    engine="threshold",
+    simplify=SIMPLIFY_TOLERANCE,
+    **engine_params,
+):
     """
     Finds the overlap area within a user-defined polygon or mask.
 
+    With only a seed point (no polygon or mask) the feature under the seed is
+    found by region growing instead; see find_seeded_area.
+
+    All processing is restricted to the bounding box of the ROI, grown by the
+    morphology radii, so the cost scales with the ROI rather than the frame.
+    The frame is never copied, so a memory-mapped page (see PageStore) is
+    only read from disk where the ROI is.
+
     Args:
         image_data (np.ndarray): The image data (grayscale).
         polygon_points (list of tuple, optional): List of (x, y) points defining the rough ROI.
-        seed_point (tuple, optional): (x, y) point to help guide segmentation (unused for now).
+        seed_point (tuple, optional): (x, y) point to help guide segmentation
+            (used by the "flood" engine), or the only input for one-click areas.
         mask (np.ndarray, optional): Boolean mask defining the ROI. Overrides polygon_points.
+        progress (callable, optional): Called as progress(fraction, message) between
+            stages. It may raise AnalysisCancelled to abort the analysis.
+        threshold (str): "otsu", "li" or "triangle".
+        histogram (PageHistogram, optional): Cached histograms of image_data, so
+            repeated analyses of the same page skip counting unchanged tiles.
+        engine (str): Segmentation engine (see utils.segmentation.ENGINES).
+        simplify (float): Outline simplification tolerance in pixels; 0 keeps
+            every contour vertex.
+        **engine_params: Extra parameters for the engine.
 
     Returns:
-        list of tuple: List of (x, y) points defining the detected overlap polygon.
+        OverlapResult: The detected overlap outline and area, or None if
+            nothing was found.
     """
     if image_data is None:
-        return []
+        return None
 
+    if mask is None and (polygon_points is None or len(polygon_points) < 3):
+        if seed_point is not None and polygon_points is None:
+            return find_seeded_area(
+                image_data, seed_point, progress=progress, simplify=simplify
+            )
+        return None
+
+    def report(fraction, message):
+        if progress is not None:
+            progress(fraction, message)
+
+    segmented = _segment_roi(
+        image_data,
+        polygon_points,
+        seed_point,
+        mask,
+        report,
+        threshold,
+        histogram,
+        engine,
+        engine_params,
+    )
+    if segmented is None:
+        return None
+    binary_mask, x0, y0 = segmented
+
+    # Find contours, converted back to full-image coordinates
+    report(0.8, "Tracing contour")
+    result = _largest_component(binary_mask, x0, y0, simplify)
+    report(1.0, "Done")
+
+    return result
+
+
+def find_features(
+    image_data,
+    polygon_points=None,
+    mask=None,
+    progress=None,
+    threshold="otsu",
+    histogram=None,
+    engine="threshold",
+    min_pixels=MIN_FEATURE_PIXELS,
+    max_pixels=None,
+    simplify=SIMPLIFY_TOLERANCE,
+    **engine_params,
+):
+    """
+    Measures every feature within a user-defined polygon or mask.
+
+    The ROI is segmented as by find_overlap_area, then all connected
+    components are labelled in one pass, so an array of pads is measured
+    with a single analysis. Other arguments are as for find_overlap_area.
+
+    Args:
+        min_pixels (int): Ignore features with fewer pixels.
+        max_pixels (int, optional): Ignore features with more pixels.
+
+    Returns:
+        list of OverlapResult: The features in raster order of their top-left
+            pixel; empty if nothing was found.
+    """
+    if image_data is None:
+        return []
     if mask is None and (polygon_points is None or len(polygon_points) < 3):
         return []
 
-    # Handle RGB
-    if image_data.ndim == 3 and image_data.shape[2] in (3, 4):
-        # Simple RGB to Grayscale: 0.299 R + 0.587 G + 0.114 B
-        # Or just use mean for simplicity in this context
-        image_gray = np.mean(image_data[:, :, :3], axis=2).astype(image_data.dtype)
-    else:
-        image_gray = image_data
+    def report(fraction, message):
+        if progress is not None:
+            progress(fraction, message)
+
+    segmented = _segment_roi(
+        image_data,
+        polygon_points,
+        None,
+        mask,
+        report,
+        threshold,
+        histogram,
+        engine,
+        engine_params,
+    )
+    if segmented is None:
+        return []
+    binary_mask, x0, y0 = segmented
+
+    report(0.6, "Labelling features")
+    labels, count = label(binary_mask, connectivity=1, return_num=True)
 
-    height, width = image_gray.shape[:2]
+    report(0.8, "Tracing contours")
+    features = []
+    for region in regionprops(labels):
+        if region.area < min_pixels or (
+            max_pixels is not None and region.area > max_pixels
+        ):
+            continue
+        min_row, min_col, max_row, max_col = region.bbox
+        top, left = min_row + y0, min_col + x0
+        points, area = _trace_component(region.image, top, left, simplify)
+        row, col = region.centroid
+        features.append(
+            OverlapResult(
+                points,
+                area,
+                pixel_count=int(region.area),
+                centroid=(float(col + x0), float(row + y0)),
+                bbox=(left, top, max_col + x0, max_row + y0),
+                component_count=count,
+            )
+        )
+    report(1.0, "Done")
+    return features
 
-    # Create a mask from the user polygon if not provided
+
+def _segment_roi(
+    image_data,
+    polygon_points,
+    seed_point,
+    mask,
+    report,
+    threshold,
+    histogram,
+    engine,
+    engine_params,
+):
+    """
+    Segments and cleans the ROI crop for find_overlap_area/find_features.
+
+    Returns:
+        tuple: (cleaned boolean mask of the crop, x0, y0 of the crop), or None
+            if the ROI is empty.
+    """
+    report(0.0, "Preparing ROI")
+    height, width = image_data.shape[:2]
+    margin = CLOSING_RADIUS + OPENING_RADIUS + 1
+
+    # Find the ROI bounding box and the mask restricted to it (plus margin)
     if mask is None:
         # skimage.draw.polygon uses (row, col) -> (y, x)
-        poly_y = [p[1] for p in polygon_points]
-        poly_x = [p[0] for p in polygon_points]
+        poly_y = np.array([p[1] for p in polygon_points], dtype=float)
+        poly_x = np.array([p[0] for p in polygon_points], dtype=float)
+        box = (
+            int(max(np.floor(poly_y.min()), 0)),
+            int(min(np.ceil(poly_y.max()) + 1, height)),
+            int(max(np.floor(poly_x.min()), 0)),
+            int(min(np.ceil(poly_x.max()) + 1, width)),
+        )
+        if box[0] >= box[1] or box[2] >= box[3]:
+            return None
+        y0, y1, x0, x1 = _expand_box(box, margin, (height, width))
 
-        rr, cc = polygon(poly_y, poly_x, shape=(height, width))
-        mask = np.zeros((height, width), dtype=bool)
-        mask[rr, cc] = True
+        rr, cc = polygon(poly_y - y0, poly_x - x0, shape=(y1 - y0, x1 - x0))
+        mask_crop = np.zeros((y1 - y0, x1 - x0), dtype=bool)
+        mask_crop[rr, cc] = True
+    else:
+        box = _bounding_box(mask)
+        if box is None:
+            return None
+        y0, y1, x0, x1 = _expand_box(box, margin, (height, width))
+        mask_crop = mask[y0:y1, x0:x1]
 
-    # Extract ROI
-    roi = image_gray.copy()
-    # We only care about the area inside the mask.
-    # Let's set outside to 0 (or mean) to avoid affecting threshold too much,
-    # but Otsu on masked array is better.
+    # Extract ROI (a view; no full-frame copy)
+    roi = image_data[y0:y1, x0:x1]
 
-    roi_values = roi[mask]
+    # Handle RGB
+    roi = to_gray(roi)
 
-    if len(roi_values) == 0:
-        return []
+    if not mask_crop.any():
+        return None
 
-    # Otsu thresholding on the ROI pixels
-    try:
-        thresh = threshold_otsu(roi_values)
-    except Exception:
-        # Fallback if ROI is uniform
-        thresh = roi_values.mean()
+    # Segment the pixels inside the mask; thresholds are computed from
+    # those pixels only so the outside does not affect them
+    seed = None
+    if seed_point is not None:
+        row, col = int(round(seed_point[1])) - y0, int(round(seed_point[0])) - x0
+        if 0 <= row < y1 - y0 and 0 <= col < x1 - x0:
+            seed = (row, col)
+    if image_data.ndim != 2:
+        # The page histogram does not describe the grayscale conversion
+        histogram = None
+    region = RegionOfInterest(
+        roi, mask_crop, (y0, y1, x0, x1), seed, histogram, method=threshold
+    )
 
-    # Create binary mask of the overlap (assuming overlap is brighter)
-    # If overlap is darker, we might need to invert or check mean intensities.
-    # Usually metal on substrate is brighter in SEM.
-    binary_mask = (roi > thresh) & mask
+    report(0.2, "Segmenting")
+    binary_mask = segment(region, engine, **engine_params)
 
     # Clean up the mask
-    # Closing to fill small holes, Opening to remove noise
-    binary_mask = closing(binary_mask, disk(3))
-    binary_mask = opening(binary_mask, disk(2))
+    report(0.4, "Cleaning mask")
+    return _clean_mask(binary_mask), x0, y0
 
-    # Find contours
-    contours = find_contours(binary_mask, 0.5)
 
-    if not contours:
-        return []
+def find_seeded_area(
+    image_data,
+    seed_point,
+    tolerance=None,
+    progress=None,
+    simplify=SIMPLIFY_TOLERANCE,
+):
+    """
+    Finds the feature under a single click by seeded region growing.
+
+    Only the connected region around the seed (and a window about twice its
+    size) is examined, which suits one pad on a uniform substrate.
+
+    Args:
+        image_data (np.ndarray): The image data.
+        seed_point (tuple): (x, y) point inside the feature.
+        tolerance (float, optional): Intensity tolerance around the seed
+            value; estimated from the local noise by default.
+        progress (callable, optional): As for find_overlap_area.
+        simplify (float): As for find_overlap_area.
+
+    Returns:
+        OverlapResult: The feature outline and area, or None.
+    """
+    if image_data is None:
+        return None
+
+    def report(fraction, message):
+        if progress is not None:
+            progress(fraction, message)
+
+    report(0.0, "Growing region")
+    height, width = image_data.shape[:2]
+    row, col = int(round(seed_point[1])), int(round(seed_point[0]))
+    if not (0 <= row < height and 0 <= col < width):
+        return None
+    region, (y0, _, x0, _) = grow_region(image_data, (row, col), tolerance)
+
+    # Crop to the region and pad so the clean-up and contours see background
+    # around it
+    report(0.5, "Cleaning mask")
+    by0, by1, bx0, bx1 = _bounding_box(region)
+    y0, x0 = y0 + by0, x0 + bx0
+    margin = CLOSING_RADIUS + OPENING_RADIUS + 1
+    binary_mask = _clean_mask(np.pad(region[by0:by1, bx0:bx1], margin))
+
+    report(0.8, "Tracing contour")
+    result = _largest_component(binary_mask, x0 - margin, y0 - margin, simplify)
+    report(1.0, "Done")
+    return result
+
+
+def _polygon_mask(polygon_points, shape):
+    """
+    Rasterizes a polygon inside its own bounding box.
+
+    Returns:
+        tuple: ((y0, y1, x0, x1), boolean mask of the box), or (None, None)
+            if the polygon lies outside an image of `shape`.
+    """
+    poly_y = np.array([p[1] for p in polygon_points], dtype=float)
+    poly_x = np.array([p[0] for p in polygon_points], dtype=float)
+    y0 = int(max(np.floor(poly_y.min()), 0))
+    y1 = int(min(np.ceil(poly_y.max()) + 1, shape[0]))
+    x0 = int(max(np.floor(poly_x.min()), 0))
+    x1 = int(min(np.ceil(poly_x.max()) + 1, shape[1]))
+    if y0 >= y1 or x0 >= x1:
+        return None, None
+
+    rr, cc = polygon(poly_y - y0, poly_x - x0, shape=(y1 - y0, x1 - x0))
+    inside = np.zeros((y1 - y0, x1 - x0), dtype=bool)
+    inside[rr, cc] = True
+    return (y0, y1, x0, x1), inside
+
+
+class OverlapSegmentation:
+    """
+    Auto-area state kept between Add/Trim refinements.
+
+    Holds the ROI mask, a per-value histogram of the ROI pixels, the
+    thresholded mask and the cleaned (closed and opened) mask. A refinement
+    updates the histogram with the pixels entering or leaving the ROI, takes
+    the threshold from it, and recomputes the masks only around the
+    pixels that changed. The whole ROI is reprocessed only when the threshold
+    moves.
+
+    The result matches find_overlap_area on the accumulated ROI mask.
+    Edits are queued with `add`/`trim` (e.g. from the GUI thread) and applied
+    by `update`, which may run in a worker; one `update` must run at a time.
+    """
+
+    # How far a change in the thresholded mask reaches through closing and
+    # opening
+    REACH = 2 * (CLOSING_RADIUS + OPENING_RADIUS)
+
+    def __init__(
+        self,
+        image_data,
+        polygon_points,
+        threshold="otsu",
+        histogram=None,
+        simplify=SIMPLIFY_TOLERANCE,
+    ):
+        self.image_data = image_data
+        self.method = threshold
+        self.simplify = simplify
+        self.histogram = histogram  # PageHistogram of the grayscale image
+        self.image = None
+        self.roi = None
+        self.binary = None
+        self.cleaned = None
+        self.counts = None  # Histogram of ROI values, or None for float data
+        self.box = None  # Bounding box of the ROI
+        self.extent = None  # Box outside which the masks are all False
+        self.threshold = None  # Threshold the thresholded mask was built with
+        self.result = None
+        self._dirty = None
+        self._pending = [(True, polygon_points)]
+
+    def add(self, polygon_points):
+        """Queues a region to add to the ROI."""
+        self._pending.append((True, polygon_points))
+
+    def trim(self, polygon_points):
+        """Queues a region to remove from the ROI."""
+        self._pending.append((False, polygon_points))
+
+    def _allocate(self):
+        self.image = to_gray(self.image_data)
+        shape = self.image.shape
+        self.roi = np.zeros(shape, dtype=bool)
+        self.binary = np.zeros(shape, dtype=bool)
+        self.cleaned = np.zeros(shape, dtype=bool)
+
+        if supports_histogram(self.image):
+            if self.histogram is None:
+                self.histogram = PageHistogram(self.image)
+            self.counts = np.zeros(self.histogram.length, dtype=np.int64)
+
+    def _apply_edits(self):
+        """Applies the queued edits to the ROI mask and histogram."""
+        edits = list(self._pending)
+        shape = self.roi.shape
+        for add, polygon_points in edits:
+            if polygon_points is None or len(polygon_points) < 3:
+                continue
+            box, inside = _polygon_mask(polygon_points, shape)
+            if box is None:
+                continue
+            y0, y1, x0, x1 = box
+            roi = self.roi[y0:y1, x0:x1]
+            changed = inside & ~roi if add else inside & roi
+            changed_box = _bounding_box(changed)
+            if changed_box is None:
+                continue
+
+            if self.counts is not None:
+                delta = self.histogram.masked(changed, box)
+                if add:
+                    self.counts += delta
+                else:
+                    self.counts -= delta
+            roi[changed] = add
+
+            cy0, cy1, cx0, cx1 = changed_box
+            changed_box = (cy0 + y0, cy1 + y0, cx0 + x0, cx1 + x0)
+            self._dirty = _union_box(self._dirty, changed_box)
+            if add:
+                self.box = _union_box(self.box, changed_box)
+            elif self.box is not None:
+                by0, by1, bx0, bx1 = self.box
+                box = _bounding_box(self.roi[by0:by1, bx0:bx1])
+                if box is not None:
+                    box = (box[0] + by0, box[1] + by0, box[2] + bx0, box[3] + bx0)
+                self.box = box
+        del self._pending[: len(edits)]
+
+    def _threshold(self):
+        if self.counts is not None:
+            return histogram_threshold(self.counts, self.histogram.offset, self.method)
+
+        y0, y1, x0, x1 = self.box
+        roi_values = self.image[y0:y1, x0:x1][self.roi[y0:y1, x0:x1]]
+        return pixel_threshold(roi_values, self.method)
+
+    def update(self, progress=None):
+        """
+        Applies the queued edits and returns the detected outline.
+
+        Args:
+            progress (callable, optional): Called as progress(fraction, message)
+                between stages; it may raise AnalysisCancelled. A cancelled
+                update leaves the state consistent and the next update
+                finishes the work.
+
+        Returns:
+            OverlapResult: The detected overlap outline and area, or None.
+        """
+
+        def report(fraction, message):
+            if progress is not None:
+                progress(fraction, message)
+
+        report(0.0, "Preparing ROI")
+        if self.roi is None:
+            self._allocate()
+        self._apply_edits()
+
+        if self.box is None:
+            # Empty ROI
+            if self.extent is not None:
+                y0, y1, x0, x1 = _expand_box(self.extent, self.REACH, self.roi.shape)
+                self.binary[y0:y1, x0:x1] = False
+                self.cleaned[y0:y1, x0:x1] = False
+            self.extent = None
+            self.threshold = None
+            self._dirty = None
+            self.result = None
+            report(1.0, "Done")
+            return self.result
+
+        report(0.2, "Thresholding")
+        threshold = self._threshold()
+        dirty = self._dirty
+        if threshold != self.threshold:
+            dirty = _union_box(_union_box(dirty, self.extent), self.box)
+
+        if dirty is not None:
+            self._update_masks(dirty, threshold, report)
+
+        # Find contours around the ROI
+        report(0.8, "Tracing contour")
+        margin = CLOSING_RADIUS + OPENING_RADIUS + 1
+        y0, y1, x0, x1 = _expand_box(self.box, margin, self.roi.shape)
+        self.result = _largest_component(
+            self.cleaned[y0:y1, x0:x1], x0, y0, self.simplify
+        )
+        report(1.0, "Done")
+        return self.result
 
-    # Find the largest contour by length (approximation for area)
-    largest_contour = max(contours, key=len)
+    def _update_masks(self, dirty, threshold, report):
+        """Recomputes the thresholded and cleaned masks around `dirty`."""
+        shape = self.roi.shape
+        y0, y1, x0, x1 = dirty
+        # Cleaned pixels within REACH of the dirty box may change; computing
+        # them needs the thresholded mask REACH further out
+        iy0, iy1, ix0, ix1 = _expand_box(dirty, self.REACH, shape)
+        oy0, oy1, ox0, ox1 = _expand_box(dirty, 2 * self.REACH, shape)
 
-    # Convert back to (x, y) list
-    # contours are (row, col) -> (y, x)
-    result_polygon = [(pt[1], pt[0]) for pt in largest_contour]
+        binary = self.binary[oy0:oy1, ox0:ox1].copy()
+        binary[y0 - oy0 : y1 - oy0, x0 - ox0 : x1 - ox0] = (
+            self.image[y0:y1, x0:x1] > threshold
+        ) & self.roi[y0:y1, x0:x1]
 
-    # Simplify polygon slightly to reduce point count if needed?
-    # For now, return "large n polygon" as requested.
+        report(0.4, "Cleaning mask")
+        cleaned = _clean_mask(binary)
+        report(0.7, "Cleaning mask")
 
-    return result_polygon
+        # Commit; no cancellation past this point
+        self.binary[oy0:oy1, ox0:ox1] = binary
+        self.cleaned[iy0:iy1, ix0:ix1] = cleaned[
+            iy0 - oy0 : iy1 - oy0, ix0 - ox0 : ix1 - ox0
+        ]
+        self.threshold = threshold
+        self.extent = _union_box(self.extent, self.box)
+        self._dirty = None
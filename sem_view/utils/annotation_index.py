@@ -0,0 +1,159 @@
+"""
+Folder-level index of saved measurements for SEM Viewer.
+
+Measurements saved from the viewer, and results of batch runs with
+`--index`, can be recorded in one SQLite file per folder. Searching a run,
+e.g. for files with an area measurement above 2 µm², then reads only the
+index instead of opening every TIFF:
+
+    with AnnotationIndex(folder) as index:
+        files = index.find_files(kind="area", min_value=2e-12)
+
+Values are stored in meters or square meters, like Measurement.value;
+uncalibrated measurements are stored in pixels only and are not matched by
+value queries.
+
+Only the standard library is used, so the index works headless.
+"""
+
+import os
+import sqlite3
+
+INDEX_FILENAME = "sem_view_index.sqlite"
+
+# Where indexed measurements came from
+SOURCE_SAVED = "saved"
+SOURCE_BATCH = "batch"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS measurements (
+    file TEXT NOT NULL,
+    source TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    value REAL,
+    value_px REAL,
+    pixel_count INTEGER,
+    color TEXT
+);
+CREATE INDEX IF NOT EXISTS measurements_file ON measurements (file, source);
+CREATE INDEX IF NOT EXISTS measurements_kind_value ON measurements (kind, value);
+"""
+
+_COLUMNS = ("kind", "value", "value_px", "pixel_count", "color")
+
+
+def index_path(folder):
+    """Returns the index file of a folder."""
+    return os.path.join(folder, INDEX_FILENAME)
+
+
+def has_index(folder):
+    """Returns True if the folder has an annotation index."""
+    return os.path.isfile(index_path(folder))
+
+
+class AnnotationIndex:
+    """
+    The measurement index of one folder, created on first use.
+
+    Files are identified by their base name within the folder.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._db = sqlite3.connect(index_path(folder))
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def set_measurements(self, file_name, measurements, source=SOURCE_SAVED):
+        """
+        Replaces the measurements of a file from one source.
+
+        Args:
+            file_name (str): Base name of the file.
+            measurements (list of dict): Entries as returned by
+                Measurement.to_dict ("type", "value_si", "value_px" and
+                optionally "pixel_count", "color").
+            source (str): SOURCE_SAVED or SOURCE_BATCH.
+        """
+        rows = [
+            (
+                file_name,
+                source,
+                position,
+                m["type"].lower(),
+                m.get("value_si"),
+                m.get("value_px"),
+                m.get("pixel_count"),
+                m.get("color"),
+            )
+            for position, m in enumerate(measurements)
+        ]
+        with self._db:
+            self._db.execute(
+                "DELETE FROM measurements WHERE file = ? AND source = ?",
+                (file_name, source),
+            )
+            self._db.executemany(
+                "INSERT INTO measurements VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def remove(self, file_name):
+        """Removes every measurement of a file."""
+        with self._db:
+            self._db.execute("DELETE FROM measurements WHERE file = ?", (file_name,))
+
+    def measurements(self, file_name, source=None):
+        """Returns the indexed measurements of a file as dicts, in order."""
+        query = f"SELECT {', '.join(_COLUMNS)} FROM measurements WHERE file = ?"
+        params = [file_name]
+        if source is not None:
+            query += " AND source = ?"
+            params.append(source)
+        rows = self._db.execute(query + " ORDER BY source, position", params)
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def find_files(self, kind=None, min_value=None, max_value=None, source=None):
+        """
+        Returns the sorted names of files with a matching measurement.
+
+        Args:
+            kind (str, optional): "distance" or "area".
+            min_value (float, optional): Smallest value, in meters or square
+                meters.
+            max_value (float, optional): Largest value.
+            source (str, optional): Only measurements from this source.
+        """
+        if kind is not None:
+            kind = kind.lower()
+        conditions, params = [], []
+        for condition, param in (
+            ("kind = ?", kind),
+            ("value >= ?", min_value),
+            ("value <= ?", max_value),
+            ("source = ?", source),
+        ):
+            if param is not None:
+                conditions.append(condition)
+                params.append(param)
+        query = "SELECT DISTINCT file FROM measurements"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        rows = self._db.execute(query + " ORDER BY file", params)
+        return [row[0] for row in rows]
+
+
+def index_measurements(file_path, measurements, source=SOURCE_SAVED):
+    """Records the measurements of a file in its folder's index."""
+    folder, file_name = os.path.split(os.path.abspath(file_path))
+    with AnnotationIndex(folder) as index:
+        index.set_measurements(file_name, measurements, source)
@@ -0,0 +1,96 @@
+"""
+Saving annotations without rewriting the image.
+
+Besides writing a new annotated TIFF, measurements and annotation state can
+be stored with the original file, which keeps its pages and bit depth byte
+for byte:
+
+    in place: merged into the JSON ImageDescription of the first page,
+        rewriting only the tag (see tiff_writer.update_description).
+    sidecar: written to "<file>.annotations.json" next to the TIFF, which is
+        not modified at all.
+
+Both hold the same JSON object as the ImageDescription of an annotated TIFF
+("measurements", "annotations", "is_burnt_in"), and read_image_info reads
+either back.
+"""
+
+import json
+import os
+
+import tifffile
+
+from .tiff_writer import update_description
+
+SIDECAR_SUFFIX = ".annotations.json"
+
+# Ways to save annotations
+SAVE_NEW_FILE = "new"
+SAVE_IN_PLACE = "in_place"
+SAVE_SIDECAR = "sidecar"
+
+
+def sidecar_path(file_path):
+    """Returns the sidecar file of a TIFF."""
+    return file_path + SIDECAR_SUFFIX
+
+
+def read_sidecar(file_path):
+    """Returns the sidecar object of a TIFF, or None if it has none."""
+    try:
+        with open(sidecar_path(file_path), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def write_sidecar(file_path, annotations):
+    """
+    Writes the annotation object of a TIFF to its sidecar file.
+
+    The file is replaced atomically, so readers never see a partial one.
+
+    Returns:
+        str: The sidecar path.
+    """
+    path = sidecar_path(file_path)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(annotations, f)
+    os.replace(temp_path, path)
+    return path
+
+
+def merge_description(description, annotations):
+    """
+    Returns the JSON ImageDescription with `annotations` merged in.
+
+    Keys of an existing JSON description are kept; a description that is
+    not a JSON object is kept as "original_description".
+    """
+    data = {}
+    if description:
+        try:
+            existing = json.loads(description)
+        except ValueError:
+            existing = None
+        if isinstance(existing, dict):
+            data.update(existing)
+        else:
+            data["original_description"] = description
+    data.update(annotations)
+    return json.dumps(data)
+
+
+def write_in_place(file_path, annotations):
+    """
+    Stores the annotation object in the ImageDescription of a TIFF.
+
+    Returns:
+        str: The updated file path.
+    """
+    with tifffile.TiffFile(file_path) as tif:
+        description = tif.pages[0].description
+    update_description(file_path, merge_description(description, annotations))
+    return file_path
@@ -0,0 +1,204 @@
+"""
+Display conversion utilities for SEM Viewer.
+
+This module maps raw image data (typically 16-bit) to 8-bit for display.
+Integer data of up to 16 bits goes through a lookup table built once per
+window/level/gamma setting, so converting a page is a single `np.take` into
+a preallocated buffer rather than several full-size float temporaries.
+"""
+
+import numpy as np
+
+# Dtypes whose full value range fits in a lookup table
+LUT_DTYPES = (np.dtype(np.uint8), np.dtype(np.uint16))
+
+
+def data_range(data):
+    """Returns the (min, max) of `data` as Python numbers."""
+    return data.min().item(), data.max().item()
+
+
+def build_lut(dtype, black, white, gamma=1.0):
+    """
+    Builds a lookup table mapping every value of `dtype` to uint8.
+
+    Values at or below `black` map to 0, values at or above `white` map to
+    255, and values in between follow ((v - black) / (white - black)) ** (1 / gamma),
+    so gamma > 1 brightens mid-tones.
+
+    Args:
+        dtype (np.dtype): uint8 or uint16.
+        black (float): Input value mapped to 0.
+        white (float): Input value mapped to 255.
+        gamma (float): Gamma correction applied after the linear stretch.
+
+    Returns:
+        np.ndarray: uint8 array with 256 or 65536 entries.
+    """
+    dtype = np.dtype(dtype)
+    if dtype not in LUT_DTYPES:
+        raise ValueError(f"No lookup table for dtype {dtype}")
+
+    values = np.arange(np.iinfo(dtype).max + 1, dtype=np.float32)
+    return _map_values(values, black, white, gamma)
+
+
+def _map_values(values, black, white, gamma):
+    """Maps float32 `values` to uint8 in place and returns the result."""
+    if white <= black:
+        return (values > black).astype(np.uint8) * np.uint8(255)
+
+    values -= black
+    values *= 1.0 / (white - black)
+    np.clip(values, 0.0, 1.0, out=values)
+    if gamma != 1.0:
+        np.power(values, 1.0 / gamma, out=values)
+    values *= 255.0
+    return values.astype(np.uint8)
+
+
+def apply_lut(data, lut, out=None):
+    """Maps `data` through `lut` in a single pass, writing into `out` if given."""
+    if out is None:
+        out = np.empty(data.shape, dtype=np.uint8)
+    # mode="clip" avoids buffering `out`; uint8/uint16 indices are always in range
+    np.take(lut, data, out=out, mode="clip")
+    return out
+
+
+def to_display(data, black=None, white=None, gamma=1.0, lut=None, out=None):
+    """
+    Converts image data to uint8 for display.
+
+    uint8 data with the default window and gamma is returned unchanged.
+    uint8/uint16 data is mapped through a lookup table (`lut` if given,
+    otherwise one is built); other dtypes fall back to a float32 stretch.
+
+    Args:
+        data (np.ndarray): Image data of any numeric dtype.
+        black, white (float, optional): Window; defaults to the data range
+            (0-255 for uint8 data).
+        gamma (float): Gamma correction.
+        lut (np.ndarray, optional): Prebuilt table for `data.dtype`.
+        out (np.ndarray, optional): uint8 buffer of `data.shape` to write into.
+
+    Returns:
+        np.ndarray: uint8 array of the same shape as `data`.
+    """
+    if data.dtype == np.uint8 and lut is None:
+        if black is None and white is None and gamma == 1.0:
+            return data
+        black = 0 if black is None else black
+        white = 255 if white is None else white
+
+    if black is None or white is None:
+        lo, hi = data_range(data)
+        black = lo if black is None else black
+        white = hi if white is None else white
+
+    if lut is None and data.dtype in LUT_DTYPES:
+        lut = build_lut(data.dtype, black, white, gamma)
+    if lut is not None:
+        return apply_lut(data, lut, out=out)
+
+    mapped = _map_values(data.astype(np.float32), black, white, gamma)
+    if out is not None:
+        out[...] = mapped
+        return out
+    return mapped
+
+
+class DisplayCache:
+    """
+    Display conversion state for a single page.
+
+    Keeps the page's data range, histogram, the lookup table for the current
+    window/level/gamma and the converted 8-bit result, so asking again for
+    the same setting returns the cached array and changing the setting only
+    rebuilds the table and reuses the output buffer.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self._range = None
+        self._histogram = None
+        self._lut_key = None
+        self._lut = None
+        self._key = None
+        self._out = None
+
+    @property
+    def range(self):
+        if self._range is None:
+            self._range = data_range(self.data)
+        return self._range
+
+    @property
+    def supports_lut(self):
+        return self.data.dtype in LUT_DTYPES
+
+    def default_levels(self):
+        """Returns the (black, white) window used when none is given."""
+        if self.data.dtype == np.uint8:
+            return 0, 255
+        return self.range
+
+    def _resolve(self, black, white, gamma):
+        default_black, default_white = self.default_levels()
+        black = default_black if black is None else black
+        white = default_white if white is None else white
+        return black, white, gamma
+
+    def lut(self, black=None, white=None, gamma=1.0):
+        """Returns the lookup table for a window/level/gamma setting."""
+        key = self._resolve(black, white, gamma)
+        if key != self._lut_key:
+            self._lut = build_lut(self.data.dtype, *key)
+            self._lut_key = key
+        return self._lut
+
+    def histogram(self, bins=256):
+        """
+        Returns (counts, edges) of the page values over its data range.
+
+        Computed once per page; integer data up to 16 bits is counted with a
+        single bincount.
+        """
+        if self._histogram is None or len(self._histogram[0]) != bins:
+            lo, hi = self.range
+            if self.supports_lut:
+                per_value = np.bincount(self.data.ravel(), minlength=hi + 1)[lo:]
+                # Fold the per-value counts into `bins` equal-width bins
+                n = hi - lo + 1
+                bin_index = np.arange(n) * bins // n
+                counts = np.bincount(bin_index, weights=per_value, minlength=bins)
+                counts = counts.astype(np.int64)
+                edges = lo + np.arange(bins + 1) * (n / bins)
+            else:
+                counts, edges = np.histogram(self.data, bins=bins, range=(lo, hi))
+            self._histogram = (counts, edges)
+        return self._histogram
+
+    def convert(self, black=None, white=None, gamma=1.0):
+        """
+        Returns the page as uint8 for a window/level/gamma setting.
+
+        The output buffer is reused (overwritten in place) when the setting
+        changes.
+        """
+        if self.data.dtype == np.uint8 and black is None and white is None:
+            if gamma == 1.0:
+                return self.data
+
+        key = self._resolve(black, white, gamma)
+        if key == self._key and self._out is not None:
+            return self._out
+
+        if self.supports_lut:
+            if self._out is None:
+                self._out = np.empty(self.data.shape, dtype=np.uint8)
+            apply_lut(self.data, self.lut(*key), out=self._out)
+        else:
+            self._out = to_display(self.data, *key)
+        self._key = key
+        return self._out
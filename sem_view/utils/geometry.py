@@ -0,0 +1,26 @@
+"""
+Polygon geometry helpers for SEM Viewer.
+
+These functions work on NumPy arrays only so they can be used by the GUI
+and by headless tools without pulling in Qt or scikit-image.
+"""
+
+import numpy as np
+
+
+def polygon_area(points):
+    """
+    Computes the area of a polygon with the shoelace formula.
+
+    Args:
+        points (array-like): (N, 2) sequence of (x, y) vertices.
+
+    Returns:
+        float: The enclosed area in square pixels.
+    """
+    pts = np.asarray(points, dtype=np.float64)
+    if pts.ndim != 2 or len(pts) < 3:
+        return 0.0
+    x = pts[:, 0]
+    y = pts[:, 1]
+    return abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))) / 2.0
@@ -0,0 +1,214 @@
+"""
+Masked value histograms and histogram thresholds for SEM Viewer.
+
+Auto-area thresholds only need the distribution of the ROI values, not the
+values themselves. This module counts integer pixel values under a mask
+directly (bincount with the mask as weights) instead of gathering every ROI
+pixel into a new array, and computes the Otsu, Li and triangle thresholds
+from the counts. The results match scikit-image's threshold_otsu,
+threshold_li and threshold_triangle on the same pixels.
+
+It uses NumPy only, so histograms can be cached with the page data.
+"""
+
+import numpy as np
+
+
+def supports_histogram(data):
+    """Returns True if `data` is single-channel integer data of up to 16 bits."""
+    return data.ndim == 2 and data.dtype.kind in "ui" and data.dtype.itemsize <= 2
+
+
+class PageHistogram:
+    """
+    Per-value histograms of one page, cached by tile.
+
+    `masked` counts the page values under a mask. Tiles entirely inside the
+    mask are counted once and cached, so repeated analyses on the same page
+    (refinements, several ROIs, different threshold methods) only count the
+    tiles along the ROI edges again.
+    """
+
+    TILE_SIZE = 256
+
+    def __init__(self, data):
+        if not supports_histogram(data):
+            raise ValueError(f"No value histogram for {data.dtype} {data.shape}")
+        self.data = data
+        info = np.iinfo(data.dtype)
+        self.offset = int(info.min)  # Value counted by bin 0
+        self.length = int(info.max) - self.offset + 1
+        self._tiles = {}  # (row, col) -> (first bin, counts)
+
+    def _values(self, block):
+        if self.offset:
+            return block.astype(np.int32) - self.offset
+        return block
+
+    def _tile(self, row, col):
+        key = (row, col)
+        cached = self._tiles.get(key)
+        if cached is None:
+            size = self.TILE_SIZE
+            block = self.data[
+                row * size : (row + 1) * size, col * size : (col + 1) * size
+            ]
+            counts = np.bincount(self._values(block).ravel())
+            first = int(np.argmax(counts > 0))
+            cached = (first, counts[first:].astype(np.int32))
+            self._tiles[key] = cached
+        return cached
+
+    def masked(self, mask, box=None):
+        """
+        Counts the page values where `mask` is True.
+
+        Args:
+            mask (np.ndarray): Boolean mask, either the size of the page or
+                the size of `box`.
+            box (tuple, optional): (y0, y1, x0, x1) region `mask` covers.
+
+        Returns:
+            np.ndarray: int64 counts of length `self.length`; bin i counts
+                value `self.offset + i`.
+        """
+        height, width = self.data.shape
+        if box is None:
+            box = (0, height, 0, width)
+        y0, y1, x0, x1 = box
+        if mask.shape != (y1 - y0, x1 - x0):
+            mask = mask[y0:y1, x0:x1]
+
+        counts = np.zeros(self.length, dtype=np.int64)
+        size = self.TILE_SIZE
+        for row in range(y0 // size, (y1 - 1) // size + 1):
+            ty0, ty1 = row * size, min((row + 1) * size, height)
+            by0, by1 = max(ty0, y0), min(ty1, y1)
+            for col in range(x0 // size, (x1 - 1) // size + 1):
+                tx0, tx1 = col * size, min((col + 1) * size, width)
+                bx0, bx1 = max(tx0, x0), min(tx1, x1)
+                tile_mask = mask[by0 - y0 : by1 - y0, bx0 - x0 : bx1 - x0]
+
+                whole_tile = (by0, by1, bx0, bx1) == (ty0, ty1, tx0, tx1)
+                if whole_tile and tile_mask.all():
+                    first, tile_counts = self._tile(row, col)
+                    counts[first : first + len(tile_counts)] += tile_counts
+                elif tile_mask.any():
+                    block = self.data[by0:by1, bx0:bx1]
+                    tile_counts = np.bincount(
+                        self._values(block).ravel(), weights=tile_mask.ravel()
+                    )
+                    counts[: len(tile_counts)] += tile_counts.astype(np.int64)
+        return counts
+
+
+def _trim(counts, offset):
+    """Returns the non-zero span of `counts` and the matching bin values."""
+    values = np.flatnonzero(counts)
+    if len(values) == 0:
+        raise ValueError("Empty histogram")
+    lo, hi = values[0], values[-1]
+    return counts[lo : hi + 1], np.arange(lo, hi + 1) + offset
+
+
+def threshold_otsu(counts, offset=0):
+    """Otsu threshold of a value histogram (see PageHistogram.masked)."""
+    counts, centers = _trim(counts, offset)
+    if len(counts) == 1:
+        return centers[0]
+    counts = counts.astype(np.float32)
+
+    weight1 = np.cumsum(counts)
+    weight2 = np.cumsum(counts[::-1])[::-1]
+    mean1 = np.cumsum(counts * centers) / weight1
+    mean2 = (np.cumsum((counts * centers)[::-1]) / weight2[::-1])[::-1]
+
+    variance12 = weight1[:-1] * weight2[1:] * (mean1[:-1] - mean2[1:]) ** 2
+    return centers[np.argmax(variance12)]
+
+
+def threshold_li(counts, offset=0, tolerance=0.5):
+    """Li minimum cross-entropy threshold of a value histogram."""
+    counts, centers = _trim(counts, offset)
+    if len(counts) == 1:
+        return centers[0]
+
+    # Li's iteration needs positive values (because of log(mean))
+    image_min = centers[0]
+    centers = centers - image_min
+    hist = counts.astype(np.float32)
+
+    t_next = np.dot(counts, centers) / counts.sum()
+    t_curr = -2 * tolerance
+    while abs(t_next - t_curr) > tolerance:
+        t_curr = t_next
+        foreground = centers > t_curr
+        background = ~foreground
+
+        mean_fore = np.average(centers[foreground], weights=hist[foreground])
+        mean_back = np.average(centers[background], weights=hist[background])
+        if mean_back == 0:
+            break
+
+        t_next = (mean_back - mean_fore) / (np.log(mean_back) - np.log(mean_fore))
+
+    return t_next + image_min
+
+
+def threshold_triangle(counts, offset=0):
+    """Triangle threshold of a value histogram."""
+    hist, centers = _trim(counts, offset)
+    nbins = len(hist)
+    if nbins == 1:
+        return centers[0]
+
+    # Find peak, lowest and highest gray levels
+    arg_peak_height = np.argmax(hist)
+    peak_height = hist[arg_peak_height]
+    arg_low_level, arg_high_level = 0, nbins - 1
+
+    # Flip is True if left tail is shorter
+    flip = arg_peak_height - arg_low_level < arg_high_level - arg_peak_height
+    if flip:
+        hist = hist[::-1]
+        arg_low_level = nbins - arg_high_level - 1
+        arg_peak_height = nbins - arg_peak_height - 1
+
+    width = arg_peak_height - arg_low_level
+    x1 = np.arange(width)
+    y1 = hist[x1 + arg_low_level]
+
+    # Normalize and maximize the distance to the peak-to-tail line
+    norm = np.sqrt(peak_height**2 + width**2)
+    length = peak_height / norm * x1 - width / norm * y1
+    arg_level = np.argmax(length) + arg_low_level
+
+    if flip:
+        arg_level = nbins - arg_level - 1
+    return centers[arg_level]
+
+
+THRESHOLD_METHODS = {
+    "otsu": threshold_otsu,
+    "li": threshold_li,
+    "triangle": threshold_triangle,
+}
+
+
+def histogram_threshold(counts, offset=0, method="otsu"):
+    """
+    Computes a threshold from a value histogram.
+
+    Args:
+        counts (np.ndarray): Counts per value, bin 0 being `offset`.
+        offset (int): Value of the first bin.
+        method (str): One of THRESHOLD_METHODS.
+
+    Returns:
+        The threshold value; pixels above it are foreground.
+    """
+    try:
+        threshold = THRESHOLD_METHODS[method]
+    except KeyError:
+        raise ValueError(f"Unknown threshold method: {method}") from None
+    return threshold(counts, offset)
@@ -0,0 +1,193 @@
+"""
+Measurement model for SEM Viewer.
+
+A Measurement holds what was measured (a distance or an area), its geometry
+and its numeric value, independent of how it is drawn. The canvas keeps one
+per graphics item, and saving, display labels and batch export all read
+from it, so no value is recovered from label text and measurements can be
+exported without touching Qt objects.
+
+This module works on NumPy arrays only, like utils.geometry.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from .geometry import polygon_area
+
+DISTANCE = "distance"
+AREA = "area"
+
+DEFAULT_COLOR = "#FFFF00"
+
+# (threshold in SI units, display unit, factor from SI units)
+_LENGTH_UNITS = [(1e-6, "nm", 1e9), (1e-3, "µm", 1e6), (None, "mm", 1e3)]
+_AREA_UNITS = [(1e-12, "nm²", 1e18), (1e-6, "µm²", 1e12), (None, "mm²", 1e6)]
+
+
+def _display_unit(value, units):
+    for limit, unit, factor in units:
+        if limit is None or value < limit:
+            return value * factor, unit
+
+
+def display_units(kind):
+    """Returns the (unit, factor from SI units) pairs labels of `kind` use."""
+    units = _AREA_UNITS if kind == AREA else _LENGTH_UNITS
+    return [(unit, factor) for _, unit, factor in units]
+
+
+@dataclass(slots=True)
+class Measurement:
+    """
+    A distance or area measurement.
+
+    Attributes:
+        kind (str): DISTANCE or AREA.
+        points (np.ndarray): (N, 2) float (x, y) vertices; the two end points
+            of a distance.
+        value_px (float): Length in pixels or area in square pixels.
+        pixel_scale (float): Meters per pixel, or None if uncalibrated.
+        color (str): Hex color name, e.g. "#ff0000".
+        pixel_count (int): Segmented mask pixels of an auto-area result, or
+            None.
+    """
+
+    kind: str
+    points: np.ndarray
+    value_px: float
+    pixel_scale: float = None
+    color: str = DEFAULT_COLOR
+    pixel_count: int = None
+
+    @classmethod
+    def distance(cls, start, end, pixel_scale=None, color=DEFAULT_COLOR):
+        """Creates a distance measurement between two (x, y) points."""
+        points = np.array([start, end], dtype=np.float64)
+        length = float(np.hypot(*(points[1] - points[0])))
+        return cls(DISTANCE, points, length, pixel_scale, color)
+
+    @classmethod
+    def area(
+        cls,
+        points,
+        pixel_scale=None,
+        color=DEFAULT_COLOR,
+        area_px=None,
+        pixel_count=None,
+    ):
+        """
+        Creates an area measurement of a polygon.
+
+        Args:
+            points (array-like): (N, 2) sequence of (x, y) vertices.
+            area_px (float, optional): Area to report instead of the area of
+                `points`, e.g. that of the full contour a simplified auto-area
+                outline was derived from.
+        """
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        if area_px is None:
+            area_px = polygon_area(points)
+        if pixel_count is not None:
+            pixel_count = int(pixel_count)
+        return cls(AREA, points, float(area_px), pixel_scale, color, pixel_count)
+
+    @property
+    def value(self):
+        """The value in meters or square meters, or in pixels if uncalibrated."""
+        if not self.pixel_scale:
+            return self.value_px
+        exponent = 2 if self.kind == AREA else 1
+        return self.value_px * self.pixel_scale**exponent
+
+    @property
+    def unit(self):
+        """The unit of `value`: "m", "m²", "px" or "px²"."""
+        base = "m" if self.pixel_scale else "px"
+        return base + "²" if self.kind == AREA else base
+
+    def display_value(self):
+        """Returns (value, unit) scaled to nm, µm or mm for display."""
+        if not self.pixel_scale:
+            return self.value_px, self.unit
+        units = _AREA_UNITS if self.kind == AREA else _LENGTH_UNITS
+        return _display_unit(self.value, units)
+
+    def label(self):
+        """Returns the label text, e.g. "12.50 µm" or "340 px²"."""
+        value, unit = self.display_value()
+        if self.pixel_scale:
+            return f"{value:.2f} {unit}"
+        digits = 0 if self.kind == AREA else 1
+        return f"{value:.{digits}f} {unit}"
+
+    def to_dict(self):
+        """
+        Returns the entry saved in the "measurements" list of an annotated
+        TIFF's ImageDescription.
+
+        "value" and "unit" are the displayed value; "value_si" is in meters
+        or square meters (None if uncalibrated) and "value_px" in pixels.
+        """
+        value, unit = self.display_value()
+        data = {
+            "type": self.kind.capitalize(),
+            "value": round(float(value), 2),
+            "unit": unit,
+            "label": self.label(),
+            "color": self.color,
+            "value_si": float(self.value) if self.pixel_scale else None,
+            "value_px": float(self.value_px),
+        }
+        if self.pixel_count is not None:
+            data["pixel_count"] = self.pixel_count
+        return data
+
+    def to_annotation(self):
+        """Returns the annotation state entry from which it can be restored."""
+        if self.kind == DISTANCE:
+            (x0, y0), (x1, y1) = self.points.tolist()
+            return {
+                "type": DISTANCE,
+                "start": [x0, y0],
+                "end": [x1, y1],
+                "color": self.color,
+            }
+
+        # Two decimals (1/100 px) keep the saved JSON compact
+        state = {
+            "type": AREA,
+            "points": np.round(self.points.astype(np.float64), 2).tolist(),
+            "area_px": float(self.value_px),
+        }
+        if self.pixel_count is not None:
+            state["pixel_count"] = self.pixel_count
+        state["color"] = self.color
+        return state
+
+    @classmethod
+    def from_annotation(cls, state, pixel_scale=None):
+        """
+        Creates a measurement from an annotation state entry.
+
+        Returns:
+            Measurement: The measurement, or None if the entry is not a
+                distance or an area of at least three points.
+        """
+        color = state.get("color", DEFAULT_COLOR)
+        kind = state.get("type")
+        if kind == DISTANCE:
+            return cls.distance(state["start"], state["end"], pixel_scale, color)
+        if kind == AREA:
+            points = state.get("points", [])
+            if len(points) < 3:
+                return None
+            return cls.area(
+                points,
+                pixel_scale,
+                color,
+                area_px=state.get("area_px"),
+                pixel_count=state.get("pixel_count"),
+            )
+        return None
@@ -3,60 +3,173 @@ TIFF metadata parsing utilities.
 
 This module contains functions to extract and parse metadata from TIFF files,
 specifically focusing on Zeiss SEM metadata tags and ImageDescription JSON data.
+
+All metadata is gathered in a single pass into a SemImageInfo record, which is
+cached by path, modification time and size so that repeated lookups for the
+same file do not reopen it.
 """
 
+import os
+import threading
+from collections import OrderedDict
+
 import tifffile
 import json
 
+from .annotation_io import read_sidecar, sidecar_path
 
-def get_pixel_scale(file_path):
+ZEISS_TAG = 34118
+IMAGE_DESCRIPTION_TAG = 270
+
+_INFO_CACHE_SIZE = 256
+_info_cache = OrderedDict()
+_info_cache_lock = threading.Lock()
+
+
+class SemImageInfo:
     """
-    Extracts pixel scale from a TIFF file.
-    Returns scale in meters per pixel.
+    Metadata parsed from one open of a TIFF file.
+
+    Attributes:
+        file_path (str): Path of the parsed file.
+        pixel_scale (float or None): Pixel size in meters per pixel.
+        context (dict): Context fields (Tool, Beam Voltage, Mag, ...) plus
+            "Measurements"/"Annotations" from the ImageDescription JSON or,
+            if present, the annotation sidecar file.
+        zeiss_raw (bytes or None): Raw bytes of the Zeiss tag 34118.
+        page_shapes (list of tuple): Shape of every page.
+        page_dtypes (list of np.dtype): Data type of every page.
+    """
+
+    def __init__(
+        self,
+        file_path,
+        pixel_scale=None,
+        context=None,
+        zeiss_raw=None,
+        page_shapes=None,
+        page_dtypes=None,
+    ):
+        self.file_path = file_path
+        self.pixel_scale = pixel_scale
+        self.context = context if context is not None else {}
+        self.zeiss_raw = zeiss_raw
+        self.page_shapes = page_shapes if page_shapes is not None else []
+        self.page_dtypes = page_dtypes if page_dtypes is not None else []
+
+    @property
+    def annotations(self):
+        """Annotation state stored in the ImageDescription, if any."""
+        return self.context.get("Annotations")
+
+
+def read_image_info(file_path, tif=None):
+    """
+    Parses all metadata of a TIFF file in a single pass.
+
+    Results are cached by (path, mtime, size) of the file and its annotation
+    sidecar; a modified file is parsed again.
+
+    Args:
+        file_path (str): Path to the TIFF file.
+        tif (tifffile.TiffFile, optional): An already open handle for
+            `file_path`, reused instead of opening the file again.
+
+    Returns:
+        SemImageInfo: The parsed metadata.
     """
+    stat = os.stat(file_path)
     try:
+        sidecar_mtime = os.stat(sidecar_path(file_path)).st_mtime_ns
+    except OSError:
+        sidecar_mtime = None
+    key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, sidecar_mtime)
+
+    with _info_cache_lock:
+        info = _info_cache.get(key)
+        if info is not None:
+            _info_cache.move_to_end(key)
+            return info
+
+    if tif is None:
         with tifffile.TiffFile(file_path) as tif:
-            page = tif.pages[0]
+            info = _parse_image_info(file_path, tif)
+    else:
+        info = _parse_image_info(file_path, tif)
+
+    with _info_cache_lock:
+        _info_cache[key] = info
+        while len(_info_cache) > _INFO_CACHE_SIZE:
+            _info_cache.popitem(last=False)
+    return info
+
+
+def _parse_image_info(file_path, tif):
+    pages = list(tif.pages)
+    page = pages[0]
+
+    zeiss_data = None
+    zeiss_raw = None
+    if ZEISS_TAG in page.tags:
+        tag = page.tags[ZEISS_TAG]
+        zeiss_data = tag.value
+        # Read raw bytes so the tag can be copied verbatim on save
+        tif.filehandle.seek(tag.valueoffset)
+        zeiss_raw = tif.filehandle.read(tag.count)
+
+    description = None
+    if IMAGE_DESCRIPTION_TAG in page.tags:
+        description = page.tags[IMAGE_DESCRIPTION_TAG].value
+
+    return SemImageInfo(
+        file_path,
+        pixel_scale=_parse_pixel_scale(zeiss_data),
+        context=_parse_context(zeiss_data, description, read_sidecar(file_path)),
+        zeiss_raw=zeiss_raw,
+        page_shapes=[p.shape for p in pages],
+        page_dtypes=[p.dtype for p in pages],
+    )
 
-            # Check for Zeiss metadata (Tag 34118)
-            if 34118 in page.tags:
-                data = page.tags[34118].value
-                if isinstance(data, dict):
-                    # Look for ap_image_pixel_size
-                    if "ap_image_pixel_size" in data:
-                        # Value is typically a tuple like ('Pixel Size', 3.166, 'nm')
-                        # Or sometimes just a float if we are lucky, but based on analysis it's a tuple
-                        val = data["ap_image_pixel_size"]
-                        if isinstance(val, tuple) and len(val) >= 3:
-                            value = float(val[1])
-                            unit = val[2]
-
-                            if unit == "nm":
-                                return value * 1e-9
-                            elif unit == "um" or unit == "µm":
-                                return value * 1e-6
-                            elif unit == "mm":
-                                return value * 1e-3
-                            elif unit == "m":
-                                return value
-
-                    # Fallback to dp_pixel_size if available
-                    if "dp_pixel_size" in data:
-                        val = data["dp_pixel_size"]
-                        # Assuming similar structure
-                        if isinstance(val, tuple) and len(val) >= 3:
-                            value = float(val[1])
-                            unit = val[2]
-                            if unit == "nm":
-                                return value * 1e-9
-                            elif unit == "um" or unit == "µm":
-                                return value * 1e-6
-
-            # Check standard XResolution (Tag 282)
-            # This is often in pixels per unit, not size per pixel
-            # And unit is defined in ResolutionUnit (Tag 296)
-            # But SEMs often don't set this correctly or use it for print size (DPI)
-            # So we prioritize proprietary tags.
+
+def _parse_pixel_scale(data):
+    """Returns the pixel scale in meters per pixel from Zeiss tag data."""
+    try:
+        if isinstance(data, dict):
+            # Look for ap_image_pixel_size
+            if "ap_image_pixel_size" in data:
+                # Value is typically a tuple like ('Pixel Size', 3.166, 'nm')
+                # Or sometimes just a float if we are lucky, but based on analysis it's a tuple
+                val = data["ap_image_pixel_size"]
+                if isinstance(val, tuple) and len(val) >= 3:
+                    value = float(val[1])
+                    unit = val[2]
+
+                    if unit == "nm":
+                        return value * 1e-9
+                    elif unit == "um" or unit == "µm":
+                        return value * 1e-6
+                    elif unit == "mm":
+                        return value * 1e-3
+                    elif unit == "m":
+                        return value
+
+            # Fallback to dp_pixel_size if available
+            if "dp_pixel_size" in data:
+                val = data["dp_pixel_size"]
+                # Assuming similar structure
+                if isinstance(val, tuple) and len(val) >= 3:
+                    value = float(val[1])
+                    unit = val[2]
+                    if unit == "nm":
+                        return value * 1e-9
+                    elif unit == "um" or unit == "µm":
+                        return value * 1e-6
+
+        # Check standard XResolution (Tag 282)
+        # This is often in pixels per unit, not size per pixel
+        # And unit is defined in ResolutionUnit (Tag 296)
+        # But SEMs often don't set this correctly or use it for print size (DPI)
+        # So we prioritize proprietary tags.
 
     except Exception as e:
         print(f"Error parsing metadata: {e}")
@@ -64,109 +177,135 @@ def get_pixel_scale(file_path):
     return None
 
 
-def get_metadata_context(file_path):
+def _parse_context(data, desc, sidecar=None):
     """
-    Extracts context metadata (Tool, Voltage, Mag, etc.) from a TIFF file.
-    Returns a dictionary of key-value pairs.
+    Builds the context dictionary from Zeiss tag data and ImageDescription.
+
+    Annotations in the `sidecar` object take precedence over those in the
+    ImageDescription.
     """
     context = {}
     try:
-        with tifffile.TiffFile(file_path) as tif:
-            page = tif.pages[0]
-            if 34118 in page.tags:
-                data = page.tags[34118].value
+        if isinstance(data, dict):
+            # Helper to safely get value from tuple/list or direct value
+            def get_val(key):
+                if key in data:
+                    val = data[key]
+                    if isinstance(val, (list, tuple)) and len(val) > 1:
+                        return val[
+                            1
+                        ]  # Usually ('Label', value, unit) or ('Label', value)
+                    return val
+                return None
+
+            # Tool Name
+            context["Tool"] = (
+                get_val("sv_serial_number") or get_val("sv_instrument_id") or "Unknown"
+            )
+
+            # Voltage (EHT)
+            eht = (
+                get_val("ap_actualkv")
+                or get_val("ap_eht")
+                or get_val("ap_voltage")
+                or get_val("ap_highvoltage")
+            )
+            if eht:
+                context["Beam Voltage"] = f"{eht} kV"
+
+            # Aperture
+            aperture = get_val("ap_aperture_size") or get_val("dp_opt_aperture")
+            if aperture:
+                context["Aperture"] = f"{aperture}"
+
+            # Working Distance
+            wd = get_val("ap_wd") or get_val("ap_working_distance")
+            if wd:
+                # WD is usually in meters or mm, need to check unit if possible, assuming mm or m
+                # Based on sample, it might be a float. Let's just store it as is for now.
+                context["WD"] = f"{wd}"
+
+            # Mag
+            mag = get_val("ap_mag") or get_val("ap_magnification")
+            if mag:
+                # Fix "K X x" issue. If mag is a string and has "X", don't append "x"
+                if isinstance(mag, str) and ("X" in mag or "x" in mag):
+                    context["Mag"] = mag
+                else:
+                    context["Mag"] = f"{mag} x"
+
+            # Date/Time
+            date_val = get_val("ap_date")
+            time_val = get_val("ap_time")
+            if date_val:
+                if time_val:
+                    context["Date"] = f"{date_val} {time_val}"
+                else:
+                    context["Date"] = date_val
+
+            # Author
+            author = get_val("sv_user_name") or get_val("sv_operator")
+            if author:
+                context["Author"] = author
+
+        # Check ImageDescription (Tag 270) for measurements
+        if desc:
+            try:
+                # Try to parse as JSON
+                data = json.loads(desc)
                 if isinstance(data, dict):
-                    # Helper to safely get value from tuple/list or direct value
-                    def get_val(key):
-                        if key in data:
-                            val = data[key]
-                            if isinstance(val, (list, tuple)) and len(val) > 1:
-                                return val[
-                                    1
-                                ]  # Usually ('Label', value, unit) or ('Label', value)
-                            return val
-                        return None
-
-                    # Tool Name
-                    context["Tool"] = (
-                        get_val("sv_serial_number")
-                        or get_val("sv_instrument_id")
-                        or "Unknown"
-                    )
-
-                    # Voltage (EHT)
-                    eht = (
-                        get_val("ap_actualkv")
-                        or get_val("ap_eht")
-                        or get_val("ap_voltage")
-                        or get_val("ap_highvoltage")
-                    )
-                    if eht:
-                        context["Beam Voltage"] = f"{eht} kV"
-
-                    # Aperture
-                    aperture = get_val("ap_aperture_size") or get_val("dp_opt_aperture")
-                    if aperture:
-                        context["Aperture"] = f"{aperture}"
-
-                    # Working Distance
-                    wd = get_val("ap_wd") or get_val("ap_working_distance")
-                    if wd:
-                        # WD is usually in meters or mm, need to check unit if possible, assuming mm or m
-                        # Based on sample, it might be a float. Let's just store it as is for now.
-                        context["WD"] = f"{wd}"
-
-                    # Mag
-                    mag = get_val("ap_mag") or get_val("ap_magnification")
-                    if mag:
-                        # Fix "K X x" issue. If mag is a string and has "X", don't append "x"
-                        if isinstance(mag, str) and ("X" in mag or "x" in mag):
-                            context["Mag"] = mag
-                        else:
-                            context["Mag"] = f"{mag} x"
-
-                    # Date/Time
-                    date_val = get_val("ap_date")
-                    time_val = get_val("ap_time")
-                    if date_val:
-                        if time_val:
-                            context["Date"] = f"{date_val} {time_val}"
-                        else:
-                            context["Date"] = date_val
-
-                    # Author
-                    author = get_val("sv_user_name") or get_val("sv_operator")
-                    if author:
-                        context["Author"] = author
-
-            # Check for ImageDescription (Tag 270) for measurements
-            if 270 in page.tags:
-                desc = page.tags[270].value
-                if desc:
-                    try:
-                        # Try to parse as JSON
-                        data = json.loads(desc)
-                        if isinstance(data, dict):
-                            if "measurements" in data:
-                                context["Measurements"] = data["measurements"]
-                            if "annotations" in data:
-                                context["Annotations"] = data["annotations"]
-
-                            # Backfill colors for measurements if missing (for backward compatibility)
-                            if "Measurements" in context and "Annotations" in context:
-                                measurements = context["Measurements"]
-                                annotations = context["Annotations"]
-                                if len(measurements) == len(annotations):
-                                    for i, m in enumerate(measurements):
-                                        if "color" not in m:
-                                            m["color"] = annotations[i].get(
-                                                "color", "#000000"
-                                            )
-                    except json.JSONDecodeError:
-                        # Not JSON, maybe just text description
-                        pass
+                    _add_annotations(context, data)
+            except json.JSONDecodeError:
+                # Not JSON, maybe just text description
+                pass
+
+        if sidecar:
+            _add_annotations(context, sidecar)
 
     except Exception as e:
         print(f"Error parsing context: {e}")
 
     return context
+
+
+def _add_annotations(context, data):
+    """Adds the measurements and annotations of a description object."""
+    if "measurements" in data:
+        context["Measurements"] = data["measurements"]
+    if "annotations" in data:
+        context["Annotations"] = data["annotations"]
+
+    # Backfill colors for measurements if missing (for backward compatibility)
+    if "Measurements" in context and "Annotations" in context:
+        measurements = context["Measurements"]
+        annotations = context["Annotations"]
+        if len(measurements) == len(annotations):
+            for i, m in enumerate(measurements):
+                if "color" not in m:
+                    m["color"] = annotations[i].get("color", "#000000")
+
+
+def get_pixel_scale(file_path):
+    """
+    Extracts pixel scale from a TIFF file.
+    Returns scale in meters per pixel.
+    """
+    try:
+        return read_image_info(file_path).pixel_scale
+    except Exception as e:
+        print(f"Error parsing metadata: {e}")
+
+    return None
+
+
+def get_metadata_context(file_path):
+    """
+    Extracts context metadata (Tool, Voltage, Mag, etc.) from a TIFF file.
+    Returns a dictionary of key-value pairs.
+    """
+    try:
+        return dict(read_image_info(file_path).context)
+    except Exception as e:
+        print(f"Error parsing context: {e}")
+
+    return {}
@@ -0,0 +1,187 @@
+"""
+Lazy TIFF page access for SEM Viewer.
+
+This module provides the PageStore class, which keeps a TIFF file open and
+decodes its pages only when they are requested, holding a bounded number of
+decoded pages in memory.
+
+Uncompressed pages stored contiguously in native byte order are not decoded
+at all: they are returned as read-only np.memmap views of the file. Opening
+a large frame is then near-instant and the frame is not held in process
+memory; its bytes are read from disk (and cached by the OS) as they are
+used. Analysis reads only the ROI, but displaying a page still reads all of
+it once, for the default levels of 16-bit data and the zoomed-out overview.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import tifffile
+
+from .display import DisplayCache
+from .histogram import PageHistogram, supports_histogram
+
+
+def apply_colormap(page, data):
+    """
+    Maps palette indices to RGB if the page carries a colormap.
+
+    Args:
+        page (tifffile.TiffPage): The page the data was decoded from.
+        data (np.ndarray): The decoded page data.
+
+    Returns:
+        np.ndarray: RGB data for palette images, otherwise `data` unchanged.
+    """
+    if page.colormap is None or data.ndim != 2:
+        return data
+
+    # Colormap is typically (3, 2**bps); transpose to (N, 3) for indexing
+    palette = np.array(page.colormap).T
+
+    # Normalize to 8-bit if necessary (often 16-bit in TIFF)
+    if palette.max() > 255:
+        palette = (palette / 256).astype(np.uint8)
+    else:
+        palette = palette.astype(np.uint8)
+
+    return palette[data]
+
+
+def can_memmap(page):
+    """
+    Returns True if a page can be memory-mapped from its file as is.
+
+    The page must be uncompressed and contiguous (see
+    TiffPage.is_memmappable), and in native byte order so the mapped array
+    behaves like a decoded one.
+    """
+    if not page.keyframe.is_memmappable:
+        return False
+    return np.dtype(page.parent.byteorder + page.dtype.char).isnative
+
+
+class PageStore:
+    """
+    Decodes the pages of a TIFF file on demand.
+
+    The TiffFile handle stays open for the lifetime of the store so that
+    page headers are parsed only once. Decoded pages are kept in a small
+    LRU cache; the least recently used page is dropped once `cache_size`
+    pages are held, together with its 8-bit display conversion and value
+    histograms.
+
+    With `memmap` set, pages that can be memory-mapped (see can_memmap) are
+    returned as read-only np.memmap arrays instead of being decoded.
+    """
+
+    def __init__(self, file_path, cache_size=2, memmap=True):
+        self.file_path = file_path
+        self.cache_size = max(1, cache_size)
+        self.memmap = memmap
+        self.tif = tifffile.TiffFile(file_path)
+        self.pages = list(self.tif.pages)
+        self._cache = OrderedDict()
+        self._display = {}
+        self._histograms = {}
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.pages)
+        if not 0 <= index < len(self.pages):
+            raise IndexError(f"Page {index} out of range")
+
+        if index in self._cache:
+            self._cache.move_to_end(index)
+            return self._cache[index]
+
+        page = self.pages[index]
+        if self.memmap and can_memmap(page):
+            data = page.asarray(out="memmap")
+        else:
+            data = page.asarray()
+        data = apply_colormap(page, data)
+
+        self._cache[index] = data
+        while len(self._cache) > self.cache_size:
+            evicted, _ = self._cache.popitem(last=False)
+            self._display.pop(evicted, None)
+            self._histograms.pop(evicted, None)
+        return data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def display_cache(self, index):
+        """Returns the DisplayCache holding the 8-bit conversion of a page."""
+        data = self[index]
+        if index < 0:
+            index += len(self.pages)
+        cache = self._display.get(index)
+        if cache is None or cache.data is not data:
+            cache = DisplayCache(data)
+            self._display[index] = cache
+        return cache
+
+    def display(self, index, black=None, white=None, gamma=1.0):
+        """
+        Returns a page converted to uint8 for display.
+
+        The lookup table and the result are cached with the page, so asking
+        again with the same window/level/gamma costs nothing.
+        """
+        return self.display_cache(index).convert(black, white, gamma)
+
+    def page_histogram(self, index):
+        """
+        Returns the PageHistogram of a page, or None if the page is not
+        single-channel integer data of up to 16 bits.
+        """
+        data = self[index]
+        if index < 0:
+            index += len(self.pages)
+        if not supports_histogram(data):
+            return None
+        histogram = self._histograms.get(index)
+        if histogram is None or histogram.data is not data:
+            histogram = PageHistogram(data)
+            self._histograms[index] = histogram
+        return histogram
+
+    def is_cached(self, index):
+        """Returns True if the page at `index` is already decoded."""
+        return index in self._cache
+
+    def read_ahead(self, index, chunk_size=4 * 1024 * 1024):
+        """
+        Reads the file bytes of a memory-mapped page once, so that the OS has
+        them cached when the page is displayed. Does nothing for decoded
+        pages, which are already in memory.
+        """
+        data = self[index]
+        if not isinstance(data, np.memmap):
+            return
+        remaining = data.nbytes
+        buffer = memoryview(bytearray(min(remaining, chunk_size)))
+        with open(data.filename, "rb") as f:
+            f.seek(data.offset)
+            while remaining > 0:
+                read = f.readinto(buffer[: min(remaining, len(buffer))])
+                if not read:
+                    break
+                remaining -= read
+
+    def close(self):
+        """Releases decoded pages and closes the underlying file."""
+        self._cache.clear()
+        self._display.clear()
+        self._histograms.clear()
+        if self.tif is not None:
+            self.tif.close()
+            self.tif = None
@@ -0,0 +1,185 @@
+"""
+Background prefetching of image files for SEM Viewer.
+
+This module provides the FilePrefetcher class, which opens and decodes files
+that are likely to be viewed next on a thread pool and holds the results in a
+memory-bounded cache until they are taken.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .metadata_parser import read_image_info
+from .page_store import PageStore
+
+
+class PrefetchedFile:
+    """
+    A file opened ahead of time: its page store (page 0 decoded) and metadata.
+
+    `nbytes` is the memory page 0 holds; a memory-mapped page counts as
+    nothing, since its bytes live in the OS file cache.
+    """
+
+    def __init__(self, file_path, store, info):
+        self.file_path = file_path
+        self.store = store
+        self.info = info
+        stat = os.stat(file_path)
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        self.nbytes = 0
+        if len(store) and not isinstance(store[0], np.memmap):
+            self.nbytes = store[0].nbytes
+
+    def is_current(self):
+        """Returns True if the file has not changed on disk since it was loaded."""
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return False
+        return self.signature == (stat.st_mtime_ns, stat.st_size)
+
+    def close(self):
+        self.store.close()
+
+
+def load_file(file_path):
+    """
+    Opens `file_path`, decodes its first page and parses its metadata.
+
+    A memory-mapped first page is read ahead instead, warming the OS file
+    cache.
+    """
+    store = PageStore(file_path)
+    try:
+        info = read_image_info(file_path, tif=store.tif)
+        if len(store):
+            store[0]
+            store.read_ahead(0)
+        return PrefetchedFile(file_path, store, info)
+    except Exception:
+        store.close()
+        raise
+
+
+class FilePrefetcher:
+    """
+    Loads files in the background into a memory-bounded cache.
+
+    Each call to `prefetch` replaces the set of wanted files: queued loads
+    for files that are no longer wanted are cancelled, and loads that are
+    already running are discarded when they finish. Loaded files stay cached
+    until they are taken or evicted (least recently loaded first) to keep the
+    decoded data under `memory_budget` bytes.
+    """
+
+    def __init__(self, max_workers=2, memory_budget=512 * 1024 * 1024):
+        self.memory_budget = memory_budget
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="sem_view_prefetch"
+        )
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._futures = {}
+        self._wanted = set()
+
+    def prefetch(self, file_paths):
+        """
+        Schedules background loads for `file_paths`, in priority order.
+
+        Pending loads for any other file are cancelled.
+        """
+        with self._lock:
+            self._wanted = set(file_paths)
+            for path, future in list(self._futures.items()):
+                if path not in self._wanted and future.cancel():
+                    del self._futures[path]
+
+            submitted = []
+            for path in file_paths:
+                if path in self._cache or path in self._futures:
+                    continue
+                future = self._executor.submit(load_file, path)
+                self._futures[path] = future
+                submitted.append((path, future))
+
+        # Registered outside the lock: a finished future runs its callback
+        # immediately in this thread
+        for path, future in submitted:
+            future.add_done_callback(lambda f, path=path: self._on_loaded(path, f))
+
+    def take(self, file_path, wait=True):
+        """
+        Removes and returns the prefetched file for `file_path`.
+
+        If a load for the file is in progress and `wait` is True, blocks until
+        it finishes rather than starting a second load.
+
+        Returns:
+            PrefetchedFile or None: The loaded file, or None if it is not
+            available (not prefetched, failed, or changed on disk).
+        """
+        with self._lock:
+            entry = self._cache.pop(file_path, None)
+            future = None
+            if entry is None and wait:
+                # Claim the running load so its result is handed to us
+                future = self._futures.pop(file_path, None)
+
+        if future is not None:
+            try:
+                entry = future.result()
+            except Exception:
+                return None
+
+        if entry is not None and not entry.is_current():
+            entry.close()
+            return None
+        return entry
+
+    def cancel(self):
+        """Cancels all pending loads and drops every cached file."""
+        self.prefetch([])
+        with self._lock:
+            entries = list(self._cache.values())
+            self._cache.clear()
+        for entry in entries:
+            entry.close()
+
+    def shutdown(self):
+        """Cancels pending work and stops the worker threads."""
+        self.cancel()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self.cancel()
+
+    def _on_loaded(self, path, future):
+        if future.cancelled():
+            return
+
+        evicted = []
+        with self._lock:
+            if self._futures.get(path) is not future:
+                # Claimed by take(); the caller owns the result
+                return
+            del self._futures[path]
+
+            if future.exception() is not None:
+                return
+            entry = future.result()
+
+            if path not in self._wanted or entry.nbytes > self.memory_budget:
+                evicted.append(entry)
+            else:
+                self._cache[path] = entry
+                total = sum(e.nbytes for e in self._cache.values())
+                while total > self.memory_budget:
+                    _, old = self._cache.popitem(last=False)
+                    total -= old.nbytes
+                    evicted.append(old)
+
+        for entry in evicted:
+            entry.close()
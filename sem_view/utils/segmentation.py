@@ -0,0 +1,335 @@
+"""
+Segmentation engines for auto-area.
+
+An engine turns the pixels of a region of interest into a foreground mask;
+find_overlap_area then cleans the mask up and traces its outline. Engines
+are registered by name with `register_engine` and all take a
+RegionOfInterest plus optional keyword parameters:
+
+    @register_engine("my_engine")
+    def my_engine(region, **params):
+        return region.image > region.threshold()
+
+Built-in engines:
+    threshold: Global threshold (Otsu, Li or triangle) of the ROI pixels.
+    local: Adaptive (Gaussian-weighted local mean) threshold, for frames with
+        shading or charging gradients.
+    flood: Flood fill from a seed point within an intensity tolerance.
+    watershed: Watershed on the intensity gradient, seeded from the
+        confidently bright and dark parts of the ROI.
+
+`grow_region` segments without an ROI: it grows the feature under a single
+seed point, looking only at a window around the seed that is enlarged
+while the feature reaches its border.
+"""
+
+import numpy as np
+from scipy import ndimage as ndi
+from skimage.filters import (
+    threshold_otsu,
+    threshold_li,
+    threshold_triangle,
+    threshold_local,
+    sobel,
+)
+from skimage.morphology import disk
+from skimage.segmentation import flood, watershed
+
+from .histogram import PageHistogram, histogram_threshold, supports_histogram
+
+# Thresholds for data without a value histogram (float, RGB or 32-bit)
+PIXEL_THRESHOLDS = {
+    "otsu": threshold_otsu,
+    "li": threshold_li,
+    "triangle": threshold_triangle,
+}
+
+ENGINES = {}
+
+# Default region growing tolerance, in robust noise standard deviations
+GROW_TOLERANCE_SIGMAS = 4.0
+# Initial window (pixels per side) around the seed for region growing
+GROW_WINDOW = 64
+
+
+def register_engine(name):
+    """Decorator registering a segmentation engine under `name`."""
+
+    def decorator(func):
+        ENGINES[name] = func
+        return func
+
+    return decorator
+
+
+def get_engine(name):
+    """Returns the engine registered as `name`."""
+    try:
+        return ENGINES[name]
+    except KeyError:
+        available = ", ".join(sorted(ENGINES))
+        raise ValueError(
+            f"Unknown segmentation engine: {name} (available: {available})"
+        ) from None
+
+
+def to_gray(data):
+    """Averages RGB(A) data to a single channel of the same dtype."""
+    if data.ndim == 3 and data.shape[2] in (3, 4):
+        # Simple RGB to Grayscale: 0.299 R + 0.587 G + 0.114 B
+        # Or just use mean for simplicity in this context
+        return np.mean(data[:, :, :3], axis=2).astype(data.dtype)
+    return data
+
+
+def pixel_threshold(values, method="otsu"):
+    """Thresholds an array of ROI pixel values with scikit-image."""
+    try:
+        return PIXEL_THRESHOLDS[method](values)
+    except KeyError:
+        raise ValueError(f"Unknown threshold method: {method}") from None
+    except Exception:
+        # Fallback if ROI is uniform
+        return values.mean()
+
+
+class RegionOfInterest:
+    """
+    The pixels an engine segments.
+
+    Attributes:
+        image (np.ndarray): Grayscale crop of the page around the ROI.
+        mask (np.ndarray): Boolean ROI mask of the crop.
+        box (tuple): (y0, y1, x0, x1) of the crop in page coordinates.
+        seed (tuple): (row, col) seed in crop coordinates, or None.
+        method (str): Threshold method for `threshold` ("otsu", "li", "triangle").
+    """
+
+    def __init__(self, image, mask, box, seed=None, histogram=None, method="otsu"):
+        self.image = image
+        self.mask = mask
+        self.box = box
+        self.seed = seed
+        self.method = method
+        self._histogram = histogram  # PageHistogram of the page, if any
+        self._counts = None
+        self._thresholds = {}
+
+    def counts(self):
+        """Returns the value histogram of the ROI pixels, or None for float data."""
+        if self._counts is None and supports_histogram(self.image):
+            if self._histogram is not None:
+                self._counts = self._histogram.masked(self.mask, self.box)
+            else:
+                self._counts = PageHistogram(self.image).masked(self.mask)
+        return self._counts
+
+    @property
+    def offset(self):
+        """Value counted by the first bin of `counts`."""
+        return int(np.iinfo(self.image.dtype).min)
+
+    def threshold(self, method=None):
+        """Returns the global threshold of the ROI pixels."""
+        method = method or self.method
+        if method not in self._thresholds:
+            counts = self.counts()
+            if counts is not None:
+                value = histogram_threshold(counts, self.offset, method)
+            else:
+                value = pixel_threshold(self.image[self.mask], method)
+            self._thresholds[method] = value
+        return self._thresholds[method]
+
+    def class_means(self, threshold):
+        """Returns the mean ROI value at or below and above `threshold`."""
+        counts = self.counts()
+        if counts is not None:
+            values = np.arange(len(counts)) + self.offset
+            below = values <= threshold
+            means = []
+            for part in (below, ~below):
+                total = counts[part].sum()
+                means.append(
+                    np.dot(counts[part], values[part]) / total if total else threshold
+                )
+            return tuple(means)
+
+        values = self.image[self.mask]
+        low, high = values[values <= threshold], values[values > threshold]
+        return (
+            low.mean() if len(low) else threshold,
+            high.mean() if len(high) else threshold,
+        )
+
+
+@register_engine("threshold")
+def threshold_engine(region, method=None):
+    """
+    Global threshold of the ROI pixels.
+
+    Args:
+        method (str, optional): Overrides the region's threshold method.
+    """
+    # Assuming overlap is brighter; usually metal on substrate is brighter
+    # in SEM
+    return (region.image > region.threshold(method)) & region.mask
+
+
+@register_engine("local")
+def local_engine(region, block_size=None, offset=None):
+    """
+    Adaptive threshold against the Gaussian-weighted local mean.
+
+    Args:
+        block_size (int, optional): Odd neighborhood size in pixels; defaults
+            to about half the ROI size.
+        offset (float, optional): Subtracted from the local mean. Defaults to
+            minus a quarter of the gap between the global background and
+            foreground means, so substrate noise stays below the threshold.
+    """
+    if block_size is None:
+        block_size = max(region.image.shape) // 2
+    block_size = max(int(block_size) | 1, 3)
+    if offset is None:
+        low, high = region.class_means(region.threshold())
+        offset = -(float(high) - float(low)) / 4
+    local = threshold_local(
+        region.image.astype(np.float32), block_size, method="gaussian", offset=offset
+    )
+    return (region.image > local) & region.mask
+
+
+def _interior_point(mask):
+    """Returns the (row, col) of `mask` farthest from its background."""
+    distance = ndi.distance_transform_edt(mask)
+    return np.unravel_index(np.argmax(distance), mask.shape)
+
+
+@register_engine("flood")
+def flood_engine(region, tolerance=None):
+    """
+    Flood fill from the seed over pixels within `tolerance` of its value.
+
+    Without a seed the fill starts at the most interior pixel of the
+    thresholded foreground.
+
+    Args:
+        tolerance (float, optional): Intensity tolerance; defaults to half the
+            gap between the background and foreground means.
+    """
+    threshold = region.threshold()
+    seed = region.seed
+    if seed is None or not region.mask[seed]:
+        foreground = (region.image > threshold) & region.mask
+        if not foreground.any():
+            return foreground
+        seed = _interior_point(foreground)
+
+    if tolerance is None:
+        low, high = region.class_means(threshold)
+        tolerance = (float(high) - float(low)) / 2
+    filled = flood(region.image, tuple(int(v) for v in seed), tolerance=tolerance)
+    return filled & region.mask
+
+
+@register_engine("watershed")
+def watershed_engine(region, marker_radius=2):
+    """
+    Watershed of the intensity gradient from bright and dark markers.
+
+    Markers are the pixels above and at or below the global threshold,
+    eroded by `marker_radius` so only confident pixels seed the flooding;
+    the boundary then follows the strongest edge between them.
+    """
+    threshold = region.threshold()
+    bright = region.image > threshold
+    footprint = disk(marker_radius)
+    markers = np.zeros(region.image.shape, dtype=np.int32)
+    markers[ndi.binary_erosion(~bright & region.mask, footprint)] = 1
+    markers[ndi.binary_erosion(bright & region.mask, footprint)] = 2
+
+    gradient = sobel(region.image.astype(np.float32))
+    labels = watershed(gradient, markers, mask=region.mask)
+    return labels == 2
+
+
+def _patch(image_data, row, col, radius):
+    height, width = image_data.shape[:2]
+    patch = image_data[
+        max(row - radius, 0) : min(row + radius + 1, height),
+        max(col - radius, 0) : min(col + radius + 1, width),
+    ]
+    return to_gray(patch).astype(np.float64)
+
+
+def seed_statistics(image_data, seed):
+    """
+    Returns (reference value, noise sigma) around a (row, col) seed.
+
+    The reference is the median of the 5x5 neighborhood, so a single noisy
+    seed pixel does not skew it; sigma is the scaled median absolute
+    deviation of the 15x15 neighborhood.
+    """
+    row, col = seed
+    reference = np.median(_patch(image_data, row, col, 2))
+    patch = _patch(image_data, row, col, 7)
+    sigma = 1.4826 * np.median(np.abs(patch - np.median(patch)))
+    return reference, sigma
+
+
+def grow_region(image_data, seed, tolerance=None, window=GROW_WINDOW):
+    """
+    Grows the connected region around a seed with similar intensity.
+
+    Pixels within `tolerance` of the seed's reference value that are
+    connected to the seed belong to the region. Only a window around the
+    seed is examined; the window doubles toward any side the region reaches
+    until the region is enclosed, so the cost follows the feature size
+    rather than the frame size.
+
+    Args:
+        image_data (np.ndarray): Grayscale or RGB page data.
+        seed (tuple): (row, col) inside the feature.
+        tolerance (float, optional): Intensity tolerance; defaults to
+            GROW_TOLERANCE_SIGMAS times the noise around the seed.
+        window (int): Initial window size in pixels.
+
+    Returns:
+        tuple: (boolean region mask of the window, (y0, y1, x0, x1) window box)
+    """
+    height, width = image_data.shape[:2]
+    row, col = int(seed[0]), int(seed[1])
+    if not (0 <= row < height and 0 <= col < width):
+        raise ValueError(f"Seed {seed} is outside the image")
+
+    reference, sigma = seed_statistics(image_data, (row, col))
+    if tolerance is None:
+        tolerance = max(GROW_TOLERANCE_SIGMAS * sigma, 1.0)
+
+    half = max(window // 2, 1)
+    y0, y1 = max(row - half, 0), min(row + half + 1, height)
+    x0, x1 = max(col - half, 0), min(col + half + 1, width)
+    while True:
+        block = to_gray(image_data[y0:y1, x0:x1])
+        similar = np.abs(block.astype(np.float32) - reference) <= tolerance
+        similar[row - y0, col - x0] = True
+        region = flood(similar, (row - y0, col - x0))
+
+        # Enlarge toward every side the region touches, unless it is the
+        # image border
+        grow_y, grow_x = y1 - y0, x1 - x0
+        new_box = (
+            max(y0 - grow_y, 0) if y0 > 0 and region[0].any() else y0,
+            min(y1 + grow_y, height) if y1 < height and region[-1].any() else y1,
+            max(x0 - grow_x, 0) if x0 > 0 and region[:, 0].any() else x0,
+            min(x1 + grow_x, width) if x1 < width and region[:, -1].any() else x1,
+        )
+        if new_box == (y0, y1, x0, x1):
+            return region, (y0, y1, x0, x1)
+        y0, y1, x0, x1 = new_box
+
+
+def segment(region, engine="threshold", **params):
+    """Runs the named engine on `region` and returns the foreground mask."""
+    return get_engine(engine)(region, **params)
@@ -0,0 +1,140 @@
+"""
+Thumbnail generation and on-disk caching for SEM Viewer.
+
+Thumbnails are small 8-bit previews of the first image in a TIFF file. They
+are read from embedded reduced-resolution images (SubIFDs or reduced pages)
+when the file has them, and stored in a persistent cache keyed by the source
+path, modification time and size.
+"""
+
+import hashlib
+import math
+import os
+import threading
+
+import numpy as np
+import tifffile
+
+from .page_store import apply_colormap
+
+THUMBNAIL_SIZE = 128
+
+
+def default_cache_dir():
+    """Returns the per-user directory used to store thumbnails."""
+    if os.name == "nt" and os.environ.get("LOCALAPPDATA"):
+        base = os.environ["LOCALAPPDATA"]
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".cache"
+        )
+    return os.path.join(base, "sem_view", "thumbnails")
+
+
+def _candidate_pages(tif):
+    """Yields the first image and its embedded reduced-resolution versions."""
+    page = tif.pages[0]
+    yield page
+    if page.pages is not None:
+        for sub in page.pages:
+            yield sub
+    for other in tif.pages[1:]:
+        if other.is_reduced:
+            yield other
+
+
+def to_uint8(data):
+    """Stretches `data` to the full 8-bit range (min to max)."""
+    if data.dtype == np.uint8:
+        return data
+    data = data.astype(np.float32)
+    lo, hi = float(data.min()), float(data.max())
+    if hi <= lo:
+        return np.zeros(data.shape, dtype=np.uint8)
+    data -= lo
+    data *= 255.0 / (hi - lo)
+    return data.astype(np.uint8)
+
+
+def make_thumbnail(file_path, size=THUMBNAIL_SIZE):
+    """
+    Creates a thumbnail of the first image in a TIFF file.
+
+    Uses the smallest embedded image that is still at least `size` pixels
+    on its shorter side, so full-resolution data is only decoded when the
+    file has no reduced-resolution versions.
+
+    Args:
+        file_path (str): Path to the TIFF file.
+        size (int): Maximum edge length of the thumbnail in pixels.
+
+    Returns:
+        np.ndarray: uint8 array of shape (h, w) or (h, w, 3).
+    """
+    with tifffile.TiffFile(file_path) as tif:
+        candidates = [p for p in _candidate_pages(tif) if len(p.shape) >= 2]
+        large_enough = [p for p in candidates if min(p.shape[:2]) >= size]
+        if large_enough:
+            page = min(large_enough, key=lambda p: p.shape[0] * p.shape[1])
+        else:
+            page = max(candidates, key=lambda p: p.shape[0] * p.shape[1])
+        data = apply_colormap(page, page.asarray())
+
+    # Reduce to a single grayscale plane or an RGB image
+    if data.ndim == 3 and data.shape[2] == 1:
+        data = data[:, :, 0]
+    while data.ndim > 3 or (data.ndim == 3 and data.shape[2] not in (3, 4)):
+        data = data[0]
+    if data.ndim == 3:
+        data = data[:, :, :3]
+
+    step = max(1, math.ceil(max(data.shape[:2]) / size))
+    return np.ascontiguousarray(to_uint8(data[::step, ::step]))
+
+
+class ThumbnailCache:
+    """
+    Persistent thumbnail store.
+
+    Each thumbnail is saved as a .npy file named after a hash of the source
+    path, modification time, file size and thumbnail size, so edited files
+    get a fresh thumbnail and stale entries are simply never read again.
+    """
+
+    def __init__(self, cache_dir=None, size=THUMBNAIL_SIZE):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.size = size
+
+    def cache_path(self, file_path):
+        stat = os.stat(file_path)
+        parts = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, self.size)
+        key = "|".join(str(part) for part in parts)
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest + ".npy")
+
+    def get(self, file_path):
+        """Returns the cached thumbnail for `file_path`, or None."""
+        try:
+            return np.load(self.cache_path(file_path))
+        except (OSError, ValueError):
+            return None
+
+    def put(self, file_path, thumbnail):
+        path = self.cache_path(file_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so readers never see partial data
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, thumbnail)
+        os.replace(tmp_path, path)
+
+    def get_or_create(self, file_path):
+        """Returns the cached thumbnail, generating and storing it if needed."""
+        thumbnail = self.get(file_path)
+        if thumbnail is None:
+            thumbnail = make_thumbnail(file_path, self.size)
+            try:
+                self.put(file_path, thumbnail)
+            except OSError as e:
+                print(f"Could not cache thumbnail: {e}")
+        return thumbnail
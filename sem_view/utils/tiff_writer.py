@@ -0,0 +1,179 @@
+"""
+Tiled, compressed TIFF writing for SEM Viewer.
+
+Annotated images are written as tiled TIFF pages whose tiles are streamed
+to tifffile one at a time, so a save never needs more than the page data
+it is given (or, for generated pages, a tile) in memory:
+
+    write_tiled(path, iter_tiles(data), data.shape, data.dtype)
+
+Compression is lossless. Deflate (zlib) is always available; LZW and
+Zstandard need the optional imagecodecs package, see
+`available_compressions`.
+
+This module does not import Qt.
+"""
+
+import io
+import os
+import struct
+from functools import lru_cache
+
+import numpy as np
+import tifffile
+
+# Edge length of the square TIFF tiles; a multiple of 16 as TIFF requires
+TILE_SIZE = 256
+
+# Lossless compressions offered for saving, by display name
+COMPRESSIONS = {"zlib": "zlib", "zstd": "zstd", "lzw": "lzw", "none": None}
+DEFAULT_COMPRESSION = "zlib"
+
+# Pages larger than this are written as BigTIFF
+BIGTIFF_BYTES = 2**32 - 2**25
+
+IMAGE_DESCRIPTION_TAG = 270
+
+
+@lru_cache(maxsize=None)
+def available_compressions():
+    """Returns the names in COMPRESSIONS that tifffile can encode here."""
+    sample = np.zeros((16, 16), dtype=np.uint8)
+    names = []
+    for name, compression in COMPRESSIONS.items():
+        try:
+            tifffile.imwrite(
+                io.BytesIO(), sample, tile=(16, 16), compression=compression
+            )
+        except Exception:
+            continue
+        names.append(name)
+    return names
+
+
+def iter_tiles(data, tile=TILE_SIZE):
+    """
+    Yields the tiles of a (height, width[, samples]) array in TIFF order.
+
+    Tiles are views of `data`; tiles on the right and bottom edges are
+    smaller than `tile` and padded by tifffile.
+    """
+    height, width = data.shape[:2]
+    for y in range(0, height, tile):
+        for x in range(0, width, tile):
+            yield data[y : y + tile, x : x + tile]
+
+
+def write_tiled(
+    file_path,
+    tiles,
+    shape,
+    dtype,
+    photometric="minisblack",
+    compression=DEFAULT_COMPRESSION,
+    description=None,
+    extratags=(),
+    tile=TILE_SIZE,
+):
+    """
+    Writes a single-page tiled TIFF from an iterable of tiles.
+
+    Args:
+        file_path (str): Output file.
+        tiles (iterable): Row-major (tile, tile[, samples]) arrays, as
+            yielded by `iter_tiles`.
+        shape (tuple): (height, width[, samples]) of the page.
+        dtype: Data type of the tiles.
+        photometric (str): "minisblack" for grayscale or "rgb".
+        compression (str): A key of COMPRESSIONS.
+        description (str, optional): ImageDescription of the page.
+        extratags (sequence): tifffile extratags, e.g. the Zeiss metadata.
+        tile (int): Tile edge length, a multiple of 16.
+
+    Raises:
+        ValueError: If the compression is unknown or not available.
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+    if compression not in available_compressions():
+        raise ValueError(f"Compression {compression} requires imagecodecs")
+
+    nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    with tifffile.TiffWriter(file_path, bigtiff=nbytes > BIGTIFF_BYTES) as tif:
+        tif.write(
+            iter(tiles),
+            shape=shape,
+            dtype=dtype,
+            tile=(tile, tile),
+            photometric=photometric,
+            compression=COMPRESSIONS[compression],
+            description=description,
+            extratags=extratags,
+        )
+
+
+def update_description(file_path, description):
+    """
+    Replaces the ImageDescription of the first page in place.
+
+    Image data and all other pages are left untouched, so the file keeps
+    its original bit depth and pages byte for byte. A longer description
+    is appended to the end of the file; if the first page has no
+    ImageDescription yet, a copy of its IFD with the tag added is appended
+    and the header pointed at it.
+
+    Args:
+        file_path (str): TIFF file to update.
+        description (str): New description, 7-bit ASCII (e.g. JSON).
+    """
+    value = description.encode("ascii") + b"\0"
+    with tifffile.TiffFile(file_path, mode="r+") as tif:
+        if tif.is_ndpi or tif.is_imagej:
+            # Their layout depends on the first IFD; not rewritten here
+            raise ValueError("Cannot update the description of this TIFF flavor")
+        page = tif.pages[0]
+        tag = page.tags.get(IMAGE_DESCRIPTION_TAG)
+        if tag is not None:
+            tag.overwrite(value)
+            return
+        byteorder, bigtiff, ifd_offset = tif.byteorder, tif.is_bigtiff, page.offset
+
+    _append_ifd_with_tag(file_path, byteorder, bigtiff, ifd_offset, value)
+
+
+def _append_ifd_with_tag(file_path, byteorder, bigtiff, ifd_offset, value):
+    """Appends a copy of the IFD at `ifd_offset` with an ASCII tag added."""
+    count_format, offset_format = ("Q", "Q") if bigtiff else ("H", "I")
+    count_size = struct.calcsize(count_format)
+    offset_size = struct.calcsize(offset_format)
+    entry_size = 4 + 2 * offset_size
+
+    with open(file_path, "r+b") as f:
+        f.seek(ifd_offset)
+        (count,) = struct.unpack(byteorder + count_format, f.read(count_size))
+        entries = [f.read(entry_size) for _ in range(count)]
+        next_ifd = f.read(offset_size)
+
+        # Values are word aligned; short values are stored in the entry
+        end = f.seek(0, os.SEEK_END)
+        pad = b"\0" * (end % 2)
+        value_offset = end + len(pad)
+        if len(value) <= offset_size:
+            field, data = value.ljust(offset_size, b"\0"), b""
+        else:
+            field = struct.pack(byteorder + offset_format, value_offset)
+            data = value + b"\0" * (len(value) % 2)
+        entry = struct.pack(byteorder + "HH", IMAGE_DESCRIPTION_TAG, 2)
+        entries.append(
+            entry + struct.pack(byteorder + offset_format, len(value)) + field
+        )
+        entries.sort(key=lambda e: struct.unpack(byteorder + "H", e[:2])[0])
+
+        ifd_start = value_offset + len(data)
+        f.write(pad + data)
+        f.write(struct.pack(byteorder + count_format, len(entries)))
+        f.write(b"".join(entries) + next_ifd)
+
+        # Point the header at the new first IFD
+        f.seek(8 if bigtiff else 4)
+        f.write(struct.pack(byteorder + offset_format, ifd_start))
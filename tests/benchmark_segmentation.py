@@ -0,0 +1,202 @@
+"""
+Benchmark of the auto-area segmentation engines.
+
+Runs every registered engine over a corpus of reference TIFFs with known
+areas and reports wall time, peak memory (tracemalloc) and area error per
+engine and per tool, so defaults can be chosen from data:
+
+    python tests/benchmark_segmentation.py path/to/corpus
+    python tests/benchmark_segmentation.py --synthetic 12 --output results.csv
+
+The corpus folder holds the TIFFs and a `benchmark.json` manifest listing
+the cases:
+
+    [
+        {"file": "pad_01.tif", "roi": [[x, y], ...], "area_px": 48213,
+         "seed": [x, y], "page": 0, "tool": "Sigma 300"},
+        ...
+    ]
+
+`seed`, `page` and `tool` are optional; the tool defaults to the one in the
+file's metadata.
+"""
+
+import argparse
+import csv
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import tifffile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sem_view.utils.analysis import find_overlap_area
+from sem_view.utils.metadata_parser import read_image_info
+from sem_view.utils.page_store import PageStore
+from sem_view.utils.segmentation import ENGINES
+
+MANIFEST = "benchmark.json"
+
+
+def make_synthetic_corpus(folder, count, seed=0):
+    """
+    Writes `count` synthetic pad images and their manifest to `folder`.
+
+    Each image is a noisy substrate with one faint elliptical pad of known
+    pixel area; half of them add a shading gradient stronger than the pad.
+    """
+    rng = np.random.default_rng(seed)
+    cases = []
+    for index in range(count):
+        height, width = 1024, 1280
+        rows, cols = np.mgrid[0:height, 0:width]
+        image = rng.normal(6000, 600, (height, width))
+
+        gradient = index % 2 == 1
+        if gradient:
+            image += cols / width * 8000
+
+        cy, cx = rng.uniform(300, height - 300), rng.uniform(300, width - 300)
+        ry, rx = rng.uniform(60, 200), rng.uniform(60, 200)
+        pad = ((rows - cy) / ry) ** 2 + ((cols - cx) / rx) ** 2 <= 1
+        image[pad] += rng.uniform(1500, 4000)
+        image = np.clip(image, 0, 65535).astype(np.uint16)
+
+        name = f"synthetic_{index:02d}.tif"
+        tifffile.imwrite(os.path.join(folder, name), image)
+
+        margin = 1.4
+        cases.append(
+            {
+                "file": name,
+                "roi": [
+                    [cx - rx * margin, cy - ry * margin],
+                    [cx + rx * margin, cy - ry * margin],
+                    [cx + rx * margin, cy + ry * margin],
+                    [cx - rx * margin, cy + ry * margin],
+                ],
+                "area_px": float(pad.sum()),
+                "seed": [cx, cy],
+                "tool": "synthetic-gradient" if gradient else "synthetic-flat",
+            }
+        )
+
+    with open(os.path.join(folder, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(cases, f, indent=1)
+
+
+def load_cases(folder):
+    with open(os.path.join(folder, MANIFEST), "r", encoding="utf-8") as f:
+        cases = json.load(f)
+
+    for case in cases:
+        case["path"] = os.path.join(folder, case["file"])
+        if not case.get("tool"):
+            info = read_image_info(case["path"])
+            case["tool"] = info.context.get("Tool", "Unknown")
+    return cases
+
+
+def run_engine(image_data, case, engine, repeat):
+    """Returns (median seconds, peak bytes, detected area) for one case."""
+    kwargs = {"seed_point": case.get("seed"), "engine": engine}
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        find_overlap_area(image_data, case["roi"], **kwargs)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    result = find_overlap_area(image_data, case["roi"], **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    area = result.area if result is not None else 0.0
+    return statistics.median(times), peak, area
+
+
+def run(cases, engines, repeat):
+    rows = []
+    for case in cases:
+        with PageStore(case["path"], cache_size=1) as store:
+            image_data = store[case.get("page", 0)]
+        for engine in engines:
+            seconds, peak, area = run_engine(image_data, case, engine, repeat)
+            reference = case["area_px"]
+            rows.append(
+                {
+                    "file": case["file"],
+                    "tool": case["tool"],
+                    "engine": engine,
+                    "time_ms": seconds * 1000,
+                    "peak_mb": peak / 2**20,
+                    "area_px": area,
+                    "reference_px": reference,
+                    "error_pct": (area - reference) / reference * 100,
+                }
+            )
+    return rows
+
+
+def summarize(rows):
+    """Prints per-tool, per-engine medians and the most accurate engine."""
+    tools = sorted({row["tool"] for row in rows})
+    for tool in tools:
+        print(f"\n{tool}")
+        print(f"  {'engine':<10} {'time ms':>9} {'peak MB':>9} {'|error| %':>10}")
+        scores = {}
+        for engine in sorted({row["engine"] for row in rows}):
+            selected = [r for r in rows if r["tool"] == tool and r["engine"] == engine]
+            time_ms = statistics.median(r["time_ms"] for r in selected)
+            peak_mb = statistics.median(r["peak_mb"] for r in selected)
+            error = statistics.mean(abs(r["error_pct"]) for r in selected)
+            scores[engine] = (error, time_ms)
+            print(f"  {engine:<10} {time_ms:>9.1f} {peak_mb:>9.1f} {error:>10.2f}")
+        best = min(scores, key=scores.get)
+        print(f"  best: {best}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("corpus", nargs="?", help=f"Folder with {MANIFEST}")
+    parser.add_argument(
+        "--synthetic", type=int, default=0, help="Generate N synthetic images"
+    )
+    parser.add_argument(
+        "--engines", nargs="+", default=sorted(ENGINES), choices=sorted(ENGINES)
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case")
+    parser.add_argument("--output", help="Write per-case results to this CSV")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = args.corpus
+        if corpus is None:
+            corpus = tmp
+            make_synthetic_corpus(tmp, args.synthetic or 6)
+        elif args.synthetic:
+            make_synthetic_corpus(corpus, args.synthetic)
+
+        rows = run(load_cases(corpus), args.engines, args.repeat)
+
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+    summarize(rows)
+
+
+if __name__ == "__main__":
+    main()
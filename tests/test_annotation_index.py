@@ -0,0 +1,69 @@
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+import tifffile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sem_view.batch import main
+from sem_view.utils.annotation_index import (
+    SOURCE_BATCH,
+    AnnotationIndex,
+    has_index,
+    index_measurements,
+)
+from sem_view.utils.measurements import Measurement
+
+
+def test_find_files():
+    square = [(0, 0), (100, 0), (100, 100), (0, 100)]
+    with tempfile.TemporaryDirectory() as tmp:
+        assert not has_index(tmp)
+        for name, scale in (("a.tif", 1e-8), ("b.tif", 2e-8), ("c.tif", None)):
+            measurements = [
+                Measurement.area(square, scale).to_dict(),
+                Measurement.distance((0, 0), (0, 100), scale).to_dict(),
+            ]
+            index_measurements(os.path.join(tmp, name), measurements)
+        assert has_index(tmp)
+
+        with AnnotationIndex(tmp) as index:
+            # Areas of 1 and 4 µm²; the uncalibrated file has no value
+            assert index.find_files("area", min_value=2e-12) == ["b.tif"]
+            assert index.find_files("Area", max_value=2e-12) == ["a.tif"]
+            assert index.find_files("distance") == ["a.tif", "b.tif", "c.tif"]
+            assert index.measurements("c.tif")[0]["value_px"] == 100 * 100
+
+            # Saving again replaces the file's measurements
+            index.set_measurements("b.tif", [])
+            assert index.find_files("area", min_value=2e-12) == []
+
+
+def test_batch_index():
+    image = np.full((200, 200), 1000, dtype=np.uint16)
+    image[50:150, 60:140] = 30000
+    roi = [[30, 30], [170, 30], [170, 170], [30, 170]]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tifffile.imwrite(os.path.join(tmp, "pad.tif"), image)
+        roi_path = os.path.join(tmp, "rois.json")
+        with open(roi_path, "w") as f:
+            json.dump([roi], f)
+
+        output = os.path.join(tmp, "out.csv")
+        args = [tmp, "--roi", roi_path, "--index", "--workers", "0", "-o", output]
+        assert main(args) == 0
+
+        with AnnotationIndex(tmp) as index:
+            (row,) = index.measurements("pad.tif", source=SOURCE_BATCH)
+    assert row["kind"] == "area"
+    assert abs(row["value_px"] - 100 * 80) < 0.05 * 100 * 80
+
+
+if __name__ == "__main__":
+    test_find_files()
+    test_batch_index()
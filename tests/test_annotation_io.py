@@ -0,0 +1,84 @@
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+import tifffile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sem_view.utils.annotation_io import write_in_place, write_sidecar
+from sem_view.utils.metadata_parser import read_image_info
+
+ANNOTATIONS = {
+    "measurements": [{"type": "Area", "value": 12.0, "unit": "px²"}],
+    "is_burnt_in": False,
+    "annotations": [{"type": "area", "points": [[0, 0], [10, 0], [10, 10]]}],
+}
+
+
+def _write_pages(path, pages, **kwargs):
+    with tifffile.TiffWriter(path, **kwargs) as tif:
+        for page in pages:
+            tif.write(page, metadata=None)
+
+
+def _read_pages(path):
+    with tifffile.TiffFile(path) as tif:
+        return [page.asarray() for page in tif.pages]
+
+
+def test_in_place_keeps_pages():
+    rng = np.random.default_rng(0)
+    pages = [rng.integers(0, 65535, (120, 160), dtype=np.uint16) for _ in range(3)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for bigtiff in (False, True):
+            path = os.path.join(tmp, f"frame_{bigtiff}.tif")
+            _write_pages(path, pages, bigtiff=bigtiff)
+            size = os.path.getsize(path)
+
+            # Adds the missing ImageDescription, then replaces it
+            for _ in range(2):
+                write_in_place(path, ANNOTATIONS)
+                info = read_image_info(path)
+                assert info.annotations == ANNOTATIONS["annotations"]
+                assert info.context["Measurements"][0]["value"] == 12.0
+
+            assert os.path.getsize(path) - size < 4096
+            for before, after in zip(pages, _read_pages(path)):
+                assert after.dtype == np.uint16
+                assert (before == after).all()
+
+
+def test_in_place_keeps_description():
+    data = np.zeros((32, 32), dtype=np.uint8)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "frame.tif")
+        tifffile.imwrite(path, data, description="Acquired by tool 7", metadata=None)
+        write_in_place(path, ANNOTATIONS)
+
+        with tifffile.TiffFile(path) as tif:
+            description = json.loads(tif.pages[0].description)
+    assert description["original_description"] == "Acquired by tool 7"
+    assert description["annotations"] == ANNOTATIONS["annotations"]
+
+
+def test_sidecar():
+    data = np.zeros((32, 32), dtype=np.uint16)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "frame.tif")
+        tifffile.imwrite(path, data)
+        assert read_image_info(path).annotations is None
+
+        write_sidecar(path, ANNOTATIONS)
+        assert read_image_info(path).annotations == ANNOTATIONS["annotations"]
+        assert (tifffile.imread(path) == data).all()
+
+
+if __name__ == "__main__":
+    test_in_place_keeps_pages()
+    test_in_place_keeps_description()
+    test_sidecar()
@@ -7,7 +7,13 @@ import json
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from sem_view.utils.analysis import find_overlap_area
+from sem_view.utils.analysis import (
+    find_features,
+    find_overlap_area,
+    AnalysisCancelled,
+    OverlapSegmentation,
+)
+from sem_view.utils.geometry import polygon_area
 
 
 def test_sample_roi():
@@ -44,24 +50,15 @@ def test_sample_roi():
     print("Running find_overlap_area...")
     result = find_overlap_area(image_data, user_poly)
 
-    if not result:
+    if result is None:
         print("FAIL: No overlap detected.")
         return
 
-    print(f"Success! Detected polygon with {len(result)} points.")
-
-    # Calculate area of result to compare with rough polygon
-    # (Simple Shoelace formula)
-    def polygon_area(points):
-        area = 0.0
-        for i in range(len(points)):
-            j = (i + 1) % len(points)
-            area += points[i][0] * points[j][1]
-            area -= points[j][0] * points[i][1]
-        return abs(area) / 2.0
+    print(f"Success! Detected polygon with {len(result.points)} points.")
 
+    # Compare the result area with the rough polygon
     user_area = polygon_area(user_poly)
-    result_area = polygon_area(result)
+    result_area = result.area
 
     print(f"User Area: {user_area:.2f} px²")
     print(f"Result Area: {result_area:.2f} px²")
@@ -92,7 +89,7 @@ def test_sample_roi():
             # Original User Polygon (Yellow)
             {"type": "area", "points": user_poly, "color": "#FFFF00"},
             # Result Polygon (Green)
-            {"type": "area", "points": result, "color": "#00FF00"},
+            {"type": "area", "points": result.points.tolist(), "color": "#00FF00"},
         ],
     }
 
@@ -101,5 +98,169 @@ def test_sample_roi():
     print("Done.")
 
 
+def test_synthetic_pad_in_large_frame():
+    # Small ROI in a large frame: the result must be in full-image coordinates
+    rng = np.random.default_rng(0)
+    image = (rng.random((1500, 2000)) * 2000).astype(np.uint16)
+    image[700:800, 1200:1350] += 20000
+
+    user_poly = [(1150, 650), (1400, 650), (1400, 850), (1150, 850)]
+    result = find_overlap_area(image, user_poly)
+    assert result is not None
+
+    xs, ys = result.points[:, 0], result.points[:, 1]
+    assert abs(min(xs) - 1200) <= 1 and abs(max(xs) - 1349) <= 1
+    assert abs(min(ys) - 700) <= 1 and abs(max(ys) - 799) <= 1
+
+    # Same result when the ROI is given as a full-frame mask
+    mask = np.zeros(image.shape, dtype=bool)
+    mask[650:851, 1150:1401] = True
+    assert np.allclose(result.points, find_overlap_area(image, mask=mask).points)
+
+
+def test_simplified_outline():
+    # A disk traces to a contour with a vertex per boundary pixel
+    rows, cols = np.mgrid[0:400, 0:400]
+    image = np.full((400, 400), 1000, dtype=np.uint16)
+    image[(rows - 200) ** 2 + (cols - 200) ** 2 <= 120**2] = 30000
+    user_poly = [(50, 50), (350, 50), (350, 350), (50, 350)]
+
+    full = find_overlap_area(image, user_poly, simplify=0)
+    result = find_overlap_area(image, user_poly)
+    assert result.points.dtype == np.float32 and result.points.shape[1] == 2
+    assert len(result.points) < len(full.points) / 2
+
+    # The area is that of the full contour, and the outline stays close to it
+    assert result.area == full.area
+    assert abs(polygon_area(result.points) - full.area) < 0.01 * full.area
+    radii = np.hypot(result.points[:, 0] - 200, result.points[:, 1] - 200)
+    assert np.all(np.abs(radii - 120) < 1.5)
+
+
+def test_rgb_frame():
+    # RGB pages are segmented on their grayscale conversion
+    gray = np.full((200, 200), 20, dtype=np.uint8)
+    gray[50:150, 60:140] = 200
+    image = np.stack((gray,) * 3, axis=-1)
+
+    user_poly = [(30, 30), (170, 30), (170, 170), (30, 170)]
+    result = find_overlap_area(image, user_poly)
+    assert result is not None
+    assert np.allclose(result.points, find_overlap_area(gray, user_poly).points)
+
+
+def test_component_stats():
+    image = np.full((300, 400), 1000, dtype=np.uint16)
+    image[50:150, 60:210] = 30000  # Larger pad
+    image[200:260, 250:330] = 30000
+    image[90:110, 120:140] = 1000  # Hole in the larger pad
+    user_poly = [(20, 20), (380, 20), (380, 290), (20, 290)]
+
+    result = find_overlap_area(image, user_poly)
+    assert result.component_count == 2
+    assert result.bbox == (60, 50, 210, 150)
+    assert np.allclose(result.centroid, (134.5, 99.5), atol=0.5)
+
+    # The pixel count excludes the hole; the contour area does not
+    assert abs(result.pixel_count - (100 * 150 - 20 * 20)) < 50
+    assert abs(result.area - 100 * 150) < 150
+
+
+def test_all_features():
+    rng = np.random.default_rng(2)
+    image = (rng.random((500, 700)) * 2000).astype(np.uint16)
+    for row in range(3):
+        for col in range(4):
+            y, x = 60 + row * 150, 60 + col * 150
+            image[y : y + 80, x : x + 100] += 20000
+    image[470:474, 600:604] += 20000  # Speck below the size filter
+    user_poly = [(20, 20), (680, 20), (680, 490), (20, 490)]
+
+    features = find_features(image, user_poly, min_pixels=100)
+    assert len(features) == 12
+    for feature in features:
+        assert abs(feature.pixel_count - 80 * 100) < 50
+        assert abs(feature.equivalent_diameter - np.sqrt(4 * 8000 / np.pi)) < 1
+    centroids = np.array([f.centroid for f in features])
+    assert np.allclose(centroids[:4, 0], [109.5, 259.5, 409.5, 559.5], atol=0.5)
+
+    # A single feature matches find_overlap_area
+    one = [(40, 40), (180, 40), (180, 160), (40, 160)]
+    (feature,) = find_features(image, one)
+    result = find_overlap_area(image, one)
+    assert np.allclose(feature.points, result.points)
+    assert feature.bbox == result.bbox and feature.area == result.area
+
+
+def test_progress_and_cancel():
+    image = np.full((200, 200), 1000, dtype=np.uint16)
+    image[50:150, 50:150] = 30000
+    user_poly = [(20, 20), (180, 20), (180, 180), (20, 180)]
+
+    fractions = []
+    result = find_overlap_area(
+        image, user_poly, progress=lambda f, message: fractions.append(f)
+    )
+    assert result is not None
+    assert fractions == sorted(fractions) and fractions[-1] == 1.0
+
+    def cancel(fraction, message):
+        if fraction >= 0.4:
+            raise AnalysisCancelled()
+
+    try:
+        find_overlap_area(image, user_poly, progress=cancel)
+    except AnalysisCancelled:
+        pass
+    else:
+        assert False, "analysis was not cancelled"
+
+
+def test_incremental_refinement():
+    # Refining the segmentation must match a fresh analysis of the same ROI
+    rng = np.random.default_rng(1)
+    image = (rng.random((600, 800)) * 2000).astype(np.uint16)
+    image[100:300, 150:400] += 20000
+    image[350:500, 450:700] += 15000
+
+    def rect(x0, y0, x1, y1):
+        return [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+
+    segmentation = OverlapSegmentation(image, rect(100, 50, 450, 350))
+    mask = np.zeros(image.shape, dtype=bool)
+    mask[50:351, 100:451] = True
+    edits = [
+        (True, rect(400, 320, 750, 550)),  # Add the second pad
+        (False, rect(80, 30, 250, 200)),  # Trim a corner of the first
+        (False, rect(430, 300, 760, 560)),  # Remove the second pad again
+    ]
+
+    result = segmentation.update()
+    assert np.allclose(result.points, find_overlap_area(image, mask=mask).points)
+    for add, points in edits:
+        (x0, y0), (x1, y1) = points[0], points[2]
+        if add:
+            segmentation.add(points)
+        else:
+            segmentation.trim(points)
+        mask[y0 : y1 + 1, x0 : x1 + 1] = add
+
+        result = segmentation.update()
+        expected = find_overlap_area(image, mask=mask)
+        if expected is None:
+            assert result is None
+            continue
+        assert len(result.points) == len(expected.points)
+        assert np.allclose(result.points, expected.points)
+        assert result.area == expected.area
+
+
 if __name__ == "__main__":
     test_sample_roi()
+    test_synthetic_pad_in_large_frame()
+    test_simplified_outline()
+    test_rgb_frame()
+    test_component_stats()
+    test_all_features()
+    test_progress_and_cancel()
+    test_incremental_refinement()
@@ -0,0 +1,68 @@
+import csv
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+import tifffile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sem_view.batch import main
+
+
+def test_batch_embedded_and_roi_file():
+    image = np.full((200, 200), 1000, dtype=np.uint16)
+    image[50:150, 60:140] = 30000  # 100 x 80 bright pad
+    roi = [[30, 30], [170, 30], [170, 170], [30, 170]]
+    description = json.dumps({"annotations": [{"type": "area", "points": roi}]})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tifffile.imwrite(os.path.join(tmp, "pad.tif"), image, description=description)
+        roi_path = os.path.join(tmp, "rois.json")
+        with open(roi_path, "w") as f:
+            json.dump([roi], f)
+
+        output = os.path.join(tmp, "out.csv")
+        args = [tmp, "--roi", roi_path, "--embedded", "--workers", "0", "-o", output]
+        assert main(args) == 0
+
+        with open(output, newline="") as f:
+            rows = list(csv.DictReader(f))
+
+    assert [row["roi_source"] for row in rows] == ["roi_file", "embedded"]
+    for row in rows:
+        assert not row["error"]
+        assert abs(float(row["area_px"]) - 100 * 80) < 0.05 * 100 * 80
+
+
+def test_batch_all_features():
+    image = np.full((200, 300), 1000, dtype=np.uint16)
+    image[50:150, 40:100] = 30000
+    image[50:150, 180:260] = 30000
+    roi = [[10, 10], [290, 10], [290, 190], [10, 190]]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tifffile.imwrite(os.path.join(tmp, "pads.tif"), image)
+        roi_path = os.path.join(tmp, "rois.json")
+        with open(roi_path, "w") as f:
+            json.dump([roi], f)
+
+        output = os.path.join(tmp, "out.csv")
+        args = [tmp, "--roi", roi_path, "--all-features", "--workers", "0"]
+        assert main(args + ["-o", output]) == 0
+
+        with open(output, newline="") as f:
+            rows = list(csv.DictReader(f))
+
+    assert [row["feature_index"] for row in rows] == ["0", "1"]
+    for row, width in zip(rows, (60, 80)):
+        assert abs(int(row["pixel_count"]) - 100 * width) < 50
+        assert row["components"] == "2"
+
+
+if __name__ == "__main__":
+    test_batch_embedded_and_roi_file()
+    test_batch_all_features()
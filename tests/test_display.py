@@ -0,0 +1,45 @@
+import os
+import sys
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sem_view.utils.display import DisplayCache, build_lut, to_display
+
+
+def test_lut_matches_float_stretch():
+    rng = np.random.default_rng(0)
+    data = rng.integers(1000, 50000, size=(64, 80), dtype=np.uint16)
+
+    # Reference: the previous float32 min/max stretch
+    d = data.astype(np.float32)
+    expected = ((d - d.min()) / (d.max() - d.min()) * 255).astype(np.uint8)
+
+    result = to_display(data)
+    assert result.dtype == np.uint8
+    assert np.abs(result.astype(int) - expected.astype(int)).max() <= 1
+
+
+def test_window_and_gamma():
+    lut = build_lut(np.uint16, black=100, white=200, gamma=2.0)
+    assert lut.shape == (65536,)
+    assert lut[0] == 0 and lut[100] == 0
+    assert lut[200] == 255 and lut[65535] == 255
+    # Gamma > 1 brightens mid-tones
+    assert lut[150] > 128
+
+
+def test_display_cache_reuses_result():
+    data = np.arange(100, dtype=np.uint16).reshape(10, 10)
+    cache = DisplayCache(data)
+    first = cache.convert()
+    assert cache.convert() is first
+    assert cache.convert(black=0, white=50)[5, 0] == 255
+
+
+if __name__ == "__main__":
+    test_lut_matches_float_stretch()
+    test_window_and_gamma()
+    test_display_cache_reuses_result()
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import numpy as np
+from skimage import filters
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sem_view.utils.histogram import PageHistogram, histogram_threshold
+
+
+def make_image(dtype, shape=(600, 700), seed=0):
+    rng = np.random.default_rng(seed)
+    data = rng.normal(1000, 200, shape)
+    data[rng.random(shape) < 0.3] += 8000
+    if dtype == np.uint8:
+        data /= 40
+    elif dtype == np.int16:
+        data -= 5000
+    info = np.iinfo(dtype)
+    return np.clip(data, info.min, info.max).astype(dtype)
+
+
+def test_masked_counts():
+    data = make_image(np.uint16)
+    mask = np.zeros(data.shape, dtype=bool)
+    mask[30:590, 100:650] = True
+    mask[200:300, 200:300] = False
+
+    histogram = PageHistogram(data)
+    expected = np.bincount(data[mask], minlength=histogram.length)
+    assert np.array_equal(histogram.masked(mask), expected)
+
+    # Same counts from a cropped mask, and again from the cached tiles
+    box = (30, 590, 100, 650)
+    for _ in range(2):
+        assert np.array_equal(histogram.masked(mask[30:590, 100:650], box), expected)
+
+
+def test_thresholds_match_skimage():
+    methods = {
+        "otsu": filters.threshold_otsu,
+        "li": filters.threshold_li,
+        "triangle": filters.threshold_triangle,
+    }
+    for dtype in (np.uint8, np.uint16, np.int16):
+        data = make_image(dtype, seed=1)
+        mask = np.zeros(data.shape, dtype=bool)
+        mask[50:500, 80:600] = True
+
+        histogram = PageHistogram(data)
+        counts = histogram.masked(mask)
+        for name, reference in methods.items():
+            expected = reference(data[mask])
+            result = histogram_threshold(counts, histogram.offset, name)
+            assert np.isclose(float(result), float(expected)), (dtype, name)
+
+
+if __name__ == "__main__":
+    test_masked_counts()
+    test_thresholds_match_skimage()
@@ -0,0 +1,73 @@
+import json
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sem_view.utils.measurements import AREA, DISTANCE, Measurement, display_units
+
+
+def test_distance_values():
+    m = Measurement.distance((0, 0), (30, 40), pixel_scale=2e-9, color="#ff0000")
+    assert m.value_px == 50
+    assert abs(m.value - 100e-9) < 1e-18
+    assert m.unit == "m"
+    assert m.label() == "100.00 nm"
+
+    saved = m.to_dict()
+    assert saved["type"] == "Distance"
+    assert saved["value"] == 100.0 and saved["unit"] == "nm"
+    assert saved["color"] == "#ff0000"
+
+    uncalibrated = Measurement.distance((0, 0), (3, 4))
+    assert uncalibrated.value == 5 and uncalibrated.unit == "px"
+    assert uncalibrated.label() == "5.0 px"
+    assert uncalibrated.to_dict()["value_si"] is None
+
+
+def test_area_values():
+    square = [(0, 0), (1000, 0), (1000, 1000), (0, 1000)]
+    m = Measurement.area(square, pixel_scale=1e-9)
+    assert m.value_px == 1e6
+    assert abs(m.value - 1e-12) < 1e-24 and m.unit == "m²"
+    assert m.label() == "1.00 µm²"
+
+    # A reported contour area overrides the outline's own area
+    m = Measurement.area(square, area_px=123.4, pixel_count=120)
+    assert m.label() == "123 px²"
+    assert m.pixel_count == 120
+
+
+def test_display_units():
+    assert [unit for unit, _ in display_units(DISTANCE)] == ["nm", "µm", "mm"]
+    assert dict(display_units(AREA))["nm²"] == 1e18
+
+
+def test_annotation_round_trip():
+    measurements = [
+        Measurement.distance((1.5, 2.5), (10, 20), color="#00ffff"),
+        Measurement.area(
+            [(0, 0), (10, 0), (10, 10)], color="#ff00ff", area_px=51, pixel_count=48
+        ),
+    ]
+    state = json.loads(json.dumps([m.to_annotation() for m in measurements]))
+    restored = [Measurement.from_annotation(s, pixel_scale=1e-9) for s in state]
+
+    for before, after in zip(measurements, restored):
+        assert after.kind == before.kind
+        assert after.color == before.color
+        assert after.value_px == before.value_px
+        assert after.pixel_count == before.pixel_count
+        assert (after.points == before.points).all()
+    assert restored[0].pixel_scale == 1e-9
+
+    assert Measurement.from_annotation({"type": "area", "points": [[0, 0]]}) is None
+    assert Measurement.from_annotation({"type": "angle"}) is None
+
+
+if __name__ == "__main__":
+    test_distance_values()
+    test_area_values()
+    test_display_units()
+    test_annotation_round_trip()
@@ -0,0 +1,93 @@
+import os
+import sys
+import tempfile
+import tracemalloc
+
+import numpy as np
+import tifffile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sem_view.utils.analysis import find_overlap_area
+from sem_view.utils.page_store import PageStore
+
+
+def test_lazy_pages():
+    pages = [np.full((64, 48), i * 1000, dtype=np.uint16) for i in range(3)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, "multi.tif")
+        with tifffile.TiffWriter(file_path) as tif:
+            for data in pages:
+                tif.write(data)
+
+        with PageStore(file_path, cache_size=2) as store:
+            assert len(store) == 3
+            assert not store.is_cached(0)
+
+            assert np.array_equal(store[0], pages[0])
+            assert np.array_equal(store[1], pages[1])
+            assert store.is_cached(0) and store.is_cached(1)
+
+            # Decoding a third page evicts the least recently used one
+            assert np.array_equal(store[2], pages[2])
+            assert not store.is_cached(0)
+            assert np.array_equal(store[-1], pages[2])
+
+
+def test_memmap_pages():
+    data = np.arange(64 * 48, dtype=np.uint16).reshape(64, 48)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, kwargs, mapped in (
+            ("plain.tif", {}, True),
+            ("deflate.tif", {"compression": "zlib"}, False),
+            ("big_endian.tif", {"byteorder": ">"}, False),
+        ):
+            file_path = os.path.join(tmp, name)
+            tifffile.imwrite(file_path, data, **kwargs)
+
+            with PageStore(file_path) as store:
+                page = store[0]
+                assert isinstance(page, np.memmap) == mapped
+                assert page.dtype == np.uint16
+                assert np.array_equal(page, data)
+
+            with PageStore(file_path, memmap=False) as store:
+                assert not isinstance(store[0], np.memmap)
+
+
+def test_analysis_on_memmap():
+    # A small ROI of a mapped frame is analyzed without copying the frame
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 2000, (3000, 4000), dtype=np.uint16)
+    image[700:800, 1200:1350] += 20000
+    user_poly = [(1150, 650), (1400, 650), (1400, 850), (1150, 850)]
+    expected = find_overlap_area(image, user_poly)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, "frame.tif")
+        tifffile.imwrite(file_path, image)
+        del image
+
+        with PageStore(file_path) as store:
+            frame = store[0]
+            frame_bytes = frame.nbytes
+            assert isinstance(frame, np.memmap)
+            tracemalloc.start()
+            try:
+                result = find_overlap_area(frame, user_poly)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            del frame
+
+    assert peak < frame_bytes / 2
+    assert np.allclose(result.points, expected.points)
+
+
+if __name__ == "__main__":
+    test_lazy_pages()
+    test_memmap_pages()
+    test_analysis_on_memmap()
@@ -1,4 +1,11 @@
-from sem_view.utils.metadata_parser import get_pixel_scale
+import json
+import os
+import tempfile
+
+import numpy as np
+import tifffile
+
+from sem_view.utils.metadata_parser import get_pixel_scale, read_image_info
 
 
 def test_parser():
@@ -8,5 +15,25 @@ def test_parser():
         print(f"Scale in nm/px: {scale * 1e9}")
 
 
+def test_image_info_cache():
+    annotations = [{"type": "area", "points": [[0, 0], [10, 0], [10, 10]]}]
+    description = json.dumps({"measurements": [], "annotations": annotations})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, "annotated.tif")
+        with tifffile.TiffWriter(file_path) as tif:
+            tif.write(np.zeros((32, 16), dtype=np.uint16), description=description)
+            tif.write(np.zeros((8, 4), dtype=np.uint8))
+
+        info = read_image_info(file_path)
+        assert info.annotations == annotations
+        assert info.page_shapes == [(32, 16), (8, 4)]
+        assert info.zeiss_raw is None
+
+        # Unchanged files are served from the cache
+        assert read_image_info(file_path) is info
+
+
 if __name__ == "__main__":
     test_parser()
+    test_image_info_cache()
@@ -0,0 +1,68 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import tifffile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sem_view.utils.prefetch import FilePrefetcher, load_file
+
+
+def test_prefetch_and_take():
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(3):
+            path = os.path.join(tmp, f"img{i}.tif")
+            tifffile.imwrite(path, np.full((100, 100), i, dtype=np.uint16))
+            paths.append(path)
+
+        # Budget holds two decoded 100x100 uint16 pages but not three
+        prefetcher = FilePrefetcher(memory_budget=2 * 100 * 100 * 2)
+        try:
+            prefetcher.prefetch(paths[:2])
+            entry = prefetcher.take(paths[0])
+            assert entry is not None
+            assert entry.store.is_cached(0)
+            assert np.all(entry.store[0] == 0)
+            entry.close()
+
+            # A file that was never requested is not available
+            assert prefetcher.take(paths[2]) is None
+        finally:
+            prefetcher.shutdown()
+
+
+def test_prefetch_memmapped():
+    with tempfile.TemporaryDirectory() as tmp:
+        data = np.arange(400 * 300, dtype=np.uint16).reshape(400, 300)
+        plain = os.path.join(tmp, "plain.tif")
+        tifffile.imwrite(plain, data)
+        deflate = os.path.join(tmp, "deflate.tif")
+        tifffile.imwrite(deflate, data, compression="zlib")
+
+        # A mapped page costs no memory; a decoded one its size
+        entry = load_file(plain)
+        assert isinstance(entry.store[0], np.memmap)
+        assert entry.nbytes == 0
+        entry.close()
+        entry = load_file(deflate)
+        assert entry.nbytes == data.nbytes
+        entry.close()
+
+        # So a mapped file fits any budget
+        prefetcher = FilePrefetcher(memory_budget=1024)
+        try:
+            prefetcher.prefetch([plain])
+            entry = prefetcher.take(plain)
+            assert entry is not None
+            assert np.array_equal(entry.store[0], data)
+            entry.close()
+        finally:
+            prefetcher.shutdown()
+
+if __name__ == "__main__":
+    test_prefetch_and_take()
+    test_prefetch_memmapped()
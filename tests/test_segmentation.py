@@ -0,0 +1,54 @@
+import os
+import sys
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sem_view.utils.analysis import find_overlap_area
+from sem_view.utils.segmentation import ENGINES, get_engine, grow_region
+
+
+def test_engines_find_pad():
+    rng = np.random.default_rng(0)
+    image = rng.normal(5000, 300, (400, 500))
+    image[150:250, 200:330] += 8000
+    image = image.astype(np.uint16)
+    roi = [(150, 100), (380, 100), (380, 300), (150, 300)]
+
+    for engine in ("threshold", "local", "flood", "watershed"):
+        result = find_overlap_area(image, roi, seed_point=(260, 200), engine=engine)
+        area = result.area
+        assert abs(area - 100 * 130) < 0.05 * 100 * 130, (engine, area)
+
+
+def test_unknown_engine():
+    assert set(ENGINES) >= {"threshold", "local", "flood", "watershed"}
+    try:
+        get_engine("nope")
+    except ValueError:
+        pass
+    else:
+        assert False, "unknown engine accepted"
+
+
+def test_seeded_area():
+    rng = np.random.default_rng(0)
+    image = rng.normal(5000, 300, (2000, 3000))
+    image[1000:1100, 1500:1630] += 8000
+    image = image.astype(np.uint16)
+
+    # Only a window around the pad is examined
+    region, (y0, y1, x0, x1) = grow_region(image, (1050, 1560))
+    assert (y1 - y0) * (x1 - x0) < 0.01 * image.size
+    assert region.sum() > 0.95 * 100 * 130
+
+    area = find_overlap_area(image, seed_point=(1560, 1050)).area
+    assert abs(area - 100 * 130) < 0.05 * 100 * 130, area
+
+
+if __name__ == "__main__":
+    test_engines_find_pad()
+    test_unknown_engine()
+    test_seeded_area()
@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import tifffile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sem_view.utils.thumbnails import ThumbnailCache, make_thumbnail
+
+
+def test_thumbnail_prefers_subifd():
+    full = np.zeros((1024, 1024), dtype=np.uint16)
+    reduced = np.full((256, 256), 1000, dtype=np.uint16)
+    reduced[:128] = 2000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, "pyramid.tif")
+        with tifffile.TiffWriter(file_path) as tif:
+            tif.write(full, subifds=1)
+            tif.write(reduced, subfiletype=1)
+
+        # The uniform full-resolution image would give a blank thumbnail
+        thumbnail = make_thumbnail(file_path, size=128)
+        assert thumbnail.shape == (128, 128)
+        assert thumbnail.dtype == np.uint8
+        assert thumbnail[0, 0] == 255 and thumbnail[-1, 0] == 0
+
+        cache = ThumbnailCache(cache_dir=os.path.join(tmp, "cache"), size=128)
+        assert cache.get(file_path) is None
+        cache.get_or_create(file_path)
+        assert np.array_equal(cache.get(file_path), thumbnail)
+
+
+if __name__ == "__main__":
+    test_thumbnail_prefers_subifd()
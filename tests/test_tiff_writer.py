@@ -0,0 +1,57 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import tifffile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sem_view.utils.tiff_writer import available_compressions, iter_tiles, write_tiled
+
+
+def test_write_tiled_round_trip():
+    rng = np.random.default_rng(0)
+    gray = rng.integers(0, 256, (300, 520), dtype=np.uint8)
+    rgb = np.stack((gray, gray[::-1], 255 - gray), axis=-1)
+    assert "zlib" in available_compressions()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for data, photometric in ((gray, "minisblack"), (rgb, "rgb")):
+            path = os.path.join(tmp, f"{photometric}.tif")
+            write_tiled(
+                path,
+                iter_tiles(data),
+                data.shape,
+                data.dtype,
+                photometric=photometric,
+                description='{"description": "Annotated Image"}',
+            )
+            with tifffile.TiffFile(path) as tif:
+                page = tif.pages[0]
+                assert page.is_tiled and page.compression == 8  # Deflate
+                assert page.description.startswith('{"description"')
+                assert (page.asarray() == data).all()
+
+
+def test_unknown_compression():
+    data = np.zeros((16, 16), dtype=np.uint8)
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            write_tiled(
+                os.path.join(tmp, "x.tif"),
+                iter_tiles(data),
+                data.shape,
+                data.dtype,
+                compression="jpeg",
+            )
+        except ValueError:
+            pass
+        else:
+            assert False, "lossy compression accepted"
+
+
+if __name__ == "__main__":
+    test_write_tiled_round_trip()
+    test_unknown_compression()
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sem_view.gui.tiled_image import ImagePyramid
+
+
+def block_mean(data):
+    # Plain 2x2 mean (rounded half up), repeating an odd last row/column
+    height, width = data.shape[:2]
+    pad = [(0, height % 2), (0, width % 2)] + [(0, 0)] * (data.ndim - 2)
+    padded = np.pad(data, pad, mode="edge").astype(np.float64)
+    blocks = padded.reshape(
+        padded.shape[0] // 2, 2, padded.shape[1] // 2, 2, *padded.shape[2:]
+    )
+    return np.floor(blocks.mean(axis=(1, 3)) + 0.5).astype(data.dtype)
+
+
+def test_levels_match_block_mean():
+    rng = np.random.default_rng(0)
+    images = [
+        # Spans several strips of output rows, odd in both directions
+        rng.integers(0, 65536, (517, 301), dtype=np.uint16),
+        rng.integers(0, 65536, (300, 1), dtype=np.uint16),
+        rng.integers(0, 256, (1, 300), dtype=np.uint8),
+        rng.integers(0, 256, (263, 130, 3), dtype=np.uint8),
+    ]
+    for data in images:
+        pyramid = ImagePyramid(data, min_size=1)
+        assert pyramid.level(0) is data
+
+        expected = data
+        for index in range(1, pyramid.num_levels):
+            expected = block_mean(expected)
+            level = pyramid.level(index)
+            assert level.dtype == data.dtype
+            assert level.shape == expected.shape
+            assert np.array_equal(level, expected)
+        assert max(level.shape[:2]) == 1
+
+
+if __name__ == "__main__":
+    test_levels_match_block_mean()